@@ -135,3 +135,95 @@ STATICFILES_DIRS=[
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# OCR 引擎池
+# 每個 worker 行程啟動時預先載入 OCR_ENGINE_POOL_SIZE 個 OCRService，
+# 借用引擎最多等待 OCR_ENGINE_CHECKOUT_TIMEOUT 秒
+
+OCR_ENGINE_POOL_SIZE = 2
+OCR_ENGINE_CHECKOUT_TIMEOUT = 60
+OCR_WARM_ON_STARTUP = True
+
+# OCR 版面分析：OCR-A / OCR-B 只辨識各自需要的區段
+OCR_ROI_ENABLED = True
+
+# OCR 後端：'tesserocr'（行程內 API，需安裝 tesserocr）或 'pytesseract'（子行程）
+# tesserocr 未安裝時自動改用 pytesseract；TESSDATA_PATH 為 None 時使用預設 tessdata
+OCR_BACKEND = 'tesserocr'
+TESSDATA_PATH = None
+
+# OCR 前處理：灰階 → 縮放到目標行高（像素）→ Sauvola 二值化
+OCR_PREPROCESS_ENABLED = True
+OCR_TARGET_LINE_HEIGHT = 32
+OCR_SAUVOLA_K = 0.2
+
+# OCR 模式：'dual'（OCR-A / OCR-B 兩次全圖辨識）或 'single'（一次逐字辨識，
+# 信心值低於 OCR_REOCR_CONFIDENCE 的數字 token 再以數字白名單重新辨識）
+OCR_MODE = 'dual'
+OCR_REOCR_CONFIDENCE = 80
+
+# QR 文字編碼：依規格的中文編碼參數解碼，記住最近 QR_ENCODING_CACHE_SIZE 個賣方的編碼
+QR_ENCODING_CACHE_SIZE = 1024
+
+# 品名分類紀錄：發票確認時記錄使用者確認的品項分類，分類時優先採用
+# 資料庫最多保留 ITEM_MEMO_MAX_ROWS 筆，行程內 LRU 保留 ITEM_MEMO_CACHE_SIZE 筆查詢結果
+# （含查無資料）ITEM_MEMO_CACHE_TTL 秒，其他行程新增的紀錄最晚在到期後生效
+ITEM_MEMO_ENABLED = True
+ITEM_MEMO_MAX_ROWS = 50000
+ITEM_MEMO_CACHE_SIZE = 4096
+ITEM_MEMO_CACHE_TTL = 300
+
+# 品名 n-gram 分類器：關鍵字規則分不出來的品項改用此模型
+# 以 python manage.py train_item_classifier 從 items 資料表重新訓練
+ITEM_CLASSIFIER_ENABLED = True
+ITEM_CLASSIFIER_PATH = BASE_DIR / 'models' / 'item_classifier'
+ITEM_CLASSIFIER_MIN_PROBABILITY = 0.6
+
+# 賣方統編索引：python manage.py import_seller_index <csv> 建立
+# 高信心賣方（加油站、停車場等）整張發票直接採用賣方分類
+SELLER_INDEX_PATH = BASE_DIR / 'models' / 'seller_index'
+
+# 分類規則存放在資料表（admin 可編輯），worker 最多每 CLASSIFY_RULES_CHECK_SECONDS 秒檢查一次版本
+CLASSIFY_RULES_CHECK_SECONDS = 1.0
+
+# 背景辨識工作（/api/jobs/）：以 python manage.py run_invoice_worker 處理
+# worker 每次取得 INVOICE_JOB_LEASE_SECONDS 秒的租約並在處理中延長，當機時租約到期由其他 worker 重試，
+# 最多嘗試 INVOICE_JOB_MAX_ATTEMPTS 次；結果保留 INVOICE_JOB_TTL_SECONDS 秒
+# 用戶端輪詢 poll_url 取得結果（WSGI 不保持長連線），未完成的回應附 Retry-After: INVOICE_JOB_POLL_INTERVAL
+INVOICE_JOB_LEASE_SECONDS = 120
+INVOICE_JOB_MAX_ATTEMPTS = 3
+INVOICE_JOB_TTL_SECONDS = 3600
+INVOICE_JOB_POLL_INTERVAL = 1
+
+# 批次辨識（/api/batch/）：每個 web worker 行程各有 BATCH_PROCESS_POOL_SIZE 個子行程平行處理，
+# 每個子行程各載入一個 OCR 引擎（主機上的引擎數 = web worker 數 × BATCH_PROCESS_POOL_SIZE），
+# 一次最多 BATCH_MAX_IMAGES 張、每張最多 BATCH_MAX_IMAGE_BYTES bytes；上傳的影像寫入暫存檔，不留在記憶體
+BATCH_PROCESS_POOL_SIZE = 2
+BATCH_MAX_IMAGES = 100
+BATCH_MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# 辨識結果快取：同一張影像（SHA-256 相同）重送時沿用 QR / OCR 解析結果，分類仍重新計算
+# 記憶體 LRU 保留 RESULT_CACHE_SIZE 筆，磁碟 RESULT_CACHE_PATH 保留 RESULT_CACHE_TTL_SECONDS 秒；
+# 每 RESULT_CACHE_SWEEP_EVERY 次寫入與 run_invoice_worker 的清除週期刪除過期 / 舊版本的檔案，
+# 磁碟總大小超過 RESULT_CACHE_MAX_BYTES 時由最舊的檔案開始刪除
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_SIZE = 512
+RESULT_CACHE_PATH = BASE_DIR / 'cache' / 'results'
+RESULT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+RESULT_CACHE_SWEEP_EVERY = 500
+
+# 上傳影像：逐塊寫入暫存檔（超過 UPLOAD_SPOOL_MEMORY_BYTES 改存磁碟）並同步計算雜湊，
+# 超過 UPLOAD_MAX_BYTES bytes 或 UPLOAD_MAX_PIXELS 像素（只讀標頭判斷）的影像在解碼前拒絕
+UPLOAD_SPOOL_MEMORY_BYTES = 1024 * 1024
+UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+UPLOAD_MAX_PIXELS = 50_000_000
+
+# 影像庫：以內容雜湊分片儲存拍照影像（IMAGE_STORE_ROOT/captures/ab/cd/<sha256>.jpg），
+# 縮圖（WebP）第一次請求時產生；回應可快取 IMAGE_STORE_MAX_AGE 秒（內容不會改變）
+# python manage.py gc_images 刪除沒有被 Invoice.image 參照、超過 IMAGE_STORE_GC_MIN_AGE_HOURS 小時的影像
+IMAGE_STORE_ROOT = BASE_DIR / 'media'
+IMAGE_STORE_MAX_AGE = 365 * 24 * 3600
+IMAGE_STORE_GC_MIN_AGE_HOURS = 24
+MEDIA_ROOT = IMAGE_STORE_ROOT
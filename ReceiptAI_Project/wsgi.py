@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ReceiptAI_Project.settings')
 
 application = get_wsgi_application()
+
+# 每個 worker 行程啟動時預熱 OCR 引擎池（/api/ready/ 會回報是否完成）
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, 'OCR_WARM_ON_STARTUP', False):
+    from services.ocr.engine_pool import get_engine_pool  # noqa: E402
+    get_engine_pool().warm_async()
@@ -8,6 +8,7 @@ class DeviceInfoSerializer(serializers.Serializer):
 
 class InvoiceUploadSerializer(serializers.Serializer):
     image = serializers.CharField(required=False)      # base64
+    image_base64 = serializers.CharField(required=False)   # 同 image（camera.js 使用的欄位名稱）
     raw_qrs = serializers.ListField(
         child=serializers.CharField(),
         required=False
@@ -16,7 +17,9 @@ class InvoiceUploadSerializer(serializers.Serializer):
     device = DeviceInfoSerializer(required=False)
 
     def validate(self, data):
-        if not any(k in data for k in ("image", "raw_qrs", "raw_text")):
+        if "image_base64" in data:
+            data.setdefault("image", data.pop("image_base64"))
+        if not any(data.get(k) for k in ("image", "raw_qrs", "raw_text")):
             raise serializers.ValidationError(
                 "至少需要 image / raw_qrs / raw_text 其中一種"
             )
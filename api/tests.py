@@ -1,3 +1,247 @@
-from django.test import TestCase
+# api/tests.py
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from services.invoice_pipeline import InvoiceNotRecognized
+from services.job_queue import JobQueue
+from services.models import ProcessingJob
 
-# Create your tests here.
+OUTCOME = {
+    'data': {'number': 'DF62269413', 'date': '2022-07-08', 'total': 103, 'items': []},
+    'raw_qr_data': ['DF62269413...'],
+    'raw_ocr_data': None
+}
+
+
+def make_jpeg(color='white', size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+JPEG = make_jpeg()
+
+
+class ProcessRawInputTestCase(TestCase):
+
+    HEADER = "DF622694131110708397000000062000000670000000008547587XKsayZY706hvyFpe6k3TQA=="
+
+    def _post(self, body):
+        return self.client.post(reverse('api:process'), data=json.dumps(body), content_type='application/json')
+
+    def test_raw_qrs_skip_image_pipeline(self):
+        """測試手機已掃描的 QR 直接解析與分類，不經影像流程"""
+        raw_qrs = [self.HEADER + ":**********:1:1:1:可樂:1:30"]
+        with mock.patch('services.invoice_pipeline.InvoicePipeline.recognize') as recognize:
+            response = self._post({'raw_qrs': raw_qrs, 'device': {'platform': 'ios', 'has_qr': True}})
+
+        recognize.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['number'], data['total']), ('DF62269413', 103))
+        self.assertEqual(data['items'][0]['name'], '可樂')
+        self.assertIn('category', data)
+        self.assertEqual(self.client.session['raw_qr_data'], raw_qrs)
+
+    def test_raw_text(self):
+        """測試手機已辨識的文字"""
+        response = self._post({'raw_text': '電子發票證明聯\nAB-12345678\n2025-01-01\n總計 120'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['number'], 'AB12345678')
+        self.assertIn('總計', self.client.session['raw_ocr_data'])
+
+    def test_invalid_input(self):
+        """測試欄位驗證與無法解析的 QR"""
+        response = self._post({'device': {'platform': 'android'}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('errors', response.json())
+
+        self.assertEqual(self._post({'raw_qrs': [self.HEADER[:40]]}).status_code, 400)
+
+    def test_image_base64_still_accepted(self):
+        """測試 camera.js 的 image_base64 欄位仍走影像流程"""
+        with mock.patch('api.views.InvoicePipeline.run', return_value={**OUTCOME, 'cached': False}) as run:
+            response = self._post({'image_base64': base64.b64encode(JPEG).decode()})
+
+        upload, = run.call_args.args
+        self.assertEqual(upload.sha256, hashlib.sha256(JPEG).hexdigest())
+        self.assertEqual(response.json()['data'], OUTCOME['data'])
+
+    @override_settings(UPLOAD_MAX_PIXELS=100)
+    def test_pixel_budget(self):
+        """測試像素超過上限的影像在辨識前拒絕"""
+        with mock.patch('api.views.InvoicePipeline.run') as run:
+            response = self.client.post(reverse('api:process'), {'image': SimpleUploadedFile('a.jpg', JPEG)})
+
+        run.assert_not_called()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('像素', response.json()['error'])
+
+
+class CaptureAPITestCase(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store_root = Path(tmp.name)
+        settings_override = override_settings(IMAGE_STORE_ROOT=self.store_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_stores_both_and_processes_crop(self):
+        """測試一次請求儲存原圖與裁切圖（內容雜湊命名）並辨識裁切圖"""
+        crop, original = make_jpeg('white'), make_jpeg('black', (80, 60))
+        files = {
+            'image': SimpleUploadedFile('invoice.jpg', crop, content_type='image/jpeg'),
+            'original': SimpleUploadedFile('capture_original.jpg', original, content_type='image/jpeg'),
+        }
+        with mock.patch('api.views.InvoicePipeline.run', return_value={**OUTCOME, 'cached': False}) as run:
+            response = self.client.post(reverse('api:capture'), files)
+
+        self.assertEqual(run.call_args.args[0].sha256, hashlib.sha256(crop).hexdigest())
+        body = response.json()
+        self.assertEqual(body['data'], OUTCOME['data'])
+        self.assertEqual(self.client.session['invoice_data'], OUTCOME['data'])
+        digest = hashlib.sha256(crop).hexdigest()
+        self.assertEqual(body['image']['name'], f"captures/{digest[:2]}/{digest[2:4]}/{digest}.jpg")
+        self.assertEqual((self.store_root / body['image']['name']).read_bytes(), crop)
+        self.assertEqual((self.store_root / body['original']['name']).read_bytes(), original)
+        # 確認頁儲存發票時使用原圖
+        self.assertEqual(self.client.session['invoice_image'], body['original']['name'])
+
+    def test_served_with_cache_headers_and_thumbnail(self):
+        """測試影像與縮圖以內容雜湊 URL 提供，可長期快取"""
+        with mock.patch('api.views.InvoicePipeline.run', return_value={**OUTCOME, 'cached': False}):
+            stored = self.client.post(
+                reverse('api:capture'), {'image': SimpleUploadedFile('a.jpg', make_jpeg(size=(800, 600)))}
+            ).json()['image']
+
+        response = self.client.get(stored['url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(stored['url'], HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        thumbnail = self.client.get(stored['thumbnail_url'])
+        self.assertEqual(thumbnail['Content-Type'], 'image/webp')
+        self.assertEqual(Image.open(io.BytesIO(b''.join(thumbnail.streaming_content))).size, (320, 240))
+        self.assertEqual(self.client.get(stored['url'].replace('.jpg', '.png')).status_code, 404)
+
+    def test_failure_keeps_stored_images(self):
+        """測試辨識失敗時仍回傳已儲存的影像"""
+        with mock.patch('api.views.InvoicePipeline.run', side_effect=InvoiceNotRecognized('無法辨識發票內容')):
+            response = self.client.post(reverse('api:capture'), {'image': SimpleUploadedFile('a.jpg', JPEG)})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNotNone(response.json()['image'])
+        self.assertEqual(self.client.post(reverse('api:capture')).status_code, 400)
+
+    def test_invalid_image_not_stored(self):
+        """測試無法讀取的影像不儲存、不辨識"""
+        with mock.patch('api.views.InvoicePipeline.run') as run:
+            response = self.client.post(reverse('api:capture'), {'image': SimpleUploadedFile('a.jpg', b'crop')})
+
+        run.assert_not_called()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse((self.store_root / 'captures').exists())
+
+
+class JobAPITestCase(TestCase):
+
+    def _submit(self):
+        response = self.client.post(
+            reverse('api:jobs'),
+            data=json.dumps({'image_base64': 'data:image/jpeg;base64,' + base64.b64encode(JPEG).decode()}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_submit_and_poll(self):
+        """測試送出後立即回傳 job id，worker 完成後輪詢取得結果並寫入 session"""
+        body = self._submit()
+        self.assertEqual(bytes(ProcessingJob.objects.get(pk=body['job_id']).payload), JPEG)
+
+        pending = self.client.get(body['poll_url'])
+        self.assertEqual(pending.json()['status'], ProcessingJob.QUEUED)
+        self.assertEqual(pending['Retry-After'], '1')
+
+        with mock.patch('services.job_queue.InvoicePipeline.run', return_value=OUTCOME):
+            JobQueue.run_next('worker')
+        done = self.client.get(body['poll_url'])
+
+        self.assertEqual(done.status_code, 200)
+        self.assertEqual(done.json()['data'], OUTCOME['data'])
+        self.assertEqual(self.client.session['invoice_data'], OUTCOME['data'])
+        self.assertEqual(self.client.session['raw_qr_data'], OUTCOME['raw_qr_data'])
+
+    def test_failed_job_returns_error_status(self):
+        """測試失敗的工作回傳與同步 API 相同的狀態碼"""
+        body = self._submit()
+        with mock.patch('services.job_queue.InvoicePipeline.run', side_effect=ValueError('格式錯誤')):
+            JobQueue.run_next('worker')
+
+        response = self.client.get(body['poll_url'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('格式錯誤', response.json()['error'])
+
+    def test_other_session_cannot_read_result(self):
+        """測試知道 job id 的其他 session 取不到結果，也不會寫入其 session"""
+        body = self._submit()
+        with mock.patch('services.job_queue.InvoicePipeline.run', return_value=OUTCOME):
+            JobQueue.run_next('worker')
+
+        self.client.cookies.clear()
+        response = self.client.get(body['poll_url'])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('invoice_data', self.client.session)
+
+    def test_missing_image_and_unknown_job(self):
+        """測試缺少影像與不存在的工作"""
+        self.assertEqual(self.client.post(reverse('api:jobs')).status_code, 400)
+        self.assertEqual(
+            self.client.get(reverse('api:job', args=['00000000-0000-0000-0000-000000000000'])).status_code, 404
+        )
+
+
+class BatchAPITestCase(TestCase):
+
+    def test_streams_ndjson_results(self):
+        """測試批次上傳（含 zip）逐行回傳結果與總結"""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('b.jpg', b'b')
+        images = [SimpleUploadedFile('a.jpg', b'a'), SimpleUploadedFile('month.zip', archive.getvalue())]
+
+        with tempfile.TemporaryDirectory() as spool, override_settings(FILE_UPLOAD_TEMP_DIR=spool), \
+                ThreadPoolExecutor(2) as pool, \
+                mock.patch('services.batch_processor.get_process_pool', return_value=pool), \
+                mock.patch('services.invoice_pipeline.InvoicePipeline.run', return_value=OUTCOME):
+            response = self.client.post(reverse('api:batch'), {'images': images})
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            # 回應結束後刪除暫存的影像
+            self.assertEqual(os.listdir(spool), [])
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(sorted(line['filename'] for line in lines[:-1]), ['a.jpg', 'month.zip/b.jpg'])
+        self.assertEqual(lines[-1]['succeeded'], 2)
+
+    def test_missing_images(self):
+        """測試沒有影像"""
+        self.assertEqual(self.client.post(reverse('api:batch')).status_code, 400)
+
+
+# 單一測試檔案執行
+# python manage.py test api.tests
@@ -1,8 +1,16 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 app_name = 'api'
 urlpatterns = [
     path('save-image/', views.save_image, name='save_image'),
     path('process/', views.process_invoice, name='process'),
+    path('capture/', views.capture_invoice, name='capture'),
+    path('batch/', views.process_batch, name='batch'),
+    path('ready/', views.ocr_ready, name='ready'),
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
+    path('jobs/', views.submit_job, name='jobs'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job'),
+    re_path(r'^images/(?P<digest>[0-9a-f]{64})(?P<ext>\.[a-z]{3,4})$', views.image_file, name='image'),
+    re_path(r'^images/(?P<digest>[0-9a-f]{64})/thumb/(?P<size>[0-9]{2,4})\.webp$', views.image_thumbnail, name='image_thumbnail'),
 ]
@@ -1,21 +1,29 @@
 # api/views.py
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.conf import settings
-import hashlib
+from django.core.serializers.json import DjangoJSONEncoder
+import contextlib
 import json
 import logging
 import os
-import re
+import time
 import uuid
 
-from services.image_adapter import ImageAdapter, ImageAdapterError
-from services.qr_service import QRService
-from services.ocr_service import OCRService
-from services.invoice_parser import InvoiceParser
-from services.classify_service import InvoiceClassifier
+from .serializers import InvoiceUploadSerializer
+from services.batch_processor import BatchError, BatchProcessor
+from services.image_adapter import ImageAdapterError
+from services.image_store import ImageStore
+from services.ocr.engine_pool import get_engine_pool, OCREngineUnavailable
+from services.invoice_pipeline import InvoiceNotRecognized, InvoicePipeline
+from services.job_queue import JobQueue
+from services.models import ProcessingJob
+from services.result_cache import get_result_cache
+from services.upload_ingest import SpooledUpload
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +32,10 @@ logger = logging.getLogger(__name__)
 @require_http_methods(["POST"])
 def save_image(request):
     """
-    將前端上傳的影像儲存到 static/imgs，回傳可存取的靜態 URL
+    將前端上傳的影像存入影像庫（services/image_store.py），回傳可存取的 URL
+
+    以內容雜湊命名，同樣的圖只存一份；存入 saved（keep=True），不會被 gc_images 清除，
+    回傳的 URL 可長期使用；舊版的 overwrite / filename 參數不再需要，忽略
     """
     if not request.FILES.get('image'):
         return JsonResponse({
@@ -33,8 +44,29 @@ def save_image(request):
         }, status=400)
 
     file = request.FILES['image']
-    overwrite = str(request.POST.get('overwrite', '')).lower() in ('1', 'true', 'yes')
-    requested_name = (request.POST.get('filename') or '').strip()
+    try:
+        upload = SpooledUpload.from_file(file)
+    except ImageAdapterError as e:
+        return _upload_error(e)
+    with upload:
+        saved = ImageStore.default().put(upload, _image_extension(file), keep=True)
+
+    return JsonResponse({
+        'success': True,
+        **saved
+    })
+
+
+def _upload_error(error):
+    """上傳的影像無效或超過大小 / 像素上限"""
+    return JsonResponse({
+        'success': False,
+        'error': f'影像處理失敗: {str(error)}'
+    }, status=400)
+
+
+def _image_extension(file):
+    """上傳檔案的副檔名，沒有時依 content type 判斷"""
     _, ext = os.path.splitext(file.name)
     if not ext:
         content_type = (getattr(file, 'content_type', '') or '').lower()
@@ -44,34 +76,72 @@ def save_image(request):
             ext = '.webp'
         else:
             ext = '.jpg'
+    return ext
 
-    save_dir = settings.BASE_DIR / 'static' / 'imgs'
-    os.makedirs(save_dir, exist_ok=True)
 
-    # 以內容雜湊作為檔名，避免重複儲存同樣的圖
-    file_bytes = file.read()
-    if overwrite:
-        base = os.path.splitext(os.path.basename(requested_name or 'capture_original'))[0]
-        base = re.sub(r'[^A-Za-z0-9_-]+', '', base) or 'capture_original'
-        filename = f"{base}{ext}"
-    else:
-        file_hash = hashlib.sha256(file_bytes).hexdigest()
-        filename = f"capture_{file_hash}{ext}"
-    save_path = save_dir / filename
+@csrf_exempt
+@require_http_methods(["POST"])
+def capture_invoice(request):
+    """
+    拍照上傳：一次請求同時儲存原圖與 OCR 裁切圖並開始辨識
 
-    # 同名時直接覆寫，確保用最新更新
-    with open(save_path, 'wb') as f:
-        f.write(file_bytes)
+    取代 camera.js 原本「存原圖 → 下載回來 → 存裁切圖 → 再上傳辨識」的多次傳輸
+
+    接受 multipart/form-data:
+        - image: 前端裁切、處理後的 OCR 影像（用來辨識）
+        - original: 原始相片（只儲存，可省略）
+
+    影像存入影像庫（以內容雜湊命名，重送不會重複儲存）；確認頁儲存發票時
+    原圖（沒有原圖時為裁切圖）寫入 Invoice.image，未被參照的影像由 gc_images 清除
+
+    回傳:
+        {
+            'success': true,
+            'data': {...},                      # 同 /api/process/
+            'image': {'name', 'url', 'thumbnail_url', 'filename', 'created'},
+            'original': 同上 或 null
+        }
+    """
+    if not request.FILES.get('image'):
+        return JsonResponse({
+            'success': False,
+            'error': '沒有收到影像檔案'
+        }, status=400)
+
+    image_file = request.FILES['image']
+    original_file = request.FILES.get('original')
+    with contextlib.ExitStack() as uploads:
+        try:
+            image = uploads.enter_context(SpooledUpload.from_file(image_file))
+            original = uploads.enter_context(SpooledUpload.from_file(original_file)) if original_file else None
+        except ImageAdapterError as e:
+            return _upload_error(e)
+
+        store = ImageStore.default()
+        stored = {
+            'image': store.put(image, _image_extension(image_file)),
+            'original': store.put(original, _image_extension(original_file)) if original else None
+        }
+        logger.info(f"拍照上傳: image={stored['image']['filename']}, original={stored['original'] and stored['original']['filename']}")
 
-    static_base = settings.STATIC_URL
-    if not static_base.startswith('/'):
-        static_base = '/' + static_base
-    url = f"{static_base}imgs/{filename}"
+        try:
+            outcome = InvoicePipeline.run(image)
+        except Exception as e:
+            message, status = InvoicePipeline.describe_error(e)
+            if status >= 500:
+                logger.exception("處理發票時發生錯誤")
+            return JsonResponse({
+                'success': False,
+                'error': message,
+                **stored
+            }, status=status)
 
+    _store_session(request, outcome, image=(stored['original'] or stored['image'])['name'])
     return JsonResponse({
         'success': True,
-        'url': url,
-        'filename': filename
+        'data': outcome['data'],
+        'cached': outcome['cached'],
+        **stored
     })
 
 
@@ -84,7 +154,10 @@ def process_invoice(request):
     
     接受:
         - multipart/form-data: image (檔案上傳)
-        - application/json: image_base64 (base64 字串)
+        - application/json（api/serializers.py InvoiceUploadSerializer）:
+            - raw_qrs: 手機已掃描的 QR 字串（左右兩個）→ 直接解析，不需上傳影像
+            - raw_text: 手機已辨識的文字 → 直接解析
+            - image / image_base64: base64 影像
     
     回傳:
         {
@@ -99,82 +172,58 @@ def process_invoice(request):
             }
         }
     """
+    # 取得影像（寫入暫存檔，見 services/upload_ingest.py）
+    image = None
     try:
-        # 取得影像
-        image = None
-        
         # Case 1: 檔案上傳
         if request.FILES.get('image'):
             print('api/views.py process_invoice() - file upload detected')
             file = request.FILES['image']
-            image = ImageAdapter.from_source(file.read())
-            print('api/views.py process_invoice() - image loaded from file')
-            print(f'api/views.py process_invoice() - image name: {image}, image size: {image.size}')
+            image = SpooledUpload.from_file(file)
+            print('api/views.py process_invoice() - image spooled from file')
+            print(f'api/views.py process_invoice() - image name: {file.name}, image bytes: {image.size}, pixels: {image.dimensions}')
         
-        # Case 2: Base64
+        # Case 2: JSON（InvoiceUploadSerializer）
         elif request.content_type == 'application/json':
-            print('api/views.py process_invoice() - JSON base64 detected')
-            data = json.loads(request.body)
-            image_base64 = data.get('image_base64')
-            print('api/views.py process_invoice() - base64 image loaded')
+            print('api/views.py process_invoice() - JSON detected')
+            serializer = InvoiceUploadSerializer(data=json.loads(request.body))
+            if not serializer.is_valid():
+                return JsonResponse({
+                    'success': False,
+                    'error': '輸入資料格式錯誤',
+                    'errors': serializer.errors
+                }, status=400)
+            data = serializer.validated_data
+
+            # 手機已掃描 QR / 已 OCR：不上傳影像，直接解析與分類
+            if data.get('raw_qrs') or data.get('raw_text'):
+                print(f"api/views.py process_invoice() - raw input: raw_qrs={len(data.get('raw_qrs') or [])}, raw_text={len(data.get('raw_text') or '')}")
+                outcome = InvoicePipeline.from_raw(data.get('raw_qrs'), data.get('raw_text'))
+                _store_session(request, outcome)
+                print("api/views.py process_invoice() - end")
+                return JsonResponse({
+                    'success': True,
+                    'data': outcome['data']
+                })
+
+            image_base64 = data.get('image')
             print(f'api/views.py process_invoice() - image_base64 length: {len(image_base64) if image_base64 else 0}')
             if image_base64:
-                print('api/views.py process_invoice() - converting base64 to image')
-                image = ImageAdapter.from_source(image_base64)
+                print('api/views.py process_invoice() - decoding base64 image')
+                image = SpooledUpload.from_base64(image_base64)
         
-        if image is None:
+        # 以暫存檔交給流程（寫入時已計算雜湊），同一張影像重送時可命中辨識結果快取
+        if not image:
             return JsonResponse({
                 'success': False,
                 'error': '缺少影像資料'
             }, status=400)
         
-        # 步驟 1: 嘗試 QR Code
-        qr_result = QRService.decode(image)
-        print("api/views.py QRService.decode() - result:")
-        # print(f'QR Code result: {qr_result}')
-        raw_qrs = qr_result.get('raw_qrs', [])
-        print(f'api/views.py process_invoice() - Raw QR codes: {raw_qrs}')
-        
-        parsed_data = None
-        
-        if raw_qrs:
-            # 有 QR → 解析 QR
-            logger.info(f"檢測到 {len(raw_qrs)} 個 QR Code")
-            print(f"api/views.py process_invoice() - 檢測到 {len(raw_qrs)} 個 QR Code")
-            parsed_data = InvoiceParser.parse_qr(raw_qrs)
-            print(f"api/views.py process_invoice() - \n\tParsed data from QR: {parsed_data}")
-            request.session['raw_qr_data'] = raw_qrs
-        else:
-            # 無 QR → 使用 OCR
-            logger.info("未檢測到 QR Code，使用 OCR")
-            print("api/views.py process_invoice() - 未檢測到 QR Code，使用 OCR")
-            ocr_service = OCRService()
-            ocr_result = ocr_service.extract_text(image)
-            raw_text = ocr_result.get('raw_text', '')
-            
-            if not raw_text:
-                return JsonResponse({
-                    'success': False,
-                    'error': '無法辨識發票內容'
-                }, status=400)
-            
-            request.session['raw_ocr_data'] = raw_text
-            parsed_data = InvoiceParser.parse_ocr(raw_text)
-        
-        # 步驟 2: 分類
-        classified_result = InvoiceClassifier.classify(parsed_data)
-        print(f'api/views.py process_invoice() - \n\tClassified result: \n\t{classified_result}')
-        # 合併結果
-        result = {
-            **parsed_data,
-            'category': classified_result['main_category'],
-            'subcategory': classified_result['main_subcategory'],
-            'items': classified_result['items']
-        }
-        print(f"api/views.py process_invoice() - \n\tFinal result: {result}")
+        outcome = InvoicePipeline.run(image)
+        result = outcome['data']
+        print(f"api/views.py process_invoice() - \n\tFinal result (cached={outcome['cached']}): {result}")
 
-        request.session['invoice_data'] = result
-        request.session.modified = True
+        _store_session(request, outcome)
         
         print("api/views.py process_invoice() - returning JsonResponse")
         print(f"api/views.py process_invoice() - end")
@@ -190,6 +239,19 @@ def process_invoice(request):
             'error': f'影像處理失敗: {str(e)}'
         }, status=400)
         
+    except InvoiceNotRecognized as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+    except OCREngineUnavailable as e:
+        logger.error(f"OCR 引擎忙碌: {e}")
+        return JsonResponse({
+            'success': False,
+            'error': '辨識服務忙碌中，請稍後再試'
+        }, status=503)
+
     except ValueError as e:
         logger.error(f"解析錯誤: {e}")
         return JsonResponse({
@@ -203,3 +265,227 @@ def process_invoice(request):
             'success': False,
             'error': '系統錯誤，請稍後再試'
         }, status=500)
+
+    finally:
+        if image is not None:
+            image.close()
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def process_batch(request):
+    """
+    批次辨識多張發票
+
+    接受 multipart/form-data 的多個 images 檔案，或 zip 壓縮檔（可混用）；
+    以行程池平行處理，結果依完成順序以 NDJSON 逐行回傳：
+        {"index": 0, "filename": "a.jpg", "success": true, "status": 200, "data": {...}, "elapsed": 1.2}
+        ...
+        {"done": true, "count": 12, "succeeded": 11, "elapsed": 8.4}
+    批次結果不寫入 session（不經確認頁）；影像寫入暫存目錄，回應結束後刪除
+    """
+    files = request.FILES.getlist('images') + request.FILES.getlist('image') + request.FILES.getlist('archive')
+    try:
+        entries = BatchProcessor.collect((file.name, file) for file in files)
+    except BatchError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+    if not entries:
+        entries.close()
+        return JsonResponse({
+            'success': False,
+            'error': '缺少影像資料'
+        }, status=400)
+
+    logger.info(f"批次辨識 {len(entries)} 張影像")
+
+    def _lines():
+        started = time.perf_counter()
+        succeeded = 0
+        try:
+            for result in BatchProcessor.process(entries):
+                succeeded += result['success']
+                yield json.dumps(result, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+        finally:
+            entries.close()
+        yield json.dumps({
+            'done': True,
+            'count': len(entries),
+            'succeeded': succeeded,
+            'elapsed': round(time.perf_counter() - started, 3)
+        }) + '\n'
+
+    response = StreamingHttpResponse(_lines(), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _store_session(request, outcome, image=None):
+    """
+    辨識結果寫入 session，供確認頁（client/views.py ConfirmView）使用
+
+    image 為影像庫中的名稱，確認後存入 Invoice.image；沒有影像時清除前一次拍照留下的名稱
+    """
+    if image:
+        request.session['invoice_image'] = image
+    else:
+        request.session.pop('invoice_image', None)
+    if outcome.get('raw_qr_data'):
+        request.session['raw_qr_data'] = outcome['raw_qr_data']
+    if outcome.get('raw_ocr_data'):
+        request.session['raw_ocr_data'] = outcome['raw_ocr_data']
+    request.session['invoice_data'] = outcome['data']
+    request.session.modified = True
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def submit_job(request):
+    """
+    送出背景辨識工作，立即回傳 job id（由 run_invoice_worker 處理）
+
+    接受與 /api/process/ 相同的 image 檔案上傳或 JSON image_base64。
+    用戶端以 GET poll_url 輪詢結果（間隔見回應的 Retry-After）；
+    部署為 WSGI，不提供 SSE 等長連線，避免佔住 worker
+
+    回傳 (202):
+        {'success': true, 'job_id': '...', 'status': 'queued', 'poll_url': '...'}
+    """
+    try:
+        if request.FILES.get('image'):
+            upload = SpooledUpload.from_file(request.FILES['image'])
+        elif request.content_type == 'application/json':
+            image_base64 = json.loads(request.body).get('image_base64')
+            upload = SpooledUpload.from_base64(image_base64) if image_base64 else None
+        else:
+            upload = None
+    except (ValueError, ImageAdapterError) as e:
+        return _upload_error(e)
+
+    # 工作佇列以資料表保存影像，需要完整 bytes（大小 / 像素已在寫入暫存檔時檢查）
+    payload = None
+    if upload is not None:
+        with upload:
+            payload = upload.read()
+
+    if not payload:
+        return JsonResponse({
+            'success': False,
+            'error': '缺少影像資料'
+        }, status=400)
+
+    # 結果只回給送出的 session（job_status 會把結果寫入查詢者的 session）
+    if request.session.session_key is None:
+        request.session.save()
+    job = JobQueue.submit(payload, session_key=request.session.session_key)
+    logger.info(f"已送出辨識工作 {job.pk}（{len(payload)} bytes）")
+    response = JsonResponse({
+        'success': True,
+        'job_id': str(job.pk),
+        'status': job.status,
+        'poll_url': reverse('api:job', args=[job.pk]),
+    }, status=202)
+    response['Retry-After'] = str(getattr(settings, 'INVOICE_JOB_POLL_INTERVAL', 1))
+    return response
+
+
+def _job_body(job):
+    body = {'success': job.status != ProcessingJob.FAILED, 'job_id': str(job.pk), 'status': job.status}
+    if job.status == ProcessingJob.DONE:
+        body['data'] = job.result['data']
+    elif job.status == ProcessingJob.FAILED:
+        body['error'] = job.error
+    return body
+
+
+@require_http_methods(["GET"])
+def job_status(request, job_id):
+    """
+    查詢背景辨識工作
+
+    完成時回傳與 /api/process/ 相同的 data，並寫入 session 供確認頁使用；
+    失敗時回傳與同步 API 相同的錯誤狀態碼；未完成時附 Retry-After；
+    工作不存在、已過期或不是同一個 session 送出的回傳 404
+    """
+    job = ProcessingJob.objects.defer('payload').filter(pk=job_id).first()
+    if job is None or (job.expires_at and job.expires_at < timezone.now()) \
+            or job.session_key != (request.session.session_key or ''):
+        return JsonResponse({
+            'success': False,
+            'error': '工作不存在或已過期'
+        }, status=404)
+
+    if job.status == ProcessingJob.DONE:
+        _store_session(request, job.result)
+    status = (job.error_status or 500) if job.status == ProcessingJob.FAILED else 200
+    response = JsonResponse(_job_body(job), status=status)
+    if not job.finished:
+        response['Retry-After'] = str(getattr(settings, 'INVOICE_JOB_POLL_INTERVAL', 1))
+    return response
+
+
+def _immutable(response, etag):
+    """內容雜湊定址的檔案永遠不會改變，瀏覽器 / CDN 可長期快取"""
+    response['Cache-Control'] = f"public, max-age={getattr(settings, 'IMAGE_STORE_MAX_AGE', 365 * 24 * 3600)}, immutable"
+    response['ETag'] = etag
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def image_file(request, digest, ext):
+    """影像庫原圖"""
+    store = ImageStore.default()
+    name = store.find(digest)
+    if name is None or ImageStore.split(name)[1] != ext:
+        raise Http404('影像不存在')
+    etag = f'"{digest}"'
+    if request.headers.get('If-None-Match') == etag:
+        return _immutable(HttpResponseNotModified(), etag)
+    return _immutable(FileResponse(open(store.path(name), 'rb')), etag)
+
+
+@require_http_methods(["GET", "HEAD"])
+def image_thumbnail(request, digest, size):
+    """影像庫縮圖（WebP，第一次請求時產生）"""
+    etag = f'"{digest}-{size}"'
+    if request.headers.get('If-None-Match') == etag:
+        return _immutable(HttpResponseNotModified(), etag)
+    try:
+        path = ImageStore.default().thumbnail(digest, int(size))
+    except ValueError:
+        raise Http404('不支援的縮圖大小')
+    except ImageAdapterError as e:
+        logger.warning(f"產生縮圖失敗 {digest}: {e}")
+        raise Http404('影像無法讀取')
+    if path is None:
+        raise Http404('影像不存在')
+    return _immutable(FileResponse(open(path, 'rb'), content_type='image/webp'), etag)
+
+
+@require_http_methods(["GET"])
+def cache_stats(request):
+    """辨識結果快取命中統計（本 worker 行程）"""
+    cache = get_result_cache()
+    return JsonResponse({
+        'enabled': cache is not None,
+        'pid': os.getpid(),
+        'stats': cache.stats() if cache is not None else None
+    })
+
+
+@require_http_methods(["GET"])
+def ocr_ready(request):
+    """
+    OCR 引擎池就緒檢查（給負載平衡器 / 部署腳本使用）
+
+    引擎尚未預熱完成時回傳 503，避免冷啟動的 worker 接到使用者請求
+    """
+    stats = get_engine_pool().stats()
+    return JsonResponse({
+        'ready': stats['ready'],
+        'pool': stats
+    }, status=200 if stats['ready'] else 503)
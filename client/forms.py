@@ -112,19 +112,21 @@ class ItemForm(forms.Form):
     
     category = forms.ChoiceField(
         label='分類',
-        choices=[(c.value, c.value) for c in Category],
+        choices=[('', '--- 請選擇 ---')] + [(c.value, c.value) for c in Category],
         required=False,
         widget=forms.Select(attrs={
-            'class': 'form-select item-category',
-            'onchange': 'updateSubCategories(this)'
+            'class': 'form-select form-select-sm item-category'
         })
     )
     
+    # 依主分類分組（optgroup 標籤為主分類 value），form-handler.js 只顯示所選主分類的細分類
     subcategory = forms.ChoiceField(
         label='細分類',
-        choices=[('', '--- 請選擇 ---')] + SubCategory.get_choices(),
+        choices=[('', '--- 請選擇 ---')] + [
+            (c.value, SubCategory.get_choices_by_parent(c)) for c in Category if SubCategory.get_choices_by_parent(c)
+        ],
         required=False,
         widget=forms.Select(attrs={
-            'class': 'form-select item-subcategory'
+            'class': 'form-select form-select-sm item-subcategory'
         })
     )
\ No newline at end of file
@@ -3,8 +3,9 @@ from django.shortcuts import render, redirect
 from django.views.generic import TemplateView
 from django.contrib import messages
 from domain.models import Invoice, Item
-from .forms import InvoiceConfirmForm
+from .forms import InvoiceConfirmForm, ItemForm
 from services.google_sheets import GoogleSheetsService
+from services.category_memo import CategoryMemo
 
 
 class UploadView(TemplateView):
@@ -29,11 +30,25 @@ class ConfirmView(TemplateView):
             form = InvoiceConfirmForm(initial=invoice_data)
             context['form'] = form
             context['items'] = invoice_data.get('items', [])
+            # 每個品項的分類下拉選單（欄位名稱 items-<idx>-category / items-<idx>-subcategory）
+            context['item_forms'] = [
+                (item, ItemForm(prefix=f'items-{idx}', initial=self._item_initial(item)))
+                for idx, item in enumerate(context['items'])
+            ]
         
         print(f"client/views.py ConfirmView.get_context_data() - \n\tcontext after adding form: {context}")
         print("client/views.py ConfirmView.get_context_data() - end")
         return context
     
+    @staticmethod
+    def _item_initial(item):
+        """分類器建議的品項分類（細分類可能是 value 或 label）轉成選單的 value"""
+        classification = CategoryMemo.to_classification(item.get('category'), item.get('subcategory'))
+        if classification is None:
+            return {}
+        subcat, main = classification
+        return {'category': main.value, 'subcategory': subcat.value if subcat else ''}
+
     def post(self, request, *args, **kwargs):
         """處理確認送出"""
         print("client/views.py ConfirmView.post() - start")
@@ -54,11 +69,17 @@ class ConfirmView(TemplateView):
                 invoice_type=form.cleaned_data['invoice_type'],
                 raw_qr_data=request.session.get('raw_qr_data'),
                 raw_ocr_data=request.session.get('raw_ocr_data'),
+                image=request.session.get('invoice_image'),     # 影像庫名稱（api/views.py capture_invoice）
             )
             
             # 儲存品項
             items_data = request.session.get('invoice_data', {}).get('items', [])
             for idx, item_data in enumerate(items_data):
+                # 確認頁的品項分類（items-<idx>-category / items-<idx>-subcategory），沒有送出時沿用分類器的建議
+                suggested = CategoryMemo.to_classification(item_data.get('category'), item_data.get('subcategory'))
+                item_data['category'] = request.POST.get(f'items-{idx}-category', item_data.get('category')) or None
+                item_data['subcategory'] = request.POST.get(f'items-{idx}-subcategory', item_data.get('subcategory')) or None
+                confirmed = CategoryMemo.to_classification(item_data['category'], item_data['subcategory'])
                 Item.objects.create(
                     invoice=invoice,
                     name=item_data['name'],
@@ -68,6 +89,12 @@ class ConfirmView(TemplateView):
                     subcategory=item_data.get('subcategory'),
                     order=idx
                 )
+                # 只記錄使用者改過的分類，分類器自己的建議不當作使用者確認
+                if confirmed is not None and confirmed != suggested:
+                    CategoryMemo.record(
+                        item_data['name'], item_data['category'], item_data.get('subcategory'),
+                        seller_id=invoice.seller_id
+                    )
             
             # 同步到 Google Sheets
             try:
@@ -83,6 +110,7 @@ class ConfirmView(TemplateView):
             request.session.pop('invoice_data', None)
             request.session.pop('raw_qr_data', None)
             request.session.pop('raw_ocr_data', None)
+            request.session.pop('invoice_image', None)
             
             return redirect('client:success')
         
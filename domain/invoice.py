@@ -3,7 +3,7 @@ from typing import List
 from .enums import InvoiceType
 from .item import Item
 
-@dataclass
+@dataclass(slots=True)
 class Invoice:
     number: str
     date: str
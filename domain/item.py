@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 from .enums import Category, SubCategory
 
-@dataclass
+@dataclass(slots=True)
 class Item:
     name: str
     qty: int = 1
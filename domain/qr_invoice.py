@@ -0,0 +1,42 @@
+# domain/qr_invoice.py
+from dataclasses import dataclass
+from typing import Dict, Optional
+from .enums import InvoiceType
+from .invoice import Invoice
+
+
+@dataclass(slots=True)
+class QRInvoice(Invoice):
+    """
+    電子發票 QR Code 完整欄位（見 20260203_發票字軌.txt）
+
+    number / date / total / items 沿用 Invoice，其餘為 QR 規格欄位
+    """
+    invoice_type: InvoiceType = InvoiceType.QR
+    random_code: str = ''               # 隨機碼 (4)
+    sales: int = 0                      # 銷售額（未稅）
+    buyer_id: Optional[str] = None      # 一般消費者為 None
+    seller_id: str = ''
+    verification: str = ''              # 加密驗證資訊 (24)
+    item_count: int = 0                 # 左右兩個 QR 記載的品目筆數
+    total_item_count: int = 0           # 該張發票品目總筆數
+    encoding: Optional[str] = None      # 中文編碼參數 '0' Big5 / '1' UTF-8 / '2' Base64
+
+    def to_dict(self) -> Dict:
+        return {
+            'number': self.number,
+            'date': self.date,
+            'total': self.total,
+            'sales': self.sales,
+            'random_code': self.random_code,
+            'buyer_id': self.buyer_id,
+            'seller_id': self.seller_id,
+            'item_count': self.item_count,
+            'total_item_count': self.total_item_count,
+            'encoding': self.encoding,
+            'items': [
+                {'name': item.name, 'qty': item.qty, 'price': item.price}
+                for item in self.items
+            ],
+            'invoice_type': self.invoice_type.value
+        }
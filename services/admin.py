@@ -1,3 +1,41 @@
+# services/admin.py
 from django.contrib import admin
+from .models import ClassificationRule, ClassificationRuleVersion, ItemCategoryMemo, ProcessingJob
 
-# Register your models here.
+
+@admin.register(ItemCategoryMemo)
+class ItemCategoryMemoAdmin(admin.ModelAdmin):
+    list_display = ('name', 'seller_id', 'category', 'subcategory', 'hits', 'updated_at')
+    search_fields = ('name', 'seller_id')
+    list_filter = ('category',)
+
+
+@admin.register(ClassificationRule)
+class ClassificationRuleAdmin(admin.ModelAdmin):
+    list_display = ('priority', 'category', 'subcategory', 'keywords', 'is_active', 'updated_at')
+    list_display_links = ('category',)
+    list_editable = ('priority', 'is_active')
+    list_filter = ('category', 'is_active')
+    search_fields = ('keywords',)
+
+
+@admin.register(ClassificationRuleVersion)
+class ClassificationRuleVersionAdmin(admin.ModelAdmin):
+    list_display = ('version', 'updated_at')
+    readonly_fields = ('version', 'updated_at')
+
+    # 單列（pk=1，由 migration 建立），刪除會讓版本號重新計算
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProcessingJob)
+class ProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'attempts', 'lease_owner', 'created_at', 'finished_at', 'expires_at')
+    list_filter = ('status',)
+    exclude = ('payload',)
+    readonly_fields = ('status', 'result', 'error', 'error_status', 'attempts', 'lease_owner',
+                       'lease_expires_at', 'finished_at', 'expires_at')
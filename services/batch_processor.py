@@ -0,0 +1,250 @@
+# services/batch_processor.py
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+from django.conf import settings
+from services.image_adapter import ImageAdapterError
+from services.upload_ingest import SpooledUpload, UploadRejected
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff', '.gif'}
+ZIP_MAGIC = b'PK\x03\x04'
+
+
+class BatchError(Exception):
+    """批次上傳內容不合法（壓縮檔損毀、張數或大小超過上限）"""
+    pass
+
+
+class BatchUpload:
+    """
+    批次上傳影像的暫存目錄（每個請求一個）
+
+    每張影像逐塊寫入 FILE_UPLOAD_TEMP_DIR 下的暫存檔，子行程以路徑讀取，
+    web 行程不保留整批影像的 bytes；close() 刪除整個目錄
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._dir = tempfile.TemporaryDirectory(prefix='batch-', dir=getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None))
+        self.entries: List[Tuple[str, str]] = []     # [(檔名, 暫存檔路徑), ...]
+
+    def spool(self, source: BinaryIO, max_bytes: int, label: str, head: bytes = b'') -> str:
+        """寫入一個暫存檔（head 為已先讀取的開頭；超過 max_bytes 拋出 BatchError），回傳路徑"""
+        fd, path = tempfile.mkstemp(dir=self._dir.name)
+        size = 0
+        with os.fdopen(fd, 'wb') as f:
+            chunk = head
+            while True:
+                if not chunk:
+                    chunk = source.read(BatchUpload.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                size += len(chunk)
+                # 不信任 zip 標頭的大小，實際讀取也限制上限
+                if size > max_bytes:
+                    raise BatchError(f"{label} 超過 {max_bytes} bytes")
+                f.write(chunk)
+                chunk = b''
+        return path
+
+    def add(self, name: str, path: str):
+        """
+        加入一張影像；只讀取標頭檢查像素數（同單張上傳的 UPLOAD_MAX_PIXELS），
+        超過上限拋出 BatchError，整批不送入行程池。無法辨識的影像留給子行程回傳該筆的錯誤
+        """
+        try:
+            SpooledUpload.inspect(path)
+        except UploadRejected as e:
+            raise BatchError(f"{name}: {e}")
+        except ImageAdapterError:
+            pass
+        self.entries.append((name, path))
+
+    def close(self):
+        self._dir.cleanup()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BatchProcessor:
+    """
+    多張發票批次辨識
+
+    影像分派到行程池（每個行程各自跑 ImageAdapter → QRService → InvoiceParser → InvoiceClassifier），
+    以完成順序逐筆回傳，第一筆結果約等於單張發票的處理時間
+    """
+
+    MAX_IMAGES = 100
+    MAX_IMAGE_BYTES = 20 * 1024 * 1024
+    POOL_SIZE = 2
+
+    @staticmethod
+    def collect(files: Iterable[Tuple[str, BinaryIO]]) -> BatchUpload:
+        """
+        展開上傳的檔案並寫入暫存目錄：zip 取出其中的影像，其餘檔案視為影像
+
+        Args:
+            files: [(檔名, 可讀取的檔案物件), ...]（例如 Django UploadedFile）
+
+        Returns:
+            BatchUpload（呼叫端負責 close）；檢查失敗時已刪除暫存檔
+        """
+        max_images = getattr(settings, 'BATCH_MAX_IMAGES', BatchProcessor.MAX_IMAGES)
+        max_bytes = getattr(settings, 'BATCH_MAX_IMAGE_BYTES', BatchProcessor.MAX_IMAGE_BYTES)
+        batch = BatchUpload()
+        try:
+            for name, source in files:
+                # 先讀開頭判斷是否為壓縮檔，影像在寫入時就以單張上限檢查
+                head = source.read(BatchUpload.CHUNK_SIZE)
+                archive = head.startswith(ZIP_MAGIC) or name.lower().endswith('.zip')
+                limit = max_bytes * max_images if archive else max_bytes
+                path = batch.spool(source, limit, name, head)
+                if archive and zipfile.is_zipfile(path):
+                    BatchProcessor._unzip(batch, name, path, max_bytes, max_images - len(batch))
+                    os.remove(path)
+                else:
+                    if os.path.getsize(path) > max_bytes:
+                        raise BatchError(f"{name} 超過 {max_bytes} bytes")
+                    batch.add(name, path)
+                if len(batch) > max_images:
+                    raise BatchError(f"一次最多 {max_images} 張影像")
+        except BaseException:
+            batch.close()
+            raise
+        return batch
+
+    @staticmethod
+    def process(entries: Iterable[Tuple[str, str]]) -> Iterator[Dict]:
+        """
+        平行辨識，依完成順序產生結果
+
+        Args:
+            entries: [(檔名, 影像檔路徑), ...]（BatchUpload）
+
+        Yields:
+            {'index', 'filename', 'success', 'status', 'data' 或 'error', 'elapsed'}
+        """
+        pool = get_process_pool()
+        futures = {
+            pool.submit(_run, name, path): (index, name)
+            for index, (name, path) in enumerate(entries)
+        }
+        try:
+            for future in as_completed(futures):
+                index, name = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    # 子行程異常結束（例如 OCR 引擎崩潰），下次請求重建行程池
+                    logger.exception("批次辨識行程池失效")
+                    reset_process_pool(pool)
+                    result = {'success': False, 'status': 500, 'error': '系統錯誤，請稍後再試', 'elapsed': 0.0}
+                yield {'index': index, 'filename': name, **result}
+        finally:
+            # 用戶端中途斷線：尚未開始的影像不再處理
+            for future in futures:
+                future.cancel()
+
+    @staticmethod
+    def _unzip(batch: BatchUpload, archive: str, path: str, max_bytes: int, remaining: int):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                infos = [
+                    info for info in zf.infolist()
+                    if not info.is_dir()
+                    and not info.filename.startswith('__MACOSX/')
+                    and PurePosixPath(info.filename).suffix.lower() in IMAGE_EXTENSIONS
+                ]
+                if len(infos) > remaining:
+                    raise BatchError(f"{archive} 內的影像超過上限")
+                for info in sorted(infos, key=lambda i: i.filename):
+                    name = f"{archive}/{info.filename}"
+                    if info.file_size > max_bytes:
+                        raise BatchError(f"{name} 超過 {max_bytes} bytes")
+                    with zf.open(info) as f:
+                        batch.add(name, batch.spool(f, max_bytes, name))
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError, RuntimeError) as e:
+            raise BatchError(f"{archive} 無法解壓縮: {e}")
+
+
+def _init_worker(settings_module: str):
+    """行程池子行程初始化（spawn 啟動，需自行載入 Django）"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    from django.conf import settings as worker_settings
+    # 每個子行程一次只處理一張，一個 OCR 引擎即可
+    worker_settings.OCR_ENGINE_POOL_SIZE = 1
+
+
+def _run(name: str, path: str) -> Dict:
+    """在子行程中處理一張影像（由暫存檔讀取）；Django 於 _init_worker 載入後才能匯入流程模組"""
+    from services.invoice_pipeline import InvoicePipeline
+    started = time.perf_counter()
+    try:
+        outcome = InvoicePipeline.run(Path(path).read_bytes())
+    except Exception as e:
+        message, status = InvoicePipeline.describe_error(e)
+        if status >= 500:
+            logger.exception(f"批次辨識 {name} 失敗")
+        return {'success': False, 'status': status, 'error': message,
+                'elapsed': round(time.perf_counter() - started, 3)}
+    return {'success': True, 'status': 200, 'data': outcome['data'],
+            'elapsed': round(time.perf_counter() - started, 3)}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    行程共用的批次辨識行程池（BATCH_PROCESS_POOL_SIZE 個行程，預設 2 個）
+
+    以 spawn 啟動子行程，避免 fork 複製 web server 的執行緒與資料庫連線。
+    每個子行程各載入一個 OCR 引擎，且每個 web worker 行程各有一個行程池，
+    整台主機的引擎數為 web worker 數 × BATCH_PROCESS_POOL_SIZE，不依 CPU 核心數放大
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                size = getattr(settings, 'BATCH_PROCESS_POOL_SIZE', None) or BatchProcessor.POOL_SIZE
+                _pool = ProcessPoolExecutor(
+                    max_workers=size,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE),)
+                )
+                logger.info(f"批次辨識行程池已建立: {size} 個行程")
+    return _pool
+
+
+def reset_process_pool(pool=None):
+    """丟棄行程池（pool 不是目前的行程池時不處理）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (pool is None or pool is _pool):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
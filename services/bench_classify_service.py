@@ -0,0 +1,51 @@
+# services/bench_classify_service.py
+"""
+品項分類微基準測試：原本的巢狀迴圈 vs KeywordAutomaton
+
+執行: python -m services.bench_classify_service [次數]
+"""
+import sys
+import timeit
+from domain.enums import Category
+from services.classify_service import InvoiceClassifier, KeywordMatcher
+
+# Costco 明細常見品名（大多不含關鍵字，巢狀迴圈要跑完所有規則）
+NAMES = [
+    '科克蘭衛生紙', '可口可樂 1250CC', '野川蛋黃派10粒', 'KS 有機冷壓初榨橄欖油', '好市多烤雞',
+    '三洋微波爐', '科克蘭綜合堅果 1.13公斤', '桂格大燕麥片', '舒潔拉拉抽', '義美小泡芙',
+    '台鐵便當', '停車費', '中油 95 無鉛汽油', '科克蘭保鮮膜', 'ZESPRI 黃金奇異果',
+    '美國 Choice 板腱牛排', '科克蘭洗碗精', '電影票', '費列羅金莎巧克力', '高鐵票',
+] * 5
+
+
+def nested_loops(item_name: str):
+    """原本的 _classify_item：依序檢查每條規則的每個關鍵字"""
+    for subcat, keywords in InvoiceClassifier.SUBCATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in item_name:
+                return subcat, subcat.parent
+    for category, keywords in InvoiceClassifier.KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in item_name:
+                return None, category
+    return None, Category.OTHER
+
+
+def run(number: int = 200):
+    matcher = KeywordMatcher.from_tables(InvoiceClassifier.SUBCATEGORY_KEYWORDS, InvoiceClassifier.KEYWORDS)
+    mismatches = [name for name in NAMES if nested_loops(name) != matcher.match(name)]
+    if mismatches:
+        raise SystemExit(f"分類結果不一致: {mismatches}")
+
+    cases = {
+        'nested_loops': lambda: [nested_loops(name) for name in NAMES],
+        'automaton': lambda: [matcher.match(name) for name in NAMES],
+    }
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        items = number * len(NAMES)
+        print(f"{name:<14} {items / seconds:>12,.0f} items/s  {seconds / items * 1e6:.2f} µs/item")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,46 @@
+# services/bench_image_adapter.py
+"""
+影像解碼基準測試：ImageAdapter.from_source（原始解析度 RGB）與 DecodedImage（依用途縮小解碼）
+
+執行: python -m services.bench_image_adapter [影像檔]（未指定時產生 4000x3000 JPEG）
+"""
+import io
+import sys
+import time
+import numpy as np
+from PIL import Image
+from services.image_adapter import DecodedImage, ImageAdapter
+
+
+def sample_jpeg() -> bytes:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (3000, 4000, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def measure(name, decode, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        image = decode()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    pixel_bytes = image.width * image.height * len(image.getbands())
+    print(f"{name:<28} {best * 1000:>8.1f} ms  {image.size[0]}x{image.size[1]} {image.mode:<3} {pixel_bytes / 2 ** 20:>6.1f} MiB")
+
+
+def run(data: bytes):
+    measure('from_source (RGB full)', lambda: ImageAdapter.from_source(data))
+    measure('DecodedImage L full', lambda: DecodedImage(data).get('L'))
+    measure('DecodedImage L 2000', lambda: DecodedImage(data).get('L', 2000))
+    measure('DecodedImage L 800 (QR)', lambda: DecodedImage(data).get('L', 800))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            run(f.read())
+    else:
+        run(sample_jpeg())
@@ -0,0 +1,30 @@
+# services/bench_invoice_parser.py
+"""
+QR 解析微基準測試
+
+執行: python -m services.bench_invoice_parser [次數]
+"""
+import sys
+import timeit
+from services.invoice_parser import InvoiceParser
+
+HEADER = "DF622694131110708397000000062000000670000000008547587XKsayZY706hvyFpe6k3TQA=="
+ITEMS = ':'.join(f"品項{i:02d}:1:{10 + i}" for i in range(20))
+
+CASES = {
+    'header_only': [HEADER],
+    'left_2_items': [HEADER + ":**********:2:2:1:野川蛋黃派10粒:1:65:可口可樂1250CC:1:38"],
+    'left_right_20_items': [HEADER + ":**********:4:20:1:" + ITEMS[:60], "**" + ITEMS[60:]],
+}
+
+
+def run(number: int = 100000):
+    for name, raw_qrs in CASES.items():
+        seconds = min(timeit.repeat(
+            lambda: InvoiceParser.parse_qr_record(raw_qrs), number=number, repeat=3
+        ))
+        print(f"{name:<22} {number / seconds:>12,.0f} parses/s  {seconds / number * 1e6:.2f} µs/parse")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
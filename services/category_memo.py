@@ -0,0 +1,185 @@
+# services/category_memo.py
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from django.conf import settings
+from django.db import DatabaseError
+from domain.enums import Category, SubCategory
+
+logger = logging.getLogger(__name__)
+
+Classification = Tuple[Optional[SubCategory], Category]
+
+_MISSING = object()
+_cache = OrderedDict()      # (正規化品名, 賣方統編) → (Classification 或 None（查過但沒有）, 到期時間)
+_cache_lock = threading.Lock()
+
+
+class CategoryMemo:
+    """
+    使用者確認過的品名分類
+
+    發票確認時記錄每個品項最後確認的分類（同一賣方一筆、不分賣方一筆），
+    分類時先查這裡再走關鍵字比對。查詢結果（含查無資料）保留在行程內的 LRU
+    ITEM_MEMO_CACHE_TTL 秒，重複購買的品項不需再查資料庫；
+    其他行程（其他 web worker）寫入的紀錄最晚在到期後生效
+    """
+
+    GENERIC_SELLER = ''
+    CACHE_TTL = 300.0
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """全形轉半形、英文小寫、去除空白與標點"""
+        text = unicodedata.normalize('NFKC', name or '').casefold()
+        return ''.join(
+            char for char in text
+            if not (char.isspace() or unicodedata.category(char).startswith('P'))
+        )[:100]
+
+    @staticmethod
+    def lookup(name: str, seller_id: Optional[str] = None) -> Optional[Classification]:
+        return CategoryMemo.lookup_many([name], seller_id).get(name)
+
+    @staticmethod
+    def lookup_many(names: Iterable[str], seller_id: Optional[str] = None) -> Dict[str, Classification]:
+        """
+        查詢多個品名，同一賣方的紀錄優先於不分賣方的紀錄
+
+        Returns:
+            {品名: (細分類, 主分類)}，只包含有紀錄的品名
+        """
+        if not getattr(settings, 'ITEM_MEMO_ENABLED', True):
+            return {}
+        seller_id = seller_id or CategoryMemo.GENERIC_SELLER
+        wanted = {}
+        for name in names:
+            normalized = CategoryMemo.normalize(name)
+            if normalized:
+                wanted[name] = [(normalized, seller_id), (normalized, CategoryMemo.GENERIC_SELLER)]
+
+        keys = {key for candidates in wanted.values() for key in candidates}
+        found = {key: CategoryMemo._cached(key) for key in keys}
+        missing = [key for key, value in found.items() if value is _MISSING]
+        if missing:
+            found.update(CategoryMemo._load(missing))
+
+        result = {}
+        for name, candidates in wanted.items():
+            for key in candidates:
+                if found.get(key) is not None:
+                    result[name] = found[key]
+                    break
+        return result
+
+    @staticmethod
+    def record(name: str, category: str, subcategory: Optional[str] = None,
+               seller_id: Optional[str] = None):
+        """
+        記錄使用者確認的分類（發票確認時呼叫）
+
+        Args:
+            category: Category 的 value
+            subcategory: SubCategory 的 value 或 label
+        """
+        from services.models import ItemCategoryMemo
+
+        normalized = CategoryMemo.normalize(name)
+        classification = CategoryMemo.to_classification(category, subcategory)
+        if not normalized or classification is None:
+            return
+        subcat, main = classification
+        sellers = {seller_id or CategoryMemo.GENERIC_SELLER, CategoryMemo.GENERIC_SELLER}
+        grown = False
+        for seller in sellers:
+            memo, created = ItemCategoryMemo.objects.get_or_create(
+                name=normalized, seller_id=seller,
+                defaults={'category': main.value, 'subcategory': subcat.value if subcat else None}
+            )
+            grown = grown or created
+            if not created:
+                memo.category = main.value
+                memo.subcategory = subcat.value if subcat else None
+                memo.hits += 1
+                memo.save(update_fields=['category', 'subcategory', 'hits', 'updated_at'])
+            CategoryMemo._store((normalized, seller), classification)
+        if grown:
+            CategoryMemo.prune()
+
+    @staticmethod
+    def prune(max_rows: Optional[int] = None) -> int:
+        """只保留最近更新的 max_rows 筆（預設 settings.ITEM_MEMO_MAX_ROWS），回傳刪除筆數"""
+        from services.models import ItemCategoryMemo
+
+        if max_rows is None:
+            max_rows = getattr(settings, 'ITEM_MEMO_MAX_ROWS', 50000)
+        stale = ItemCategoryMemo.objects.order_by('-updated_at').values_list('pk', flat=True)[max_rows:]
+        deleted, _ = ItemCategoryMemo.objects.filter(pk__in=list(stale)).delete()
+        if deleted:
+            CategoryMemo.clear_cache()
+        return deleted
+
+    @staticmethod
+    def clear_cache():
+        with _cache_lock:
+            _cache.clear()
+
+    @staticmethod
+    def _load(keys) -> Dict:
+        from services.models import ItemCategoryMemo
+
+        names = {name for name, _ in keys}
+        sellers = {seller for _, seller in keys}
+        loaded = dict.fromkeys(keys)
+        try:
+            rows = ItemCategoryMemo.objects.filter(name__in=names, seller_id__in=sellers).values_list(
+                'name', 'seller_id', 'category', 'subcategory'
+            )
+            for name, seller, category, subcategory in rows:
+                if (name, seller) in loaded:
+                    loaded[(name, seller)] = CategoryMemo.to_classification(category, subcategory)
+        except DatabaseError as e:
+            logger.warning(f"讀取品名分類紀錄失敗: {e}")
+            return loaded
+        for key, value in loaded.items():
+            CategoryMemo._store(key, value)
+        return loaded
+
+    @staticmethod
+    def _cached(key):
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires = entry
+            if expires < time.monotonic():
+                del _cache[key]
+                return _MISSING
+            _cache.move_to_end(key)
+            return value
+
+    @staticmethod
+    def _store(key, value):
+        expires = time.monotonic() + getattr(settings, 'ITEM_MEMO_CACHE_TTL', CategoryMemo.CACHE_TTL)
+        with _cache_lock:
+            _cache[key] = (value, expires)
+            _cache.move_to_end(key)
+            while len(_cache) > getattr(settings, 'ITEM_MEMO_CACHE_SIZE', 4096):
+                _cache.popitem(last=False)
+
+    @staticmethod
+    def to_classification(category: str, subcategory: Optional[str]) -> Optional[Classification]:
+        """Category value 與 SubCategory value / label 轉成列舉，主分類不合法時回傳 None"""
+        try:
+            main = Category(category)
+        except ValueError:
+            return None
+        subcat = None
+        if subcategory:
+            subcat = SubCategory.from_value(subcategory) or next(
+                (item for item in SubCategory if item.label == subcategory), None
+            )
+        return subcat, main
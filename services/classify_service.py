@@ -1,12 +1,28 @@
 # services/classify_service.py
-from typing import Dict, List
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from django.conf import settings
+from django.core.exceptions import AppRegistryNotReady, ImproperlyConfigured
+from django.db import DatabaseError
 from domain.enums import Category, SubCategory
+from services.category_memo import CategoryMemo
+from services.keyword_automaton import KeywordAutomaton
+from services.ngram_classifier import get_classifier
+from services.seller_index import get_seller_index
+
+logger = logging.getLogger(__name__)
+
+_snapshot = None
+_matcher_lock = threading.Lock()
 
 
 class InvoiceClassifier:
     """發票分類器"""
     
-    # 分類關鍵字規則
+    # 分類關鍵字規則（預設值；實際使用資料表 ClassificationRule，見 matcher()）
     KEYWORDS = {
         Category.FOOD: ['蛋', '飯', '麵', '肉', '飲', '可樂', '咖啡', '茶', '餐', '食'],
         Category.HOUSEHOLD_GOODS: ['衛生紙', '清潔', '洗', '杯', '袋', '紙巾'],
@@ -48,6 +64,8 @@ class InvoiceClassifier:
         Returns:
             {
                 'main_category': 'food',
+                'main_subcategory': 'drink',
+                'seller_name': '賣方索引中的店名，查無資料為 None',
                 'items': [
                     {'name': '...', 'qty': 1, 'price': 65, 'category': 'food'},
                     ...
@@ -55,17 +73,70 @@ class InvoiceClassifier:
             }
         """
         print("services/classify_service.py InvoiceClassifier.classify() - start")
-        items = parsed_data.get('items', [])
+        result = InvoiceClassifier.classify_batch([parsed_data])[0]
+        # print(f"主分類: {result['main_category']}, 分類後品項: {result['items']}")
+        print("services/classify_service.py InvoiceClassifier.classify() - end")
+        return result
+
+    @staticmethod
+    def classify_batch(invoices: List[Dict]) -> List[Dict]:
+        """
+        整批分類多張發票，每張的結果與 classify() 相同
+
+        整批共用同一個關鍵字比對器，關鍵字分不出來的品項集中一次交給 n-gram 分類器
+        （重新分類歷史資料時避免逐張呼叫）
+        """
+        index = get_seller_index()
+        matcher = None
+        sellers = []
+        all_items = []
+        results = []
+        decided = set()     # 賣方或使用者確認過的分類，不交給 n-gram 分類器
+        for parsed_data in invoices:
+            items = parsed_data.get('items', [])
+            seller = index.get(parsed_data.get('seller_id')) if index is not None else None
+            sellers.append(seller)
+            start = len(results)
+            if seller is not None and seller.confident:
+                # 高信心賣方（加油站、停車場…）整張發票直接採用賣方分類
+                results.extend([(seller.subcategory, seller.category)] * len(items))
+                decided.update(range(start, start + len(items)))
+            else:
+                if matcher is None:
+                    matcher = InvoiceClassifier.matcher()
+                # 使用者確認過的品名優先，其餘才走關鍵字比對
+                memo = CategoryMemo.lookup_many(
+                    [item['name'] for item in items], parsed_data.get('seller_id')
+                )
+                for offset, item in enumerate(items):
+                    if item['name'] in memo:
+                        results.append(memo[item['name']])
+                        decided.add(start + offset)
+                    else:
+                        results.append(InvoiceClassifier._classify_item(item['name'], matcher))
+            all_items.extend(items)
+        # 關鍵字規則分不出來的品項，整批交給 n-gram 分類器
+        InvoiceClassifier._fallback(all_items, results, decided)
+
+        classified = []
+        start = 0
+        for parsed_data, seller in zip(invoices, sellers):
+            items = parsed_data.get('items', [])
+            classified.append(InvoiceClassifier._summarize(items, results[start:start + len(items)], seller))
+            start += len(items)
+        return classified
+
+    @staticmethod
+    def _summarize(items: List[Dict], results: List[Tuple[Optional[SubCategory], Category]], seller) -> Dict:
+        """寫回品項分類並決定主分類"""
         category_count = {}
         subcat_count = {}
         classified_items = []
-        # print(f"Items to classify: {items}")
         # 分類每個品項
-        for item in items:
-            subcat, category = InvoiceClassifier._classify_item(item['name'])
+        for item, (subcat, category) in zip(items, results):
 
             item['category'] = category.value
-            item['subcategory'] = subcat.label if subcat else None
+            item['subcategory'] = subcat.value if subcat else None
 
             classified_items.append(item)
             
@@ -73,32 +144,156 @@ class InvoiceClassifier:
             subcat_count[subcat] = subcat_count.get(subcat, 0) + 1
         
         main_subcategory = max(subcat_count, key=subcat_count.get) if subcat_count else None
-        # 主分類：品項數最多的分類
+        # 主分類：品項數最多的分類；沒有品項（紙本發票）時採用賣方預設分類
         if category_count:
             main_category = max(category_count, key=category_count.get)
+        elif seller is not None and seller.category is not None:
+            main_category, main_subcategory = seller.category, seller.subcategory
         else:
             main_category = Category.OTHER
         
-        # print(f"主分類: {main_category.value}, 分類後品項: {classified_items}")
-        print("services/classify_service.py InvoiceClassifier.classify() - end")
         return {
             'main_category': main_category.value,
             'main_subcategory': main_subcategory.value if main_subcategory else None,
+            'seller_name': seller.name if seller is not None else None,
             'items': classified_items
         }
     
     @staticmethod
-    def _classify_item(item_name: str) -> Category:
-        """根據品名分類"""
-        print(f"services/classify_service.py InvoiceClassifier._classify_item() - \n\tClassifying item: {item_name}")
-        for subcat, keywords in InvoiceClassifier.SUBCATEGORY_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in item_name:
-                    return subcat, subcat.parent
-            
-        for category, keywords in InvoiceClassifier.KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in item_name:
-                    return None, category
-                
-        return  None, Category.OTHER
+    def _classify_item(item_name: str, matcher: Optional['KeywordMatcher'] = None) -> Tuple[Optional[SubCategory], Category]:
+        """根據品名分類：細分類關鍵字優先，其次主分類關鍵字"""
+        if matcher is None:
+            matcher = InvoiceClassifier.matcher()
+        return matcher.match(item_name)
+
+    @staticmethod
+    def _fallback(items: List[Dict], results: List[Tuple[Optional[SubCategory], Category]], decided: Set[int]):
+        """
+        以 n-gram 分類器補上 Category.OTHER 的品項
+
+        decided 中的位置（賣方或使用者確認過的分類）不覆蓋；模型不存在或信心不足時保持不變
+        """
+        pending = [
+            i for i, (subcat, category) in enumerate(results)
+            if subcat is None and category == Category.OTHER and i not in decided
+        ]
+        if not pending:
+            return
+        classifier = get_classifier()
+        if classifier is None:
+            return
+        predictions = classifier.predict([items[i]['name'] for i in pending])
+        for i, prediction in zip(pending, predictions):
+            if prediction is not None:
+                results[i] = prediction
+
+    @staticmethod
+    def matcher() -> 'KeywordMatcher':
+        """
+        取得目前的關鍵字比對器
+
+        規則存放在資料表（ClassificationRule），版本號（ClassificationRuleVersion）
+        改變時才重新編譯並整個替換；版本最多每 CLASSIFY_RULES_CHECK_SECONDS 秒查一次。
+        呼叫端在一次分類中沿用同一個比對器，規則中途更新也不受影響。
+        資料表無法使用時改用類別上的 KEYWORDS / SUBCATEGORY_KEYWORDS
+        """
+        global _snapshot
+        snapshot = _snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - snapshot.checked_at < getattr(settings, 'CLASSIFY_RULES_CHECK_SECONDS', 1.0):
+            return snapshot.matcher
+
+        version = InvoiceClassifier._rules_version()
+        if snapshot is not None and snapshot.version == version:
+            snapshot.checked_at = now
+            return snapshot.matcher
+
+        with _matcher_lock:
+            snapshot = _snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = _RuleSnapshot(version, InvoiceClassifier._build_matcher(version), now)
+                _snapshot = snapshot
+                logger.info(f"分類規則已重新編譯: version={version[0]}, keywords={snapshot.matcher.automaton.size}")
+        return snapshot.matcher
+
+    @staticmethod
+    def _rules_version() -> Tuple:
+        """('db', 版本號)；資料表無法使用時為 ('builtin', 類別規則內容)"""
+        try:
+            from services.models import ClassificationRuleVersion
+            version = ClassificationRuleVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+        except (DatabaseError, ImproperlyConfigured, AppRegistryNotReady):
+            version = None
+        if version is not None:
+            return 'db', version
+        return 'builtin', KeywordMatcher.signature(
+            InvoiceClassifier.SUBCATEGORY_KEYWORDS, InvoiceClassifier.KEYWORDS
+        )
+
+    @staticmethod
+    def _build_matcher(version: Tuple) -> 'KeywordMatcher':
+        if version[0] == 'builtin':
+            return KeywordMatcher.from_tables(InvoiceClassifier.SUBCATEGORY_KEYWORDS, InvoiceClassifier.KEYWORDS)
+
+        from services.models import ClassificationRule
+        subcategory_rules, category_rules = [], []
+        for rule in ClassificationRule.objects.filter(is_active=True).order_by('priority', 'id'):
+            try:
+                category = Category(rule.category)
+            except ValueError:
+                logger.warning(f"略過主分類不合法的規則: {rule.pk} {rule.category}")
+                continue
+            subcat = SubCategory.from_value(rule.subcategory) if rule.subcategory else None
+            target = subcategory_rules if subcat else category_rules
+            target.append((subcat, category, rule.keyword_list))
+        return KeywordMatcher(subcategory_rules + category_rules)
+
+
+@dataclass
+class _RuleSnapshot:
+    version: Tuple
+    matcher: 'KeywordMatcher'
+    checked_at: float
+
+
+class KeywordMatcher:
+    """
+    分類規則編譯成單一 KeywordAutomaton
+
+    序號依規則順序編排（細分類規則在前、主分類規則在後），
+    與逐一檢查的優先順序相同
+    """
+
+    def __init__(self, rules: List[Tuple[Optional[SubCategory], Category, List[str]]]):
+        """
+        Args:
+            rules: [(細分類或 None, 主分類, 關鍵字), ...]，依優先順序排列
+        """
+        self.results: List[Tuple[Optional[SubCategory], Category]] = []
+        keywords = []
+        for subcat, category, words in rules:
+            keywords.extend((word, len(self.results)) for word in words)
+            self.results.append((subcat, category))
+        self.automaton = KeywordAutomaton(keywords)
+
+    @staticmethod
+    def from_tables(subcategory_keywords: Dict[SubCategory, List[str]],
+                    category_keywords: Dict[Category, List[str]]) -> 'KeywordMatcher':
+        """由 KEYWORDS / SUBCATEGORY_KEYWORDS 格式的 dict 建立"""
+        return KeywordMatcher(
+            [(subcat, subcat.parent, words) for subcat, words in subcategory_keywords.items()]
+            + [(None, category, words) for category, words in category_keywords.items()]
+        )
+
+    def match(self, item_name: str) -> Tuple[Optional[SubCategory], Category]:
+        ordinal = self.automaton.first_match(item_name)
+        if ordinal is None:
+            return None, Category.OTHER
+        return self.results[ordinal]
+
+    @staticmethod
+    def signature(subcategory_keywords: Dict, category_keywords: Dict) -> Tuple:
+        return (
+            tuple((key, tuple(words)) for key, words in subcategory_keywords.items()),
+            tuple((key, tuple(words)) for key, words in category_keywords.items()),
+        )
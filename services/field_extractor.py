@@ -0,0 +1,252 @@
+# services/field_extractor.py
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+# 每行只掃描一次：發票號碼 / 日期 / 金額以同一個 pattern 依序比對，
+# 已被號碼或日期吃掉的數字不會再被當成金額
+_TOKEN = re.compile(r'''
+    (?P<number>(?<![A-Za-z0-9])[A-Z]{2}[-\s]?\d{8}(?!\d))
+  | (?P<date>(?<!\d)(?P<year>\d{4}|\d{2,3})\s*[年/.\-]\s*(?P<month>\d{1,2})\s*[月/.\-]\s*(?P<day>\d{1,2})(?!\d))
+  | (?P<amount>(?<![\d.])(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?)
+''', re.VERBOSE)
+_TOTAL_KEYWORD = re.compile(r'總\s*計|合\s*計|總\s*額|總金額|應\s*付|TOTAL', re.IGNORECASE)
+_PAYMENT_KEYWORD = re.compile(r'找\s*零|找錢|實\s*收|現\s*金|收現|信用卡|悠遊卡')
+_NUMBER_KEYWORD = re.compile(r'發票|號碼|字軌')
+_DATE_KEYWORD = re.compile(r'日期|時間|開立')
+_CURRENCY = re.compile(r'\$|元|NT', re.IGNORECASE)
+_TIME = re.compile(r'(?<!\d)\d{1,2}:\d{2}(?!\d)')
+_NUMBER_SEPARATOR = re.compile(r'[-\s]')
+_CJK = re.compile(r'[\u3000-\u9fff\uff00-\uffef]')
+
+Document = Union[str, Tuple[str, str]]
+Span = Tuple[int, int, float]     # 行內 (起點, 終點, token 信心值)
+
+
+@dataclass(slots=True)
+class FieldCandidate:
+    """欄位候選值與分數"""
+    value: Union[str, int, float]
+    score: float
+    line: int
+    source: str
+
+    def to_dict(self) -> Dict:
+        return {'value': self.value, 'score': round(self.score, 2), 'line': self.line, 'source': self.source}
+
+
+class FieldExtractor:
+    """
+    OCR 文字欄位擷取（發票號碼 / 日期 / 總金額）
+
+    每行以預先編譯的 pattern 切成 token 一次，所有候選值依檢查項目加分：
+    - 發票號碼：兩碼英文字軌 + 8 碼數字、同行有「發票 / 號碼」
+    - 日期：日期存在且落在合理範圍、同行有「日期」或時間、位於表頭
+    - 總金額：在「總計 / 合計」同行或下一行、其中最大的金額、付款 / 找零行扣分
+    兩個 OCR pass 都出現的同一個值再加分；single-pass 的 token 串流另依 tokens 的信心值扣分
+    """
+
+    MAX_CANDIDATES = 3
+    HEADER_LINES = 10           # 表頭行數，日期通常在這裡
+    DATE_YEARS_BACK = 10        # 早於今年減此值的日期視為誤判
+    MAX_AMOUNT = 1_000_000
+    SOURCE_BONUS = {'meta': 0.5, 'items': 0.0}   # OCR-B 有數字白名單，數字較可靠
+    AGREEMENT_BONUS = 0.5
+    CONFIDENCE_WEIGHT = 2.0     # 信心值 100 不扣分、0 扣 2 分（取候選值涵蓋的 token 中最低的信心值）
+    REOCR_CONFIDENCE = 80.0     # 以數字白名單重新辨識過的 token（image_to_string 沒有信心值）
+
+    @staticmethod
+    def extract(text_meta: str, text_items: str = '', today: Optional[date] = None) -> Dict[str, List[FieldCandidate]]:
+        """
+        Args:
+            text_meta: 主要文字（OCR-B 或單一 OCR 結果）
+            text_items: 另一個 OCR pass 的文字（OCR-A），可省略
+            today: 日期合理範圍的基準，預設為今天
+
+        Returns:
+            {'number': [FieldCandidate, ...], 'date': [...], 'total': [...]}，依分數由高到低
+        """
+        today = today or date.today()
+        found = {'number': {}, 'date': {}, 'total': {}}
+        for source, text in (('meta', text_meta), ('items', text_items)):
+            if text:
+                FieldExtractor._scan(text, source, today, found)
+        return FieldExtractor._ranked(found)
+
+    @staticmethod
+    def extract_tokens(tokens: List[Dict], today: Optional[date] = None) -> Dict[str, List[FieldCandidate]]:
+        """
+        single-pass OCR 的 token 串流（見 services/ocr/single_pass.py）
+
+        與 extract() 相同的規則，另以候選值所在 token 的信心值扣分：
+        兩個「總計」金額、兩個字軌號碼互相競爭時，辨識較可靠的勝出
+
+        Args:
+            tokens: [{'text', 'conf', 'left', 'line', 'reocr'}, ...]
+        """
+        lines = FieldExtractor.token_lines(tokens)
+        found = {'number': {}, 'date': {}, 'total': {}}
+        FieldExtractor._scan(
+            '\n'.join(text for text, _ in lines), 'tokens', today or date.today(), found,
+            confidences=[spans for _, spans in lines]
+        )
+        return FieldExtractor._ranked(found)
+
+    @staticmethod
+    def token_lines(tokens: List[Dict]) -> List[Tuple[str, List[Span]]]:
+        """
+        依行編號把 token 合併成文字行，並記錄每個 token 在行內的位置與信心值
+
+        兩側任一邊是中文字元時直接相接（tesseract 會把中文拆成單字），否則以空白分隔
+        """
+        lines = {}
+        for token in tokens:
+            if token['text']:
+                lines.setdefault(token['line'], []).append(token)
+
+        result = []
+        for line in sorted(lines):
+            text, spans = '', []
+            previous = None
+            for word in sorted(lines[line], key=lambda t: t['left']):
+                if previous is not None and not (_CJK.match(previous['text'][-1]) or _CJK.match(word['text'][0])):
+                    text += ' '
+                conf = FieldExtractor.REOCR_CONFIDENCE if word.get('reocr') else word.get('conf', 100.0)
+                spans.append((len(text), len(text) + len(word['text']), float(conf)))
+                text += word['text']
+                previous = word
+            result.append((text, spans))
+        return result
+
+    @staticmethod
+    def extract_batch(documents: Iterable[Document], today: Optional[date] = None) -> List[Dict[str, List[FieldCandidate]]]:
+        """
+        一次處理多份文字（回填舊資料用）
+
+        Args:
+            documents: 每份為字串，或 (text_meta, text_items)
+        """
+        today = today or date.today()
+        results = []
+        for document in documents:
+            if isinstance(document, str):
+                results.append(FieldExtractor.extract(document, today=today))
+            else:
+                results.append(FieldExtractor.extract(*document, today=today))
+        return results
+
+    @staticmethod
+    def best(candidates: Dict[str, List[FieldCandidate]]) -> Dict:
+        """各欄位分數最高的值，沒有候選時為 None"""
+        return {field: values[0].value if values else None for field, values in candidates.items()}
+
+    @staticmethod
+    def _ranked(found: Dict[str, Dict]) -> Dict[str, List[FieldCandidate]]:
+        return {
+            field: sorted(values.values(), key=lambda c: -c.score)[:FieldExtractor.MAX_CANDIDATES]
+            for field, values in found.items()
+        }
+
+    @staticmethod
+    def _penalty(spans: Optional[List[Span]], start: int, end: int) -> float:
+        """候選值涵蓋的 token 中最低信心值對應的扣分（沒有 token 資訊時不扣分）"""
+        if not spans:
+            return 0.0
+        confs = [conf for left, right, conf in spans if left < end and right > start]
+        if not confs:
+            return 0.0
+        conf = min(100.0, max(0.0, min(confs)))
+        return FieldExtractor.CONFIDENCE_WEIGHT * (1.0 - conf / 100.0)
+
+    @staticmethod
+    def _scan(text: str, source: str, today: date, found: Dict[str, Dict],
+              confidences: Optional[List[List[Span]]] = None):
+        bonus = FieldExtractor.SOURCE_BONUS.get(source, 0.0)
+        earliest = today.year - FieldExtractor.DATE_YEARS_BACK
+        latest = today + timedelta(days=1)
+        amounts = []
+        previous_total_keyword = False
+
+        for index, line in enumerate(text.splitlines()):
+            total_keyword = bool(_TOTAL_KEYWORD.search(line))
+            spans = confidences[index] if confidences else None
+            line_amounts = []
+            for match in _TOKEN.finditer(line):
+                kind = match.lastgroup if match.lastgroup in ('number', 'amount') else 'date'
+                penalty = FieldExtractor._penalty(spans, match.start(), match.end())
+                if kind == 'number':
+                    value = _NUMBER_SEPARATOR.sub('', match.group('number'))
+                    score = 1.0 + bonus - penalty
+                    if _NUMBER_KEYWORD.search(line):
+                        score += 1.0
+                    FieldExtractor._add(found['number'], value, score, index, source)
+                elif kind == 'date':
+                    value = FieldExtractor._to_date(match, earliest, latest)
+                    if value is None:
+                        continue
+                    score = 1.0 + bonus - penalty
+                    if _DATE_KEYWORD.search(line) or _TIME.search(line):
+                        score += 1.0
+                    if index < FieldExtractor.HEADER_LINES:
+                        score += 0.5
+                    FieldExtractor._add(found['date'], value.isoformat(), score, index, source)
+                else:
+                    amount = FieldExtractor._to_amount(match.group('amount'))
+                    if amount is not None:
+                        line_amounts.append((amount, penalty))
+
+            for amount, penalty in line_amounts:
+                score = 0.1 + bonus
+                if total_keyword:
+                    score += 3.0
+                elif previous_total_keyword:
+                    score += 2.0
+                if _PAYMENT_KEYWORD.search(line):
+                    score -= 2.0
+                if _CURRENCY.search(line):
+                    score += 0.5
+                amounts.append((amount, score, index, penalty))
+            # 「總計」獨立一行、金額在下一行
+            previous_total_keyword = total_keyword and not line_amounts
+
+        # 靠近總計關鍵字的金額中，最大的再加分（品項小計通常比總計小）
+        # （位置分數判斷，信心值在最後才扣）
+        near = [amount for amount, score, _, _ in amounts if score >= 2.0]
+        largest = max(near) if near else None
+        for amount, score, index, penalty in amounts:
+            if amount == largest:
+                score += 1.0
+            FieldExtractor._add(found['total'], amount, score - penalty, index, source)
+
+    @staticmethod
+    def _add(candidates: Dict, value, score: float, line: int, source: str):
+        existing = candidates.get(value)
+        if existing is None:
+            candidates[value] = FieldCandidate(value, score, line, source)
+            return
+        if existing.source not in (source, 'both'):
+            # 兩個 OCR pass 都認出同一個值
+            existing.score = max(existing.score, score) + FieldExtractor.AGREEMENT_BONUS
+            existing.source = 'both'
+        elif score > existing.score:
+            existing.score, existing.line = score, line
+
+    @staticmethod
+    def _to_date(match: re.Match, earliest: int, latest: date) -> Optional[date]:
+        year = match.group('year')
+        year = int(year) if len(year) == 4 else int(year) + 1911
+        try:
+            value = date(year, int(match.group('month')), int(match.group('day')))
+        except ValueError:
+            return None
+        if value.year < earliest or value > latest:
+            return None
+        return value
+
+    @staticmethod
+    def _to_amount(text: str) -> Optional[Union[int, float]]:
+        value = float(text.replace(',', ''))
+        if value <= 0 or value > FieldExtractor.MAX_AMOUNT:
+            return None
+        return int(value) if value.is_integer() else value
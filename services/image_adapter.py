@@ -3,7 +3,8 @@ from PIL import Image, ImageOps
 import numpy as np
 import base64
 import io
-from typing import Union
+import math
+from typing import BinaryIO, Dict, Optional, Tuple, Union
 
 
 class ImageAdapterError(Exception):
@@ -34,13 +35,7 @@ class ImageAdapter:
         
         # Case 2: numpy array (OpenCV)
         elif isinstance(source, np.ndarray):
-            if source.size == 0:
-                raise ImageAdapterError("空的 numpy array")
-            # BGR → RGB
-            if len(source.shape) == 3 and source.shape[2] == 3:
-                image = Image.fromarray(source[:, :, ::-1])
-            else:
-                image = Image.fromarray(source)
+            image = ImageAdapter.from_array(source)
         
         # Case 3: bytes
         elif isinstance(source, bytes):
@@ -51,11 +46,8 @@ class ImageAdapter:
         
         # Case 4: base64 string
         elif isinstance(source, str):
+            decoded = ImageAdapter.decode_base64(source)
             try:
-                # 移除 data URI prefix
-                if ',' in source:
-                    source = source.split(',', 1)[1]
-                decoded = base64.b64decode(source)
                 image = Image.open(io.BytesIO(decoded))
             except Exception as e:
                 raise ImageAdapterError(f"無效的 base64 字串: {e}")
@@ -65,6 +57,64 @@ class ImageAdapter:
         
         return ImageAdapter._normalize(image)
     
+    @staticmethod
+    def from_array(array: np.ndarray) -> Image.Image:
+        """
+        numpy array (OpenCV) 轉為 PIL.Image，不做 RGB 標準化
+
+        - 2D uint8：與陣列共用記憶體的 'L' 影像（見 share()）
+        - 3 通道 uint8 視為 BGR：以 raw 'BGR' 解碼器直接讀取，只複製一次
+          （原本 source[:, :, ::-1] 的負 stride 陣列會先整份複製再轉換）
+        """
+        if array.size == 0:
+            raise ImageAdapterError("空的 numpy array")
+        if array.dtype == np.uint8 and array.ndim == 2:
+            return ImageAdapter.share(np.ascontiguousarray(array))
+        if array.dtype == np.uint8 and array.ndim == 3 and array.shape[2] == 3:
+            array = np.ascontiguousarray(array)
+            return Image.frombuffer('RGB', (array.shape[1], array.shape[0]), array, 'raw', 'BGR', 0, 1)
+        try:
+            return Image.fromarray(array)
+        except Exception as e:
+            raise ImageAdapterError(f"不支援的 numpy array: {e}")
+
+    @staticmethod
+    def share(array: np.ndarray) -> Image.Image:
+        """
+        2D uint8 陣列包成 'L' 影像，與陣列共用記憶體（不複製，影像為唯讀）
+
+        其他陣列退回 Image.fromarray（會複製）
+        """
+        if array.ndim != 2 or array.dtype != np.uint8 or not array.flags['C_CONTIGUOUS']:
+            return Image.fromarray(array)
+        image = Image.frombuffer('L', (array.shape[1], array.shape[0]), array, 'raw', 'L', 0, 1)
+        image._shared_array = array
+        return image
+
+    @staticmethod
+    def as_array(image: Image.Image) -> np.ndarray:
+        """
+        影像的 numpy 陣列（呼叫端只能讀取）
+
+        share() 建立的影像直接回傳共用的陣列；其他影像以 np.asarray 複製一次
+        （影像被修改時 PIL 會先複製，readonly 即變成 0，不再共用）
+        """
+        array = getattr(image, '_shared_array', None)
+        if array is not None and image.readonly:
+            return array
+        return np.asarray(image)
+
+    @staticmethod
+    def decode_base64(source: str) -> bytes:
+        """base64 字串（可含 data URI prefix）轉為 bytes"""
+        try:
+            # 移除 data URI prefix
+            if ',' in source:
+                source = source.split(',', 1)[1]
+            return base64.b64decode(source)
+        except Exception as e:
+            raise ImageAdapterError(f"無效的 base64 字串: {e}")
+
     @staticmethod
     def _normalize(image: Image.Image) -> Image.Image:
         """標準化影像"""
@@ -92,3 +142,122 @@ class ImageAdapter:
         return buffer.getvalue()
 
 
+
+
+class DecodedImage:
+    """
+    依用途解碼同一份影像 bytes（每個請求一份）
+
+    from_source() 一律以原始解析度解出 RGB；這裡由使用端指定模式與最長邊，
+    JPEG 以 draft() 在 DCT 階段直接縮小為 1/2、1/4、1/8，不需先解出全尺寸點陣圖，
+    灰階則直接取亮度通道。解碼結果依 (模式, 最長邊) 記住，同一請求重複取用不再解碼
+
+    來源可以是 bytes 或可 seek 的檔案物件（例如 SpooledUpload 的暫存檔），
+    檔案物件直接交給 PIL 讀取，不會先讀成一整份 bytes；已解碼的影像以 from_image() 包裝。
+    灰階結果與 numpy 陣列共用同一塊記憶體，以 array() 取得，不再經 np.asarray 複製
+    """
+
+    # EXIF 方向 5~8 為旋轉 90 / 270 度，寬高互換
+    _SWAPPED_ORIENTATIONS = (5, 6, 7, 8)
+
+    def __init__(self, data: Union[bytes, BinaryIO]):
+        if not data:
+            raise ImageAdapterError("影像來源為空")
+        self.data = data
+        try:
+            header = self._open()
+        except Exception as e:
+            raise ImageAdapterError(f"無效的影像 bytes: {e}")
+        self.format = header.format
+        width, height = header.size
+        if width <= 0 or height <= 0:
+            raise ImageAdapterError("無效的影像尺寸")
+        if header.getexif().get(0x0112) in DecodedImage._SWAPPED_ORIENTATIONS:
+            width, height = height, width
+        self.size: Tuple[int, int] = (width, height)
+        self._variants: Dict[Tuple[str, Optional[int]], Image.Image] = {}
+
+    @classmethod
+    def from_image(cls, image: Image.Image) -> 'DecodedImage':
+        """已解碼的 PIL.Image（例如 ImageAdapter.from_array 的結果），原本的模式直接沿用不轉換"""
+        if image.width <= 0 or image.height <= 0:
+            raise ImageAdapterError("無效的影像尺寸")
+        if image.getexif().get(0x0112, 1) != 1:
+            image = ImageOps.exif_transpose(image)
+        decoded = cls.__new__(cls)
+        decoded.data = None
+        decoded.format = None
+        decoded.size = image.size
+        decoded._variants = {(image.mode, None): image}
+        return decoded
+
+    def array(self, max_side: Optional[int] = None) -> np.ndarray:
+        """灰階影像的 numpy 陣列，與 get('L', max_side) 共用記憶體（唯讀）"""
+        return ImageAdapter.as_array(self.get('L', max_side))
+
+    def get(self, mode: str = 'RGB', max_side: Optional[int] = None) -> Image.Image:
+        """
+        Args:
+            mode: 'RGB' 或 'L'
+            max_side: 最長邊上限（像素），None 為原始解析度
+
+        Returns:
+            已套用 EXIF 方向的 PIL.Image（呼叫端不可修改，會被其他使用端共用）
+        """
+        if max_side is not None and max(self.size) <= max_side:
+            max_side = None
+        key = (mode, max_side)
+        image = self._variants.get(key)
+        if image is None:
+            image = self._decode(mode, max_side)
+            self._variants[key] = image
+        return image
+
+    def _decode(self, mode: str, max_side: Optional[int]) -> Image.Image:
+        if max_side is not None and (self.data is None or self.format != 'JPEG'):
+            # 已解碼的來源或非 JPEG 無法在解碼時縮小，由同模式的原尺寸影像縮圖
+            return DecodedImage._share(DecodedImage._shrink(self.get(mode), max_side))
+        if self.data is None:
+            # 已解碼的來源：由原圖轉換模式
+            base = next(iter(self._variants.values()))
+            return DecodedImage._share(base.convert(mode))
+        try:
+            image = self._open()
+            if max_side is not None:
+                scale = max_side / max(self.size)
+                image.draft(mode, (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+            image.load()
+        except Exception as e:
+            raise ImageAdapterError(f"無效的影像 bytes: {e}")
+
+        try:
+            ImageOps.exif_transpose(image, in_place=True)
+        except Exception:
+            pass
+        if image.mode != mode:
+            image = image.convert(mode)
+        if max_side is not None:
+            image = DecodedImage._shrink(image, max_side)
+        return DecodedImage._share(image)
+
+    def _open(self) -> Image.Image:
+        if isinstance(self.data, bytes):
+            return Image.open(io.BytesIO(self.data))
+        self.data.seek(0)
+        return Image.open(self.data)
+
+    @staticmethod
+    def _share(image: Image.Image) -> Image.Image:
+        """灰階結果改由 numpy 陣列持有（只複製這一次），之後 QR 定位、版面分析、二值化都直接讀取"""
+        if image.mode != 'L' or getattr(image, '_shared_array', None) is not None:
+            return image
+        return ImageAdapter.share(np.asarray(image))
+
+    @staticmethod
+    def _shrink(image: Image.Image, max_side: int) -> Image.Image:
+        longest = max(image.size)
+        if longest <= max_side:
+            return image
+        scale = max_side / longest
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        return image.resize(size, Image.BILINEAR, reducing_gap=2.0)
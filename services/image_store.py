@@ -0,0 +1,166 @@
+# services/image_store.py
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from django.conf import settings
+from django.urls import reverse
+from services.image_adapter import DecodedImage
+
+_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ImageStore:
+    """
+    以內容雜湊定址的發票影像儲存
+
+    - 原圖：<IMAGE_STORE_ROOT>/captures/<前 2 碼>/<3~4 碼>/<sha256><副檔名>，
+      名稱（相對 IMAGE_STORE_ROOT，即 MEDIA_ROOT）直接存入 Invoice.image
+    - 保存的影像（/api/save-image/，keep=True）：<IMAGE_STORE_ROOT>/saved/...，同樣以雜湊定址，
+      沒有發票參照也不會被 gc_images 清除，回傳的 URL 不會失效
+    - 縮圖：<IMAGE_STORE_ROOT>/thumbs/<前 2 碼>/<3~4 碼>/<sha256>_<長邊>.webp，第一次請求時產生，可隨時刪除
+    - 同內容已存在就不再寫入；寫入先寫暫存檔再 os.replace，讀取端不會看到寫到一半的檔案
+    - captures 下沒有被任何 Invoice.image 參照的原圖由 python manage.py gc_images 清除
+    """
+
+    CAPTURES = 'captures'
+    SAVED = 'saved'
+    THUMBS = 'thumbs'
+    THUMBNAIL_SIZES = (160, 320, 640)
+    THUMBNAIL_QUALITY = 80
+    EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    @staticmethod
+    def default() -> 'ImageStore':
+        return ImageStore(getattr(settings, 'IMAGE_STORE_ROOT', Path(settings.BASE_DIR) / 'media'))
+
+    def put(self, upload, ext: str, keep: bool = False) -> Dict:
+        """
+        儲存 SpooledUpload（已在寫入暫存檔時計算 SHA-256）
+
+        Args:
+            keep: True 時存入 saved（不受 gc_images 清除）
+
+        Returns:
+            {'name', 'url', 'thumbnail_url', 'filename', 'created'}
+        """
+        ext = ext.lower() if ext.lower() in ImageStore.EXTENSIONS else '.jpg'
+        name = self._name(upload.sha256, ext, ImageStore.SAVED if keep else ImageStore.CAPTURES)
+        path = self.root / name
+        created = not path.exists()
+        if created:
+            with self._atomic(path) as f:
+                upload.copy_to(f)
+        else:
+            # 重新上傳視為新的拍照，gc_images 的保留期間由此重新計算
+            os.utime(path)
+        return {**self.describe(name), 'created': created}
+
+    def describe(self, name: str) -> Dict:
+        digest, ext = self.split(name)
+        return {
+            'name': name,
+            'filename': f'{digest}{ext}',
+            'url': reverse('api:image', args=[digest, ext]),
+            'thumbnail_url': reverse('api:image_thumbnail', args=[digest, ImageStore.THUMBNAIL_SIZES[1]]),
+        }
+
+    def find(self, digest: str) -> Optional[str]:
+        """以雜湊找出原圖名稱（captures 優先，其次 saved；同一分片目錄內檔案很少）"""
+        if not _DIGEST.match(digest):
+            return None
+        for tree in (ImageStore.CAPTURES, ImageStore.SAVED):
+            shard = self.root / tree / digest[:2] / digest[2:4]
+            for ext in ImageStore.EXTENSIONS:
+                if (shard / f'{digest}{ext}').exists():
+                    return self._name(digest, ext, tree)
+        return None
+
+    def path(self, name: str) -> Path:
+        return self.root / name
+
+    def thumbnail(self, digest: str, size: int) -> Optional[Path]:
+        """
+        取得長邊 size 像素的縮圖路徑，不存在時由原圖產生（JPEG 以縮小解碼讀取）
+
+        Returns:
+            縮圖路徑；原圖不存在時回傳 None
+        """
+        if size not in ImageStore.THUMBNAIL_SIZES:
+            raise ValueError(f"不支援的縮圖大小: {size}")
+        if not _DIGEST.match(digest):
+            return None
+        path = self.root / ImageStore.THUMBS / digest[:2] / digest[2:4] / f'{digest}_{size}.webp'
+        if path.exists():
+            return path
+        name = self.find(digest)
+        if name is None:
+            return None
+        with open(self.path(name), 'rb') as f:
+            image = DecodedImage(f).get('RGB', size)
+            with self._atomic(path) as out:
+                image.save(out, format='WEBP', quality=ImageStore.THUMBNAIL_QUALITY)
+        return path
+
+    def names(self) -> Iterator[str]:
+        """captures 下所有原圖名稱（gc_images 的清除對象，不含 saved）"""
+        captures = self.root / ImageStore.CAPTURES
+        for path in captures.glob('*/*/*'):
+            if path.is_file() and not path.name.endswith('.tmp'):
+                yield path.relative_to(self.root).as_posix()
+
+    def delete(self, name: str):
+        """刪除原圖與其縮圖（縮圖可由 saved 的同一張影像重新產生）"""
+        digest, _ = self.split(name)
+        self.path(name).unlink(missing_ok=True)
+        for path in (self.root / ImageStore.THUMBS / digest[:2] / digest[2:4]).glob(f'{digest}_*.webp'):
+            path.unlink(missing_ok=True)
+
+    def purge_orphans(self, max_age: float) -> int:
+        """刪除原圖已不存在的縮圖，以及超過 max_age 秒的暫存檔（寫入中斷留下的）"""
+        removed = 0
+        now = time.time()
+        for path in (self.root / ImageStore.THUMBS).glob('*/*/*'):
+            if path.name.endswith('.webp') and self.find(path.name.split('_', 1)[0]) is None:
+                path.unlink(missing_ok=True)
+                removed += 1
+        for tree in (ImageStore.CAPTURES, ImageStore.SAVED, ImageStore.THUMBS):
+            for path in (self.root / tree).glob('*/*/*.tmp'):
+                try:
+                    if now - path.stat().st_mtime > max_age:
+                        path.unlink()
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+    @staticmethod
+    def split(name: str):
+        """名稱 → (雜湊, 副檔名)"""
+        digest, ext = os.path.splitext(os.path.basename(name))
+        return digest, ext
+
+    @staticmethod
+    def _name(digest: str, ext: str, tree: str = CAPTURES) -> str:
+        return f'{tree}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    @staticmethod
+    @contextmanager
+    def _atomic(path: Path):
+        """寫入同目錄的暫存檔，完成後 os.replace；失敗時刪除暫存檔"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp, 'wb') as f:
+                yield f
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
@@ -1,8 +1,23 @@
 # services/invoice_parser.py
 from datetime import datetime
 from typing import Dict, List, Tuple
+import base64
+import binascii
 import re
 from domain.enums import InvoiceType
+from domain.item import Item
+from domain.qr_invoice import QRInvoice
+from services.field_extractor import FieldExtractor
+
+
+# 電子發票 QR 表頭（77 碼）：字軌 10、民國日期 7、隨機碼 4、銷售額 8（16 進位）、
+# 總計額 8（16 進位）、買方統編 8、賣方統編 8、加密驗證資訊 24
+_QR_HEADER = re.compile(
+    r'([A-Z]{2}\d{8})(\d{7})(\d{4})([0-9A-Fa-f]{8})([0-9A-Fa-f]{8})(\d{8})(\d{8})([A-Za-z0-9+/=]{24})'
+)
+_QR_CONTINUATION = '**'
+_QR_NO_BUYER = '00000000'
+_QR_BASE64 = '2'
 
 
 class InvoiceParser:
@@ -18,148 +33,167 @@ class InvoiceParser:
                 'number': 'DF62269413',
                 'date': '2022-07-08',
                 'total': 103,
+                'sales': 98,
+                'random_code': '3970',
+                'buyer_id': None,
+                'seller_id': '08547587',
+                'item_count': 2,
+                'total_item_count': 2,
+                'encoding': '1',
                 'items': [{'name': '...', 'qty': 1, 'price': 65}],
                 'invoice_type': 'qr'
             }
         """
         print("services/invoice_parser.py InvoiceParser.parse_qr() - start")
+        record = InvoiceParser.parse_qr_record(raw_qrs)
+        print(f"services/invoice_parser.py InvoiceParser.parse_qr()\n\tinvoice_number: {record.number}\n\tdate: {record.date}\n\ttotal_amount: {record.total}\n\tbuyer_id: {record.buyer_id}\n\tseller_id: {record.seller_id}\n\titems: {len(record.items)}/{record.total_item_count}")
+        print("services/invoice_parser.py InvoiceParser.parse_qr() - end")
+        return record.to_dict()
+
+    @staticmethod
+    def parse_qr_record(raw_qrs: List[str]) -> QRInvoice:
+        """
+        依規格一次解析左右兩個 QR Code
+
+        左側 QR：77 碼表頭 + :營業人自行使用區:品目筆數:總筆數:編碼參數:品名:數量:單價...
+        右側 QR：以 "**" 開頭，接續左側 77 碼之後的內容（左側不敷記載時）
+
+        Raises:
+            ValueError: 沒有資料或找不到有效的 77 碼表頭
+        """
         if not raw_qrs:
             raise ValueError("QR 資料為空")
-        
-        header_qr = None
-        items_qr = None
 
+        header = None
+        continuation = ''
         for qr in raw_qrs:
-            print(f"services/invoice_parser.py InvoiceParser.parse_qr() - processing QR code: {qr}")
-            if ':' in qr:
-                items_qr = qr
-            else:
-                header_qr = qr
-
-        # print(f"services/invoice_parser.py InvoiceParser.parse_qr() - \n\theader_qr: {header_qr}")
-        # print(f"services/invoice_parser.py InvoiceParser.parse_qr() - \n\titems_qr: {items_qr}")
-        # ===== Header QR（固定 77 碼）=====
-        invoice_number = items_qr[0:10]
-        roc_date = items_qr[10:17]
-        date = InvoiceParser._roc_to_ad_date(roc_date)
-        
-        total_hex = items_qr[29:37]
-        # 十六進位轉十進位
-        total_amount = int(total_hex, 16)
-        
-        buyer_id = items_qr[37:45]
-        buyer_id = None if buyer_id == "00000000" else buyer_id
-        seller_id = items_qr[45:53]
-        
-        print(f"services/invoice_parser.py InvoiceParser.parse_qr()\n\tinvoice_number: {invoice_number}\n\tdate: {date}\n\ttotal_amount: {total_amount}\n\tbuyer_id: {buyer_id}\n\tseller_id: {seller_id}")
-        # ===== Items =====
-        items = []
-        if items_qr:
-            items = InvoiceParser._parse_items_qr(items_qr)
-        # print(f"invoice_number: {invoice_number}\n, date: {date}\n, total: {total_amount}\n, buyer_id: {buyer_id}\n, seller_id: {seller_id}\n, items: {items}")
-        # print(f"invoice_type: {InvoiceType.QR.value}")
-        print("services/invoice_parser.py InvoiceParser.parse_qr() - end")
-        return {
-            'number': invoice_number,
-            'date': date,
-            'total': total_amount,
-            'buyer_id': buyer_id,
-            'seller_id': seller_id,
-            'items': items,
-            'invoice_type': InvoiceType.QR.value
-        }
-    
+            if qr.startswith(_QR_CONTINUATION):
+                continuation += qr[len(_QR_CONTINUATION):]
+            elif header is None:
+                header = _QR_HEADER.match(qr)
+        if header is None:
+            raise ValueError("找不到有效的電子發票 QR 表頭")
+
+        number, roc_date, random_code, sales, total, buyer_id, seller_id, verification = header.groups()
+        record = QRInvoice(
+            number=number,
+            date=InvoiceParser._roc_to_ad_date(roc_date),
+            total=int(total, 16),
+            random_code=random_code,
+            sales=int(sales, 16),
+            buyer_id=None if buyer_id == _QR_NO_BUYER else buyer_id,
+            seller_id=seller_id,
+            verification=verification,
+        )
+
+        # 77 碼之後的欄位，右側 QR 直接接續在後
+        tail = header.string[header.end():] + continuation
+        fields = tail[1:].split(':') if tail.startswith(':') else tail.split(':')
+        if len(fields) < 4:
+            return record
+
+        _, item_count, total_item_count, encoding = fields[:4]
+        record.item_count = InvoiceParser._to_int(item_count)
+        record.total_item_count = InvoiceParser._to_int(total_item_count)
+        record.encoding = encoding or None
+        record.items = InvoiceParser._parse_qr_items(fields[4:], encoding == _QR_BASE64)
+        return record
+
     @staticmethod
-    def parse_ocr(text: str) -> Dict:
+    def parse_ocr(text: str = '', text_items: str = '', text_meta: str = '') -> Dict:
         """
         解析 OCR 文字
         
+        Args:
+            text: 單一 OCR 結果
+            text_items: Dual OCR 的 OCR-A（店名 / 品項）
+            text_meta: Dual OCR 的 OCR-B（金額 / 日期 / 號碼），優先採用
+
         Returns:
             {
                 'number': 'BB87654321',
                 'date': '2022-07-08',
                 'total': 800,
                 'items': [],
-                'invoice_type': 'paper'
+                'invoice_type': 'paper',
+                'candidates': {'number': [{'value', 'score', 'line', 'source'}], 'date': [...], 'total': [...]}
             }
         """
-        result = {
-            'number': '',
-            'date': '',
-            'total': 0,
+        return InvoiceParser._ocr_result(FieldExtractor.extract(text_meta or text, text_items))
+
+    @staticmethod
+    def _ocr_result(candidates: Dict) -> Dict:
+        best = FieldExtractor.best(candidates)
+        return {
+            'number': best['number'] or '',
+            'date': best['date'] or '',
+            'total': best['total'] or 0,
             'items': [],
-            'invoice_type': InvoiceType.PAPER.value
+            'invoice_type': InvoiceType.PAPER.value,
+            'candidates': {
+                field: [candidate.to_dict() for candidate in values]
+                for field, values in candidates.items()
+            }
         }
-        
-        # 提取發票號碼 (10 碼英數字)
-        number_match = re.search(r'[A-Z]{2}\d{8}', text)
-        if number_match:
-            result['number'] = number_match.group()
-        
-        # 提取日期
-        date_patterns = [
-            r'(\d{3})[年/\-](\d{1,2})[月/\-](\d{1,2})',  # 民國年
-            r'(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})',  # 西元年
-        ]
-        for pattern in date_patterns:
-            date_match = re.search(pattern, text)
-            if date_match:
-                year, month, day = date_match.groups()
-                year = int(year)
-                if year < 1000:  # 民國年
-                    year += 1911
-                result['date'] = f"{year}-{int(month):02d}-{int(day):02d}"
-                break
-        
-        # 提取總金額
-        total_patterns = [
-            r'總計[：:]\s*\$?\s*(\d+)',
-            r'合計[：:]\s*\$?\s*(\d+)',
-            r'總額[：:]\s*\$?\s*(\d+)',
-        ]
-        for pattern in total_patterns:
-            total_match = re.search(pattern, text)
-            if total_match:
-                result['total'] = int(total_match.group(1))
-                break
-        
-        return result
     
+    @staticmethod
+    def parse_tokens(tokens: List[Dict]) -> Dict:
+        """
+        解析 single-pass OCR 的 token 串流（見 services/ocr/single_pass.py）
+
+        Args:
+            tokens: [{'text', 'conf', 'left', 'top', 'width', 'height', 'line', 'reocr'}, ...]
+
+        Returns:
+            同 parse_ocr()；候選值依 token 信心值加權
+        """
+        return InvoiceParser._ocr_result(FieldExtractor.extract_tokens(tokens))
+
+    @staticmethod
+    def join_token_lines(tokens: List[Dict]) -> List[str]:
+        """依行編號把 token 合併成文字行（見 FieldExtractor.token_lines）"""
+        return [text for text, _ in FieldExtractor.token_lines(tokens)]
+
     @staticmethod
     def _roc_to_ad_date(roc: str) -> str:
-        """民國日期轉西元 1110708 → 2022-07-08"""
-        print("services/invoice_parser.py InvoiceParser._roc_to_ad_date() - start")
-        year = int(roc[:3]) + 1911
-        month = int(roc[3:5])
-        day = int(roc[5:7])
-        print(f"services/invoice_parser.py InvoiceParser._roc_to_ad_date() - \n\tyear: {year}\n\tmonth: {month}\n\tday: {day}")
-        print(f"services/invoice_parser.py InvoiceParser._roc_to_ad_date() - end")
-        return f"{year:04d}-{month:02d}-{day:02d}"
-    
+        """民國日期轉西元 1110708 → 2022-07-08，日期不存在時拋出 ValueError"""
+        return datetime(int(roc[:3]) + 1911, int(roc[3:5]), int(roc[5:7])).date().isoformat()
+
+    @staticmethod
+    def _to_int(value: str) -> int:
+        try:
+            return int(value)
+        except ValueError:
+            return 0
+
     @staticmethod
-    def _parse_items_qr(items_qr: str) -> List[Dict]:
+    def _parse_qr_items(fields: List[str], base64_names: bool = False) -> List[Item]:
         """
-        解析 Items QR
-        格式: :序號:數量:金額:品名:數量:金額:品名...
+        解析品項欄位：品名:數量:單價 三個一組，數量 / 單價無法轉換的品項略過
         """
-        print("services/invoice_parser.py _parse_items_qr() - start")
-        parts = items_qr.split(':')
-        # print(f"services/invoice_parser.py _parse_items_qr() - \n\tParsing items from QR parts: {parts}")
-
-        # parts[5] 開始才是品目
         items = []
-        for i in range(5, len(parts), 3):
+        for i in range(0, len(fields) - 2, 3):
+            name, qty, price = fields[i:i + 3]
+            try:
+                qty = float(qty)
+                price = float(price)
+            except ValueError:
+                continue
+            if base64_names:
+                name = InvoiceParser._decode_base64_name(name)
+            items.append(Item(name=name, qty=qty, price=price))
+        return items
+
+    @staticmethod
+    def _decode_base64_name(name: str) -> str:
+        """編碼參數為 2 時品名以 Base64 記載"""
+        try:
+            raw = base64.b64decode(name, validate=True)
+        except (binascii.Error, ValueError):
+            return name
+        for enc in ('utf-8', 'cp950'):
             try:
-                name = parts[i]
-                qty = float(parts[i + 1])
-                price = float(parts[i + 2])
-                items.append({
-                    'name': name,
-                    'qty': qty,
-                    'price': price
-                })
-            except (IndexError, ValueError):
+                return raw.decode(enc)
+            except UnicodeDecodeError:
                 continue
-        print(f"services/invoice_parser.py _parse_items_qr() - \n\tparsed items: {items}")
-        print("services/invoice_parser.py _parse_items_qr() - end")
-        return items
\ No newline at end of file
+        return name
@@ -0,0 +1,194 @@
+# services/invoice_pipeline.py
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from django.conf import settings
+from services.image_adapter import DecodedImage, ImageAdapter, ImageAdapterError
+from services.qr_service import QRService
+from services.ocr.engine_pool import OCREngineUnavailable, get_engine_pool
+from services.ocr.preprocess import OCRPreprocessor
+from services.invoice_parser import InvoiceParser
+from services.classify_service import InvoiceClassifier
+from services.result_cache import ResultCache, get_result_cache
+from services.upload_ingest import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+
+class InvoiceNotRecognized(Exception):
+    """影像中沒有 QR Code，OCR 也辨識不出文字"""
+    pass
+
+
+class InvoicePipeline:
+    """
+    發票辨識流程：QR Code → （無 QR 時）OCR → 解析 → 分類
+
+    同步 API（/api/process/）、背景 worker（run_invoice_worker）與批次辨識共用。
+    影像為 bytes 或 SpooledUpload 時，QR / OCR 解析結果以內容雜湊快取（見 services/result_cache.py）；
+    分類每次重新計算（毫秒等級），規則、使用者確認紀錄與模型更新後立即生效
+    """
+
+    VERSION = 4     # QR / OCR / 解析邏輯改變時遞增，舊的快取結果即失效
+
+    @staticmethod
+    def run(source, use_cache: bool = True) -> Dict:
+        """
+        Args:
+            source: SpooledUpload / bytes / base64 / numpy array (BGR) / PIL.Image
+            use_cache: 是否使用辨識結果快取（只有 bytes / SpooledUpload 會快取）
+
+        Returns:
+            {
+                'data': 合併後的發票資料（同 /api/process/ 回傳的 data）,
+                'raw_qr_data': QR 原始字串或 None,
+                'raw_ocr_data': OCR 原始文字或 None,
+                'cached': 是否為快取結果
+            }
+
+        Raises:
+            ImageAdapterError: 影像無法讀取
+            InvoiceNotRecognized: 無 QR 且 OCR 沒有結果
+            OCREngineUnavailable: OCR 引擎忙碌
+            ValueError: 解析失敗
+        """
+        cache = get_result_cache() if use_cache and isinstance(source, (bytes, SpooledUpload)) else None
+        key = None
+        if cache is not None:
+            if isinstance(source, SpooledUpload):
+                key = ResultCache.digest_key(source.sha256, InvoicePipeline.VERSION)
+            else:
+                key = ResultCache.key(source, InvoicePipeline.VERSION)
+        recognized = cache.get(key) if cache is not None else None
+        cached = recognized is not None
+        if not cached:
+            recognized = InvoicePipeline.recognize(source)
+            if cache is not None:
+                cache.put(key, recognized)
+        else:
+            logger.info(f"辨識結果快取命中: {key}")
+        return {**InvoicePipeline.classify(recognized), 'cached': cached}
+
+    @staticmethod
+    def from_raw(raw_qrs: Optional[List[str]] = None, raw_text: Optional[str] = None) -> Dict:
+        """
+        手機端已掃描的 QR 字串或已辨識的文字，直接解析與分類（不經影像解碼與 OCR）
+
+        Returns:
+            同 run()
+
+        Raises:
+            InvoiceNotRecognized: 兩者皆為空
+            ValueError: 解析失敗
+        """
+        if raw_qrs:
+            recognized = {'parsed': InvoiceParser.parse_qr(raw_qrs), 'raw_qr_data': raw_qrs, 'raw_ocr_data': None}
+        elif raw_text:
+            recognized = {'parsed': InvoiceParser.parse_ocr(raw_text), 'raw_qr_data': None, 'raw_ocr_data': raw_text}
+        else:
+            raise InvoiceNotRecognized('無法辨識發票內容')
+        return {**InvoicePipeline.classify(recognized), 'cached': False}
+
+    @staticmethod
+    def recognize(source) -> Dict:
+        """
+        QR / OCR 辨識並解析（不含分類）
+
+        bytes / base64 / SpooledUpload 以 DecodedImage 依用途解碼：QR 先用灰階縮圖，
+        OCR 依估計的行高決定解碼解析度，不必先解出原始解析度的 RGB；
+        numpy array / PIL.Image 不先轉 RGB，各階段由 DecodedImage 取得需要的灰階影像
+
+        Returns:
+            {'parsed': 解析後的發票資料, 'raw_qr_data': ..., 'raw_ocr_data': ...}
+        """
+        if isinstance(source, str):
+            source = ImageAdapter.decode_base64(source)
+        if isinstance(source, SpooledUpload):
+            image = DecodedImage(source.open())
+        elif isinstance(source, bytes):
+            image = DecodedImage(source)
+        elif isinstance(source, np.ndarray):
+            image = DecodedImage.from_image(ImageAdapter.from_array(source))
+        elif isinstance(source, Image.Image):
+            image = DecodedImage.from_image(source)
+        else:
+            raise ImageAdapterError(f"不支援的影像類型: {type(source)}")
+
+        # 步驟 1: 嘗試 QR Code
+        qr_result = QRService.decode(image)
+        logger.info(f"QR 掃描嘗試: variant={qr_result.get('variant')}, variants={qr_result.get('variants')}")
+        raw_qrs = qr_result.get('raw_qrs', [])
+        raw_text = None
+
+        if raw_qrs:
+            # 有 QR → 解析 QR
+            logger.info(f"檢測到 {len(raw_qrs)} 個 QR Code")
+            parsed_data = InvoiceParser.parse_qr(raw_qrs)
+        else:
+            # 無 QR → 使用 OCR
+            logger.info("未檢測到 QR Code，使用 OCR")
+            with get_engine_pool().checkout(
+                timeout=getattr(settings, 'OCR_ENGINE_CHECKOUT_TIMEOUT', None)
+            ) as ocr_service:
+                ocr_result = ocr_service.extract_text(InvoicePipeline._ocr_image(image))
+            raw_text = ocr_result.get('raw_text', '')
+            if not raw_text:
+                raise InvoiceNotRecognized('無法辨識發票內容')
+
+            if ocr_result.get('tokens'):
+                parsed_data = InvoiceParser.parse_tokens(ocr_result['tokens'])
+            elif 'text_meta' in ocr_result:
+                parsed_data = InvoiceParser.parse_ocr(
+                    text_items=ocr_result['text_items'],
+                    text_meta=ocr_result['text_meta']
+                )
+            else:
+                parsed_data = InvoiceParser.parse_ocr(raw_text)
+
+        return {
+            'parsed': parsed_data,
+            'raw_qr_data': raw_qrs or None,
+            'raw_ocr_data': raw_text,
+        }
+
+    @staticmethod
+    def _ocr_image(image: DecodedImage):
+        """OCR 使用的影像：前處理會轉灰階並縮放到目標行高，直接以該模式與解析度解碼"""
+        if not getattr(settings, 'OCR_PREPROCESS_ENABLED', True):
+            return image.get('RGB')
+        probe = image.get('L', QRService.SMALL_SIDE)     # QR 掃描已解碼
+        return image.get('L', OCRPreprocessor.decode_side(probe, image.size))
+
+    @staticmethod
+    def classify(recognized: Dict) -> Dict:
+        """分類 recognize() 的結果並合併成 API 回傳的 data"""
+        parsed_data = recognized['parsed']
+        # 步驟 2: 分類
+        classified_result = InvoiceClassifier.classify(parsed_data)
+        # 合併結果
+        result = {
+            **parsed_data,
+            'category': classified_result['main_category'],
+            'subcategory': classified_result['main_subcategory'],
+            'seller_name': classified_result.get('seller_name'),
+            'items': classified_result['items']
+        }
+        return {
+            'data': result,
+            'raw_qr_data': recognized['raw_qr_data'],
+            'raw_ocr_data': recognized['raw_ocr_data'],
+        }
+
+    @staticmethod
+    def describe_error(error: Exception) -> Tuple[str, int]:
+        """例外轉為 (使用者訊息, HTTP 狀態碼)，與 /api/process/ 的錯誤回應相同"""
+        if isinstance(error, ImageAdapterError):
+            return f'影像處理失敗: {error}', 400
+        if isinstance(error, InvoiceNotRecognized):
+            return str(error), 400
+        if isinstance(error, OCREngineUnavailable):
+            return '辨識服務忙碌中，請稍後再試', 503
+        if isinstance(error, ValueError):
+            return f'發票解析失敗: {error}', 400
+        return '系統錯誤，請稍後再試', 500
@@ -0,0 +1,188 @@
+# services/job_queue.py
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, Optional
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from services.invoice_pipeline import InvoicePipeline
+from services.models import ProcessingJob
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    以資料表 processing_jobs 作為持久化佇列
+
+    - submit：寫入影像與送出者的 session key，立即回傳 job id（結果只回給同一個 session）
+    - claim：以條件式 UPDATE 取得租約（只有一個 worker 會更新成功），
+      多台機器共用同一個資料庫即可分散處理
+    - 處理中定期延長租約；worker 當機時租約到期，其他 worker 可重新取得，
+      超過 INVOICE_JOB_MAX_ATTEMPTS 次仍未完成則標記失敗
+    - 完成或失敗的結果保留 INVOICE_JOB_TTL_SECONDS 秒後由 purge 刪除
+    """
+
+    LEASE_SECONDS = 120
+    MAX_ATTEMPTS = 3
+    TTL_SECONDS = 3600
+    CLAIM_CANDIDATES = 5        # 搶輸時再試的候選工作數
+
+    @staticmethod
+    def submit(payload: bytes, session_key: str = '') -> ProcessingJob:
+        now = timezone.now()
+        return ProcessingJob.objects.create(
+            payload=payload,
+            session_key=session_key or '',
+            expires_at=now + timedelta(seconds=JobQueue._ttl())     # 一直沒有 worker 處理也會過期
+        )
+
+    @staticmethod
+    def claim(owner: str, lease_seconds: Optional[float] = None) -> Optional[ProcessingJob]:
+        """取得一個排隊中或租約已到期的工作，沒有可處理的工作時回傳 None"""
+        lease = timedelta(seconds=lease_seconds or JobQueue._lease_seconds())
+        now = timezone.now()
+        claimable = (Q(status=ProcessingJob.QUEUED) | Q(status=ProcessingJob.RUNNING, lease_expires_at__lt=now)) \
+            & Q(attempts__lt=JobQueue._max_attempts())
+        candidates = ProcessingJob.objects.filter(claimable).order_by('created_at') \
+            .values_list('pk', flat=True)[:JobQueue.CLAIM_CANDIDATES]
+        for pk in list(candidates):
+            updated = ProcessingJob.objects.filter(claimable, pk=pk).update(
+                status=ProcessingJob.RUNNING,
+                lease_owner=owner,
+                lease_expires_at=now + lease,
+                attempts=F('attempts') + 1
+            )
+            if updated:
+                return ProcessingJob.objects.get(pk=pk)
+        return None
+
+    @staticmethod
+    def renew(job: ProcessingJob, owner: str, lease_seconds: Optional[float] = None) -> bool:
+        """延長租約；租約已被其他 worker 取得時回傳 False"""
+        lease = timedelta(seconds=lease_seconds or JobQueue._lease_seconds())
+        return bool(ProcessingJob.objects.filter(
+            pk=job.pk, status=ProcessingJob.RUNNING, lease_owner=owner
+        ).update(lease_expires_at=timezone.now() + lease))
+
+    @staticmethod
+    def complete(job: ProcessingJob, owner: str, result: Dict) -> bool:
+        return JobQueue._finish(job, owner, status=ProcessingJob.DONE, result=result)
+
+    @staticmethod
+    def fail(job: ProcessingJob, owner: str, error: str, error_status: int = 500) -> bool:
+        return JobQueue._finish(job, owner, status=ProcessingJob.FAILED, error=error, error_status=error_status)
+
+    @staticmethod
+    def retry(job: ProcessingJob, owner: str, error: str, error_status: int = 503) -> bool:
+        """暫時性錯誤：放回佇列，嘗試次數用完則標記失敗"""
+        if job.attempts >= JobQueue._max_attempts():
+            return JobQueue.fail(job, owner, error, error_status)
+        return bool(ProcessingJob.objects.filter(
+            pk=job.pk, status=ProcessingJob.RUNNING, lease_owner=owner
+        ).update(status=ProcessingJob.QUEUED, lease_owner='', lease_expires_at=None, error=error))
+
+    @staticmethod
+    def purge() -> int:
+        """
+        刪除過期的工作，並把租約到期、嘗試次數已用完的工作標記失敗
+
+        Returns:
+            刪除的筆數
+        """
+        now = timezone.now()
+        ProcessingJob.objects.filter(
+            status=ProcessingJob.RUNNING, lease_expires_at__lt=now, attempts__gte=JobQueue._max_attempts()
+        ).update(
+            status=ProcessingJob.FAILED, error='處理逾時', error_status=500, payload=None,
+            finished_at=now, expires_at=now + timedelta(seconds=JobQueue._ttl())
+        )
+        deleted, _ = ProcessingJob.objects.filter(expires_at__lt=now).exclude(
+            status=ProcessingJob.RUNNING, lease_expires_at__gte=now
+        ).delete()
+        return deleted
+
+    @staticmethod
+    def run_next(owner: Optional[str] = None) -> Optional[ProcessingJob]:
+        """
+        取得並處理一個工作
+
+        Returns:
+            處理過的工作；佇列為空時回傳 None
+        """
+        owner = owner or JobQueue.worker_name()
+        job = JobQueue.claim(owner)
+        if job is None:
+            return None
+        logger.info(f"開始處理工作 {job.pk}（第 {job.attempts} 次）")
+        try:
+            with JobQueue._heartbeat(job, owner):
+                outcome = InvoicePipeline.run(bytes(job.payload))
+        except Exception as e:
+            message, status = InvoicePipeline.describe_error(e)
+            if status < 500:
+                JobQueue.fail(job, owner, message, status)
+            else:
+                # OCR 引擎忙碌或未預期的錯誤：放回佇列重試
+                logger.exception(f"處理工作 {job.pk} 失敗，放回佇列")
+                JobQueue.retry(job, owner, message, status)
+        else:
+            if not JobQueue.complete(job, owner, outcome):
+                logger.warning(f"工作 {job.pk} 的租約已被其他 worker 取得，捨棄結果")
+        job.refresh_from_db()
+        return job
+
+    @staticmethod
+    def worker_name() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def _finish(job: ProcessingJob, owner: str, **fields) -> bool:
+        now = timezone.now()
+        return bool(ProcessingJob.objects.filter(
+            pk=job.pk, status=ProcessingJob.RUNNING, lease_owner=owner
+        ).update(
+            payload=None, lease_expires_at=None, finished_at=now,
+            expires_at=now + timedelta(seconds=JobQueue._ttl()), **fields
+        ))
+
+    @staticmethod
+    @contextmanager
+    def _heartbeat(job: ProcessingJob, owner: str):
+        """處理期間每 1/3 租約時間延長一次租約"""
+        lease_seconds = JobQueue._lease_seconds()
+        stop = threading.Event()
+
+        def _run():
+            try:
+                while not stop.wait(lease_seconds / 3):
+                    if not JobQueue.renew(job, owner, lease_seconds):
+                        logger.warning(f"工作 {job.pk} 的租約已遺失")
+                        return
+            finally:
+                connection.close()      # 此執行緒自己的資料庫連線
+
+        thread = threading.Thread(target=_run, name=f'job-heartbeat-{job.pk}', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    @staticmethod
+    def _lease_seconds() -> float:
+        return getattr(settings, 'INVOICE_JOB_LEASE_SECONDS', JobQueue.LEASE_SECONDS)
+
+    @staticmethod
+    def _max_attempts() -> int:
+        return getattr(settings, 'INVOICE_JOB_MAX_ATTEMPTS', JobQueue.MAX_ATTEMPTS)
+
+    @staticmethod
+    def _ttl() -> float:
+        return getattr(settings, 'INVOICE_JOB_TTL_SECONDS', JobQueue.TTL_SECONDS)
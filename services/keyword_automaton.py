@@ -0,0 +1,72 @@
+# services/keyword_automaton.py
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick 多關鍵字比對
+
+    所有關鍵字編譯成一個自動機，掃描一次字串即可找出所有出現的關鍵字；
+    每個關鍵字帶一個序號（越小越優先），first_match() 回傳出現關鍵字中序號最小者，
+    與依規則順序逐一檢查 `keyword in text` 的結果相同
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, int]]):
+        """
+        Args:
+            keywords: [(關鍵字, 序號), ...]，同一關鍵字出現多次時取最小序號
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[Optional[int]] = [None]   # 此狀態（含後綴）可輸出的最小序號
+        self.size = 0
+
+        for keyword, ordinal in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                state = nxt
+            self._best[state] = ordinal if self._best[state] is None else min(self._best[state], ordinal)
+            self.size += 1
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        """BFS 建立失敗連結，並把後綴狀態的輸出合併進來"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                inherited = self._best[self._fail[nxt]]
+                if inherited is not None and (self._best[nxt] is None or inherited < self._best[nxt]):
+                    self._best[nxt] = inherited
+
+    def first_match(self, text: str) -> Optional[int]:
+        """回傳 text 中出現的關鍵字的最小序號，沒有任何關鍵字時回傳 None"""
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found = None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            ordinal = best[state]
+            if ordinal is not None and (found is None or ordinal < found):
+                found = ordinal
+                if found == 0:
+                    break
+        return found
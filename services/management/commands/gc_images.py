@@ -0,0 +1,57 @@
+# services/management/commands/gc_images.py
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from domain.models import Invoice
+from services.image_store import ImageStore
+
+
+class Command(BaseCommand):
+    help = '刪除影像庫 captures 中沒有被任何 Invoice.image 參照的影像（含縮圖）與中斷寫入留下的暫存檔（不含 /api/save-image/ 保存的影像）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-hours', type=float,
+            default=getattr(settings, 'IMAGE_STORE_GC_MIN_AGE_HOURS', 24),
+            help='只刪除超過此時數的影像（剛拍照、尚未在確認頁儲存的發票仍會用到）'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='只列出會刪除的影像')
+
+    def handle(self, *args, **options):
+        if options['min_age_hours'] < 0:
+            raise CommandError('--min-age-hours 不可小於 0')
+        min_age = options['min_age_hours'] * 3600
+        dry_run = options['dry_run']
+        store = ImageStore.default()
+
+        referenced = set(
+            Invoice.objects.exclude(image__isnull=True).exclude(image='')
+            .values_list('image', flat=True).iterator(chunk_size=2000)
+        )
+        now = time.time()
+        kept = recent = removed = freed = 0
+        for name in store.names():
+            if name in referenced:
+                kept += 1
+                continue
+            try:
+                stat = store.path(name).stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime < min_age:
+                recent += 1
+                continue
+            if dry_run:
+                self.stdout.write(f"會刪除: {name}")
+            else:
+                store.delete(name)
+            removed += 1
+            freed += stat.st_size
+
+        orphans = 0 if dry_run else store.purge_orphans(min_age)
+        action = '可刪除' if dry_run else '已刪除'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {removed} 張影像（{freed / 1024 / 1024:.1f} MB），"
+            f"保留 {kept} 張已參照、{recent} 張未滿 {options['min_age_hours']:g} 小時；"
+            f"清除 {orphans} 個孤立縮圖 / 暫存檔"
+        ))
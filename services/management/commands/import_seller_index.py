@@ -0,0 +1,91 @@
+# services/management/commands/import_seller_index.py
+import csv
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from services.category_memo import CategoryMemo
+from services.seller_index import SellerIndex
+
+# 欄位名稱（營業登記資料公示檔 / 自訂 CSV）
+ID_COLUMNS = ('統一編號', 'seller_id')
+NAME_COLUMNS = ('營業人名稱', 'name')
+INDUSTRY_COLUMNS = ('行業代號', 'industry_code')
+CATEGORY_COLUMNS = ('category', '主分類')
+SUBCATEGORY_COLUMNS = ('subcategory', '細分類')
+CONFIDENT_COLUMNS = ('confident', '高信心')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', '是'}
+
+
+class Command(BaseCommand):
+    help = '由 CSV（如營業登記資料公示檔）建立賣方統編索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', nargs='+', help='CSV 檔案，多個檔案時後面的覆蓋前面的')
+        parser.add_argument('--output', help='索引目錄，預設 settings.SELLER_INDEX_PATH')
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--delimiter', default=',')
+
+    def handle(self, *args, **options):
+        output = Path(options['output'] or getattr(
+            settings, 'SELLER_INDEX_PATH', Path(settings.BASE_DIR) / 'models' / 'seller_index'
+        ))
+        started = time.perf_counter()
+        rows = []
+        for csv_path in options['csv_path']:
+            rows.extend(self._read(csv_path, options['encoding'], options['delimiter']))
+
+        index = SellerIndex.build(rows)
+        index.save(output)
+
+        confident = sum(1 for row in rows if row[4] and row[2] is not None)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"已匯入 {len(index)} 個賣方（{confident} 筆高信心分類）→ {output}（{elapsed:.2f}s）"
+        ))
+
+    def _read(self, csv_path, encoding, delimiter):
+        try:
+            f = open(csv_path, newline='', encoding=encoding)
+        except OSError as e:
+            raise CommandError(f"無法開啟 {csv_path}: {e}")
+        with f:
+            reader = csv.DictReader(f, delimiter=delimiter)
+            columns = reader.fieldnames or []
+            id_column = _pick(columns, ID_COLUMNS)
+            if id_column is None:
+                raise CommandError(f"{csv_path} 缺少統一編號欄位（{' / '.join(ID_COLUMNS)}）")
+            name_column = _pick(columns, NAME_COLUMNS)
+            industry_column = _pick(columns, INDUSTRY_COLUMNS)
+            category_column = _pick(columns, CATEGORY_COLUMNS)
+            subcategory_column = _pick(columns, SUBCATEGORY_COLUMNS)
+            confident_column = _pick(columns, CONFIDENT_COLUMNS)
+
+            for record in reader:
+                category = subcategory = None
+                confident = False
+                # 明確指定的分類優先，其次依行業代號
+                classification = None
+                if category_column and record.get(category_column):
+                    classification = CategoryMemo.to_classification(
+                        record[category_column].strip(),
+                        (record.get(subcategory_column) or '').strip() if subcategory_column else None
+                    )
+                if classification is not None:
+                    subcategory, category = classification
+                    confident = True
+                    if confident_column and record.get(confident_column):
+                        confident = record[confident_column].strip().lower() in TRUE_VALUES
+                elif industry_column:
+                    rule = SellerIndex.industry_rule(record.get(industry_column))
+                    if rule is not None:
+                        category, subcategory, confident = rule
+                name = (record.get(name_column) or '').strip() if name_column else ''
+                yield record[id_column], name, category, subcategory, confident
+
+
+def _pick(columns, candidates):
+    for candidate in candidates:
+        if candidate in columns:
+            return candidate
+    return None
@@ -0,0 +1,153 @@
+# services/management/commands/reclassify_items.py
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from domain.models import Invoice, Item
+from services.category_memo import CategoryMemo
+from services.classify_service import InvoiceClassifier
+
+
+class Command(BaseCommand):
+    help = '以目前的分類規則重新分類已儲存的品項，並重新計算發票主分類'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批發票張數（一批一個 transaction）')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='讀取品項的 iterator chunk_size')
+        parser.add_argument('--dry-run', action='store_true', help='只列出會變更的分類，不寫入資料庫')
+        parser.add_argument('--checkpoint', help='進度檔；每批寫入後記錄最後處理的發票 id，再次執行時由此繼續')
+        parser.add_argument('--restart', action='store_true', help='忽略既有進度檔，從頭開始')
+
+    def handle(self, *args, **options):
+        batch_size, chunk_size = options['batch_size'], options['chunk_size']
+        if batch_size <= 0 or chunk_size <= 0:
+            raise CommandError('--batch-size 與 --chunk-size 必須大於 0')
+        dry_run = options['dry_run']
+        checkpoint = Path(options['checkpoint']) if options['checkpoint'] else None
+
+        state = {'last_invoice_id': 0, 'items': 0, 'invoices': 0, 'updated_items': 0, 'updated_invoices': 0}
+        if checkpoint is not None and checkpoint.exists() and not options['restart']:
+            state.update(self._load_checkpoint(checkpoint))
+            self.stdout.write(f"由進度檔繼續：發票 id > {state['last_invoice_id']}")
+
+        changes = Counter()
+        started = time.perf_counter()
+        processed_items = 0
+        while True:
+            invoices = list(
+                Invoice.objects.filter(pk__gt=state['last_invoice_id']).order_by('pk')
+                .values('pk', 'seller_id', 'category', 'subcategory')[:batch_size]
+            )
+            if not invoices:
+                break
+            items = self._load_items(invoices, chunk_size)
+            updated_items, updated_invoices = self._reclassify(invoices, items, dry_run, changes)
+
+            if not dry_run:
+                with transaction.atomic():
+                    Item.objects.bulk_update(updated_items, ['category', 'subcategory'], batch_size=chunk_size)
+                    Invoice.objects.bulk_update(
+                        updated_invoices, ['category', 'subcategory', 'updated_at'], batch_size=chunk_size
+                    )
+
+            batch_items = sum(len(rows) for rows in items.values())
+            processed_items += batch_items
+            state['last_invoice_id'] = invoices[-1]['pk']
+            state['items'] += batch_items
+            state['invoices'] += len(invoices)
+            state['updated_items'] += len(updated_items)
+            state['updated_invoices'] += len(updated_invoices)
+            if checkpoint is not None and not dry_run:
+                self._save_checkpoint(checkpoint, state)
+
+            elapsed = time.perf_counter() - started
+            self.stderr.write(
+                f"發票 id ≤ {state['last_invoice_id']}：{state['items']} 筆品項 / {state['invoices']} 張發票，"
+                f"{processed_items / elapsed if elapsed else 0:.0f} rows/s"
+            )
+
+        elapsed = time.perf_counter() - started
+        for (before, after), count in sorted(changes.items(), key=lambda c: -c[1]):
+            self.stdout.write(f"  {before} → {after}: {count}")
+        verb = '將更新' if dry_run else '已更新'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {state['updated_items']} 筆品項、{state['updated_invoices']} 張發票"
+            f"（共 {state['items']} 筆品項 / {state['invoices']} 張發票，"
+            f"{elapsed:.2f}s，{processed_items / elapsed if elapsed else 0:.0f} rows/s）"
+        ))
+
+    def _load_items(self, invoices, chunk_size):
+        """這批發票的品項，依發票內原本的順序"""
+        items = {invoice['pk']: [] for invoice in invoices}
+        rows = Item.objects.filter(
+            invoice_id__gte=invoices[0]['pk'], invoice_id__lte=invoices[-1]['pk']
+        ).order_by('invoice_id', 'order', 'pk').values_list('pk', 'invoice_id', 'name', 'category', 'subcategory')
+        for pk, invoice_id, name, category, subcategory in rows.iterator(chunk_size=chunk_size):
+            items[invoice_id].append({'pk': pk, 'name': name, 'category': category, 'subcategory': subcategory})
+        return items
+
+    def _reclassify(self, invoices, items, dry_run, changes):
+        """
+        Returns:
+            (分類改變的 Item, 分類改變的 Invoice)；只含 pk 與分類欄位，供 bulk_update
+        """
+        # classify_batch 會覆寫品項的分類欄位，先保留原本的值
+        previous = {item['pk']: (item['category'], item['subcategory']) for rows in items.values() for item in rows}
+        results = InvoiceClassifier.classify_batch([
+            {'seller_id': invoice['seller_id'], 'items': items[invoice['pk']]} for invoice in invoices
+        ])
+
+        now = timezone.now()
+        updated_items, updated_invoices = [], []
+        for invoice, result in zip(invoices, results):
+            for item in result['items']:
+                before = _normalize(*previous[item['pk']])
+                after = _normalize(item['category'], item['subcategory'])
+                if before == after:
+                    # 分類沒變，但細分類存成 label 的舊資料一併改存 value
+                    if previous[item['pk']] != after:
+                        updated_items.append(Item(pk=item['pk'], category=after[0], subcategory=after[1]))
+                    continue
+                changes[(_format(before), _format(after))] += 1
+                if dry_run:
+                    self.stdout.write(
+                        f"- 發票 {invoice['pk']} 品項 {item['pk']} {item['name']}：{_format(before)} → {_format(after)}"
+                    )
+                updated_items.append(Item(pk=item['pk'], category=after[0], subcategory=after[1]))
+
+            before = _normalize(invoice['category'], invoice['subcategory'])
+            after = _normalize(result['main_category'], result['main_subcategory'])
+            if (invoice['category'], invoice['subcategory']) != after:
+                if dry_run and before != after:
+                    self.stdout.write(f"- 發票 {invoice['pk']} 主分類：{_format(before)} → {_format(after)}")
+                updated_invoices.append(Invoice(pk=invoice['pk'], category=after[0], subcategory=after[1], updated_at=now))
+        return updated_items, updated_invoices
+
+    def _load_checkpoint(self, path):
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"無法讀取進度檔 {path}: {e}")
+
+    def _save_checkpoint(self, path, state):
+        tmp = path.with_name(f'{path.name}.tmp')
+        tmp.write_text(json.dumps(state), encoding='utf-8')
+        os.replace(tmp, path)
+
+
+def _normalize(category, subcategory):
+    """(主分類 value, 細分類 value)；細分類存 label 的舊資料視為相同"""
+    classification = CategoryMemo.to_classification(category, subcategory) if category else None
+    if classification is None:
+        return category or None, subcategory or None
+    subcat, main = classification
+    return main.value, subcat.value if subcat else None
+
+
+def _format(classification):
+    category, subcategory = classification
+    return f"{category}/{subcategory}" if subcategory else f"{category}"
@@ -0,0 +1,100 @@
+# services/management/commands/run_invoice_worker.py
+import os
+import signal
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from services.invoice_pipeline import InvoicePipeline
+from services.job_queue import JobQueue
+from services.ocr.engine_pool import get_engine_pool
+from services.result_cache import get_result_cache
+
+
+class Command(BaseCommand):
+    help = '處理 /api/jobs/ 送出的發票辨識工作（可在多台機器上同時執行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='本機 worker 行程數')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='佇列為空時的等待秒數')
+        parser.add_argument('--purge-interval', type=float, default=60.0, help='清除過期工作與辨識結果快取的間隔秒數')
+        parser.add_argument('--once', action='store_true', help='處理完目前佇列中的工作後結束')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError('--processes 至少為 1')
+        if options['processes'] > 1:
+            return self._supervise(options)
+
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        if getattr(settings, 'OCR_WARM_ON_STARTUP', True) and not options['once']:
+            get_engine_pool().warm_async()
+
+        name = JobQueue.worker_name()
+        self.stdout.write(f"worker {name} 啟動")
+        processed = 0
+        last_purge = 0.0
+        while not self._stopping:
+            close_old_connections()
+            if time.monotonic() - last_purge >= options['purge_interval']:
+                purged = JobQueue.purge()
+                if purged:
+                    self.stdout.write(f"已清除 {purged} 個過期工作")
+                cache = get_result_cache()
+                swept = cache.sweep(InvoicePipeline.VERSION) if cache is not None else 0
+                if swept:
+                    self.stdout.write(f"已清除 {swept} 個辨識結果快取檔案")
+                last_purge = time.monotonic()
+
+            job = JobQueue.run_next(name)
+            if job is not None:
+                processed += 1
+                self.stdout.write(f"工作 {job.pk}: {job.status}")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(f"worker {name} 結束，共處理 {processed} 個工作"))
+
+    def _stop(self, signum, frame):
+        """處理中的工作完成後才結束"""
+        self._stopping = True
+
+    def _supervise(self, options):
+        """以子行程執行多個 worker，子行程異常結束時重新啟動"""
+        command = [
+            sys.executable, '-m', 'django', 'run_invoice_worker', '--processes', '1',
+            '--poll-interval', str(options['poll_interval']),
+            '--purge-interval', str(options['purge_interval']),
+        ]
+        if options['once']:
+            command.append('--once')
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE))
+
+        def _spawn():
+            return subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+
+        children = [_spawn() for _ in range(options['processes'])]
+        self.stdout.write(f"已啟動 {len(children)} 個 worker 行程")
+        try:
+            while children:
+                time.sleep(1.0)
+                for child in list(children):
+                    code = child.poll()
+                    if code is None:
+                        continue
+                    if code == 0 or options['once']:
+                        children.remove(child)
+                    else:
+                        self.stderr.write(f"worker 行程 {child.pid} 異常結束（{code}），重新啟動")
+                        children[children.index(child)] = _spawn()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for child in children:
+                child.send_signal(signal.SIGTERM)
+            for child in children:
+                child.wait()
@@ -0,0 +1,48 @@
+# services/management/commands/train_item_classifier.py
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from domain.models import Item
+from services.category_memo import CategoryMemo
+from services.ngram_classifier import NgramClassifier
+
+
+class Command(BaseCommand):
+    help = '以 items 資料表已分類的品項訓練字元 n-gram 品名分類器'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='模型目錄，預設 settings.ITEM_CLASSIFIER_PATH')
+        parser.add_argument('--dimension', type=int, default=NgramClassifier.DIMENSION, help='雜湊維度（2 的次方）')
+        parser.add_argument('--alpha', type=float, default=NgramClassifier.ALPHA, help='Laplace smoothing')
+        parser.add_argument('--min-items', type=int, default=20, help='品項數少於此值時不訓練')
+
+    def handle(self, *args, **options):
+        output = Path(options['output'] or getattr(
+            settings, 'ITEM_CLASSIFIER_PATH', Path(settings.BASE_DIR) / 'models' / 'item_classifier'
+        ))
+        started = time.perf_counter()
+
+        samples = []
+        rows = Item.objects.exclude(category__isnull=True).exclude(category='').values_list(
+            'name', 'category', 'subcategory'
+        )
+        for name, category, subcategory in rows.iterator(chunk_size=2000):
+            classification = CategoryMemo.to_classification(category, subcategory)
+            if classification is not None:
+                subcat, main = classification
+                samples.append((name, main, subcat))
+
+        if len(samples) < options['min_items']:
+            raise CommandError(f"已分類品項只有 {len(samples)} 筆，少於 --min-items {options['min_items']}")
+
+        try:
+            model = NgramClassifier.train(samples, dimension=options['dimension'], alpha=options['alpha'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        model.save(output)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"已訓練 {len(samples)} 筆品項、{len(model.labels)} 個分類 → {output}（{elapsed:.2f}s）"
+        ))
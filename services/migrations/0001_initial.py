@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemCategoryMemo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='正規化品名')),
+                ('seller_id', models.CharField(blank=True, default='', max_length=8, verbose_name='賣方統編')),
+                ('category', models.CharField(max_length=20, verbose_name='品項分類')),
+                ('subcategory', models.CharField(blank=True, max_length=30, null=True, verbose_name='細分類')),
+                ('hits', models.PositiveIntegerField(default=1, verbose_name='確認次數')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新時間')),
+            ],
+            options={
+                'db_table': 'item_category_memo',
+                'indexes': [models.Index(fields=['updated_at'], name='item_catego_updated_d87d16_idx')],
+                'constraints': [models.UniqueConstraint(fields=('name', 'seller_id'), name='unique_item_memo')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('飲食', '飲食'), ('衣物', '衣物'), ('醫藥/衛生', '醫藥/衛生'), ('住(租金/房貸)', '住(租金/房貸)'), ('生活物品', '生活物品'), ('行(交通費/油錢)', '行(交通費/油錢)'), ('教育(學費)', '教育(學費)'), ('娛樂(場地門票)', '娛樂(場地門票)'), ('理財', '理財'), ('發票中獎', '發票中獎'), ('其它', '其它')], max_length=20, verbose_name='主分類')),
+                ('subcategory', models.CharField(blank=True, choices=[('vegetable', '菜錢'), ('drink', '飲料'), ('restaurant', '餐廳'), ('snack', '零食'), ('parking', '停車費'), ('gasoline', '油錢'), ('easy_card', '悠遊卡'), ('etag', 'eTag'), ('taxi', '計程車'), ('hsr', '高鐵票'), ('tra', '台鐵票'), ('water_electric', '水電'), ('gas_fee', '瓦斯'), ('internet', '電視網路'), ('phone', '手機/電話'), ('mortgage', '房貸'), ('management', '管理費'), ('sundries', '雜貨'), ('tissue', '衛生紙'), ('appliance', '電器品'), ('maintenance', '維修保養'), ('movie', '電影票'), ('ticket', '設施入場券'), ('fund', '基金'), ('stock', '股票'), ('gold', '黃金'), ('exchange', '換匯'), ('tax', '稅金'), ('fine', '罰款'), ('insurance', '保險'), ('delivery_family', '網購取件-全家'), ('delivery_711', '網購取件-7-11'), ('delivery_ok', '網購取件-OK'), ('delivery_hilife', '網購取件-萊爾富')], max_length=30, null=True, verbose_name='細分類')),
+                ('keywords', models.TextField(help_text='以換行或逗號分隔', verbose_name='關鍵字')),
+                ('priority', models.PositiveIntegerField(default=100, help_text='數字越小越優先', verbose_name='優先順序')),
+                ('is_active', models.BooleanField(default=True, verbose_name='啟用')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新時間')),
+            ],
+            options={
+                'db_table': 'classification_rules',
+                'ordering': ['priority', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClassificationRuleVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1, verbose_name='版本')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新時間')),
+            ],
+            options={
+                'db_table': 'classification_rule_version',
+            },
+        ),
+    ]
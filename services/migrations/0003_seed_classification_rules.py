@@ -0,0 +1,61 @@
+# 將原本 InvoiceClassifier.KEYWORDS / SUBCATEGORY_KEYWORDS 的規則寫入資料表
+
+from django.db import migrations
+
+# (主分類, 細分類, 關鍵字)，順序即優先順序
+SUBCATEGORY_RULES = [
+    ('飲食', 'vegetable', ['菜', '青菜', '蔬菜']),
+    ('飲食', 'drink', ['飲料', '可樂', '咖啡', '茶']),
+    ('飲食', 'restaurant', ['餐', '便當', '牛排', '火鍋']),
+    ('飲食', 'snack', ['零食', '餅乾']),
+    ('行(交通費/油錢)', 'gasoline', ['汽油', '加油']),
+    ('行(交通費/油錢)', 'parking', ['停車']),
+    ('行(交通費/油錢)', 'etag', ['etag']),
+    ('行(交通費/油錢)', 'taxi', ['計程車']),
+    ('行(交通費/油錢)', 'hsr', ['高鐵']),
+    ('行(交通費/油錢)', 'tra', ['台鐵']),
+    ('住(租金/房貸)', 'water_electric', ['水電']),
+    ('住(租金/房貸)', 'gas_fee', ['瓦斯']),
+    ('住(租金/房貸)', 'internet', ['網路', '電視']),
+    ('住(租金/房貸)', 'phone', ['手機', '電信']),
+    ('娛樂(場地門票)', 'movie', ['電影']),
+    ('娛樂(場地門票)', 'ticket', ['門票']),
+]
+CATEGORY_RULES = [
+    ('飲食', ['蛋', '飯', '麵', '肉', '飲', '可樂', '咖啡', '茶', '餐', '食']),
+    ('生活物品', ['衛生紙', '清潔', '洗', '杯', '袋', '紙巾']),
+    ('醫藥/衛生', ['藥', '口罩', '酒精', '維他命']),
+    ('行(交通費/油錢)', ['汽油', '停車', '車', '加油', 'etag']),
+    ('娛樂(場地門票)', ['電影', '門票', '遊樂']),
+]
+
+
+def seed(apps, schema_editor):
+    Rule = apps.get_model('services', 'ClassificationRule')
+    Version = apps.get_model('services', 'ClassificationRuleVersion')
+    priority = 0
+    for category, subcategory, keywords in SUBCATEGORY_RULES:
+        priority += 10
+        Rule.objects.create(category=category, subcategory=subcategory,
+                            keywords='\n'.join(keywords), priority=priority)
+    for category, keywords in CATEGORY_RULES:
+        priority += 10
+        Rule.objects.create(category=category, subcategory=None,
+                            keywords='\n'.join(keywords), priority=priority)
+    Version.objects.update_or_create(pk=1, defaults={'version': 1})
+
+
+def unseed(apps, schema_editor):
+    apps.get_model('services', 'ClassificationRule').objects.all().delete()
+    apps.get_model('services', 'ClassificationRuleVersion').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_classification_rules'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, unseed),
+    ]
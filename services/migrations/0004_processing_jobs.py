@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-17 20:59
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_seed_classification_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', '排隊中'), ('running', '處理中'), ('done', '完成'), ('failed', '失敗')], default='queued', max_length=10, verbose_name='狀態')),
+                ('payload', models.BinaryField(null=True, verbose_name='影像')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='結果')),
+                ('error', models.TextField(blank=True, default='', verbose_name='錯誤訊息')),
+                ('error_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='錯誤 HTTP 狀態碼')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='嘗試次數')),
+                ('lease_owner', models.CharField(blank=True, default='', max_length=100, verbose_name='租約持有者')),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='租約到期')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='建立時間')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成時間')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='保留期限')),
+            ],
+            options={
+                'db_table': 'processing_jobs',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='processing__status_ac8e44_idx'), models.Index(fields=['expires_at'], name='processing__expires_72e1bf_idx')],
+            },
+        ),
+    ]
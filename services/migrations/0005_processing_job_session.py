@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_processing_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='session_key',
+            field=models.CharField(blank=True, default='', max_length=40, verbose_name='送出者 session'),
+        ),
+    ]
@@ -1,3 +1,128 @@
+# services/models.py
+import re
+import time
+import uuid
 from django.db import models
+from domain.enums import Category, SubCategory
 
-# Create your models here.
+_KEYWORD_SEPARATOR = re.compile(r'[\n,，、]+')
+
+
+class ItemCategoryMemo(models.Model):
+    """使用者確認過的品名分類（見 services/category_memo.py）"""
+    name = models.CharField('正規化品名', max_length=100)
+    seller_id = models.CharField('賣方統編', max_length=8, blank=True, default='')
+    category = models.CharField('品項分類', max_length=20)
+    subcategory = models.CharField('細分類', max_length=30, null=True, blank=True)
+    hits = models.PositiveIntegerField('確認次數', default=1)
+    updated_at = models.DateTimeField('更新時間', auto_now=True)
+
+    class Meta:
+        db_table = 'item_category_memo'
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'seller_id'], name='unique_item_memo'),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.seller_id or '*'}) → {self.category}"
+
+
+class ClassificationRule(models.Model):
+    """
+    品名分類關鍵字規則（可在 admin 編輯，見 services/classify_service.py）
+
+    細分類規則優先於主分類規則，同類規則依 priority、id 排序；
+    品名包含任一關鍵字即套用第一條符合的規則
+    """
+    category = models.CharField('主分類', max_length=20,
+                                choices=[(c.value, c.value) for c in Category])
+    subcategory = models.CharField('細分類', max_length=30,
+                                   choices=SubCategory.get_choices(),
+                                   null=True, blank=True)
+    keywords = models.TextField('關鍵字', help_text='以換行或逗號分隔')
+    priority = models.PositiveIntegerField('優先順序', default=100, help_text='數字越小越優先')
+    is_active = models.BooleanField('啟用', default=True)
+    updated_at = models.DateTimeField('更新時間', auto_now=True)
+
+    class Meta:
+        db_table = 'classification_rules'
+        ordering = ['priority', 'id']
+
+    def __str__(self):
+        return f"{self.subcategory or self.category}: {self.keywords[:30]}"
+
+    @property
+    def keyword_list(self):
+        return [word.strip() for word in _KEYWORD_SEPARATOR.split(self.keywords) if word.strip()]
+
+
+class ClassificationRuleVersion(models.Model):
+    """
+    規則版本（單列，pk=1），規則變更時遞增，worker 以此判斷是否重新編譯
+
+    這一列由 migration 0003 建立且不應刪除（admin 不提供新增 / 刪除）；
+    萬一被刪除，bump() 以目前時間（毫秒）重建，版本號仍只增不減
+    """
+    version = models.PositiveBigIntegerField('版本', default=1)
+    updated_at = models.DateTimeField('更新時間', auto_now=True)
+
+    class Meta:
+        db_table = 'classification_rule_version'
+
+    def __str__(self):
+        return f"v{self.version}"
+
+    @staticmethod
+    def bump():
+        updated = ClassificationRuleVersion.objects.filter(pk=1).update(version=models.F('version') + 1)
+        if not updated:
+            # 原本的版本號已遺失，以毫秒時間戳重建（遠大於逐次遞增可能達到的值）
+            ClassificationRuleVersion.objects.update_or_create(
+                pk=1, defaults={'version': time.time_ns() // 1_000_000}
+            )
+
+
+class ProcessingJob(models.Model):
+    """
+    發票辨識背景工作（見 services/job_queue.py）
+
+    資料表即佇列：worker 以條件式 UPDATE 取得租約（lease），
+    租約到期仍未完成（worker 當機）的工作可被其他 worker 重新取得
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, '排隊中'), (RUNNING, '處理中'), (DONE, '完成'), (FAILED, '失敗')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField('狀態', max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    payload = models.BinaryField('影像', null=True)
+    result = models.JSONField('結果', null=True, blank=True)
+    error = models.TextField('錯誤訊息', blank=True, default='')
+    error_status = models.PositiveSmallIntegerField('錯誤 HTTP 狀態碼', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('嘗試次數', default=0)
+    lease_owner = models.CharField('租約持有者', max_length=100, blank=True, default='')
+    session_key = models.CharField('送出者 session', max_length=40, blank=True, default='')
+    lease_expires_at = models.DateTimeField('租約到期', null=True, blank=True)
+    created_at = models.DateTimeField('建立時間', auto_now_add=True)
+    finished_at = models.DateTimeField('完成時間', null=True, blank=True)
+    expires_at = models.DateTimeField('保留期限', null=True, blank=True)
+
+    class Meta:
+        db_table = 'processing_jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in (ProcessingJob.DONE, ProcessingJob.FAILED)
@@ -0,0 +1,234 @@
+# services/ngram_classifier.py
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from django.conf import settings
+from domain.enums import Category, SubCategory
+from services.category_memo import CategoryMemo
+
+logger = logging.getLogger(__name__)
+
+Classification = Tuple[Optional[SubCategory], Category]
+
+WEIGHTS_FILE = 'weights.npy'         # 舊版固定檔名（meta.json 沒有 weights 欄位時）
+META_FILE = 'meta.json'
+
+_FNV_PRIME = np.uint32(16777619)
+_FNV_OFFSET = 2166136261
+_MIX = np.uint32(0x2C1B3C6D)
+
+
+class NgramClassifier:
+    """
+    字元 n-gram 雜湊分類器（Multinomial Naive Bayes）
+
+    品名切成 1~3 字元 n-gram，以雜湊映射到固定維度；權重矩陣每列是一個雜湊特徵，
+    每欄是一個 (主分類, 細分類)，最後一欄標記訓練時是否出現過該特徵。
+    整批品名一次計算：n-gram 雜湊全部以 NumPy 向量運算產生，
+    取出對應的權重列後以 np.add.reduceat 依品名加總
+
+    模型存成目錄：weights-<版本>.npy（可 mmap）+ meta.json（標籤、參數與所用的權重檔名）
+    """
+
+    NGRAM_SIZES = (1, 2, 3)
+    DIMENSION = 1 << 16         # 雜湊維度（2 的次方）
+    ALPHA = 0.1                 # Laplace smoothing
+    MIN_PROBABILITY = 0.6       # 預設最低機率
+    MIN_COVERAGE = 0.3          # 品名 n-gram 至少有這個比例在訓練資料出現過
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray,
+                 labels: List[Classification], ngram_sizes: Sequence[int] = NGRAM_SIZES):
+        self.weights = weights
+        self.bias = bias
+        self.labels = labels
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.dimension = weights.shape[0]
+
+    @staticmethod
+    def train(samples: Iterable[Tuple[str, Category, Optional[SubCategory]]],
+              dimension: int = DIMENSION, alpha: float = ALPHA) -> 'NgramClassifier':
+        """
+        Args:
+            samples: [(品名, 主分類, 細分類), ...]
+        """
+        if dimension & (dimension - 1):
+            raise ValueError(f"dimension 必須是 2 的次方: {dimension}")
+        names, targets, labels, index = [], [], [], {}
+        for name, category, subcategory in samples:
+            if not name:
+                continue
+            label = (subcategory, category)
+            if label not in index:
+                index[label] = len(labels)
+                labels.append(label)
+            names.append(name)
+            targets.append(index[label])
+        if not labels:
+            raise ValueError("沒有可訓練的品項")
+
+        hashes, owners = NgramClassifier._hash(names, NgramClassifier.NGRAM_SIZES, dimension)
+        counts = np.zeros((dimension, len(labels)), dtype=np.float64)
+        np.add.at(counts, (hashes, np.asarray(targets)[owners]), 1.0)
+
+        totals = counts.sum(axis=0)
+        weights = np.empty((dimension, len(labels) + 1), dtype=np.float32)
+        weights[:, :-1] = np.log((counts + alpha) / (totals + alpha * dimension))
+        weights[:, -1] = counts.sum(axis=1) > 0
+        priors = np.bincount(targets, minlength=len(labels)) / len(targets)
+        return NgramClassifier(weights, np.log(priors).astype(np.float32), labels)
+
+    def predict(self, names: Sequence[str], min_probability: Optional[float] = None) -> List[Optional[Classification]]:
+        """
+        整批分類
+
+        Returns:
+            每個品名的 (細分類, 主分類)；信心不足時為 None
+        """
+        if min_probability is None:
+            min_probability = getattr(settings, 'ITEM_CLASSIFIER_MIN_PROBABILITY', NgramClassifier.MIN_PROBABILITY)
+        results = [None] * len(names)
+        hashes, owners = NgramClassifier._hash(names, self.ngram_sizes, self.dimension)
+        if hashes.size == 0:
+            return results
+
+        order = np.argsort(owners, kind='stable')
+        owners = owners[order]
+        rows = self.weights[hashes[order]]
+        starts = np.flatnonzero(np.concatenate(([True], owners[1:] != owners[:-1])))
+        sums = np.add.reduceat(rows, starts, axis=0)
+        counts = np.diff(np.append(starts, owners.size))
+
+        scores = sums[:, :-1] + self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        confident = (probs[np.arange(best.size), best] >= min_probability) & \
+                    (sums[:, -1] / counts >= NgramClassifier.MIN_COVERAGE)
+
+        for owner, label, ok in zip(owners[starts], best, confident):
+            if ok:
+                results[owner] = self.labels[label]
+        return results
+
+    def save(self, path):
+        """
+        寫入模型目錄
+
+        權重寫成新的 weights-<版本>.npy（不覆寫既有檔案），meta.json 記錄檔名並以 os.replace 原子替換，
+        讀取端看到的 meta.json 與權重檔一定是同一次存檔的；保留前一版權重檔給正在載入舊版的行程，更早的刪除
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        previous = NgramClassifier._weights_name(path)
+        weights_name = f'weights-{uuid.uuid4().hex}.npy'
+        meta = {
+            'labels': [[category.value, subcat.value if subcat else None] for subcat, category in self.labels],
+            'bias': self.bias.tolist(),
+            'ngram_sizes': list(self.ngram_sizes),
+            'dimension': self.dimension,
+            'weights': weights_name,
+        }
+        tmp_weights = path / f'{weights_name}.tmp'
+        with open(tmp_weights, 'wb') as f:
+            np.save(f, self.weights)
+        os.replace(tmp_weights, path / weights_name)
+        tmp_meta = path / f'{META_FILE}.tmp'
+        tmp_meta.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_meta, path / META_FILE)
+
+        for stale in [*path.glob('weights-*.npy'), path / WEIGHTS_FILE]:
+            if stale.name not in (weights_name, previous):
+                stale.unlink(missing_ok=True)
+
+    @staticmethod
+    def load(path) -> 'NgramClassifier':
+        """載入模型，權重以 mmap 開啟；權重與 meta.json 的維度、標籤數不符時拋出 ValueError"""
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text(encoding='utf-8'))
+        labels = [CategoryMemo.to_classification(category, subcat) for category, subcat in meta['labels']]
+        bias = np.asarray(meta['bias'], dtype=np.float32)
+        weights = np.load(path / meta.get('weights', WEIGHTS_FILE), mmap_mode='r')
+        expected = (meta['dimension'], len(labels) + 1)
+        if weights.shape != expected or bias.shape != (len(labels),):
+            raise ValueError(f"模型檔不一致: 權重 {weights.shape}，meta.json 預期 {expected}")
+        return NgramClassifier(weights, bias, labels, meta['ngram_sizes'])
+
+    @staticmethod
+    def _weights_name(path: Path) -> Optional[str]:
+        """目前 meta.json 使用的權重檔名（沒有模型時回傳 None）"""
+        try:
+            meta = json.loads((path / META_FILE).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return meta.get('weights', WEIGHTS_FILE)
+
+    @staticmethod
+    def _hash(names: Sequence[str], sizes: Sequence[int], dimension: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        所有品名的 n-gram 雜湊（FNV-1a 變形，uint32 溢位即取模）
+
+        Returns:
+            (雜湊特徵索引, 所屬品名索引)；跨越品名邊界的 n-gram 不計
+        """
+        text = ''.join(names)
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        lengths = np.fromiter((len(name) for name in names), dtype=np.int64, count=len(names))
+        owner = np.repeat(np.arange(len(names)), lengths)
+        mask = np.uint32(dimension - 1)
+
+        hashes, owners = [], []
+        for n in sizes:
+            m = codes.size - n + 1
+            if m <= 0:
+                continue
+            h = np.full(m, _FNV_OFFSET ^ n, dtype=np.uint32)
+            for k in range(n):
+                h ^= codes[k:k + m]
+                h *= _FNV_PRIME
+            h ^= h >> np.uint32(15)
+            h *= _MIX
+            h ^= h >> np.uint32(13)
+            valid = owner[:m] == owner[n - 1:n - 1 + m]
+            hashes.append((h & mask)[valid])
+            owners.append(owner[:m][valid])
+        if not hashes:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int64)
+        return np.concatenate(hashes), np.concatenate(owners)
+
+
+_classifier = None
+_classifier_key = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier() -> Optional[NgramClassifier]:
+    """
+    行程共用的分類器；模型檔不存在時回傳 None
+
+    重新訓練後（meta.json 修改時間改變）下次呼叫自動重新載入
+    """
+    global _classifier, _classifier_key
+    if not getattr(settings, 'ITEM_CLASSIFIER_ENABLED', True):
+        return None
+    path = Path(getattr(settings, 'ITEM_CLASSIFIER_PATH', Path(settings.BASE_DIR) / 'models' / 'item_classifier'))
+    try:
+        key = (str(path), (path / META_FILE).stat().st_mtime_ns)
+    except OSError:
+        return None
+    if key != _classifier_key:
+        with _classifier_lock:
+            if key != _classifier_key:
+                try:
+                    _classifier = NgramClassifier.load(path)
+                    logger.info(f"載入品名分類模型: {path} ({len(_classifier.labels)} 類)")
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"載入品名分類模型失敗: {e}")
+                    _classifier = None
+                _classifier_key = key
+    return _classifier
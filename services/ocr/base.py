@@ -1,5 +1,6 @@
 # services/ocr/base.py
 from abc import ABC, abstractmethod
+from services.ocr.tesseract_backend import get_backend
 
 class OCRResult:
     def __init__(self, text: str, source: str):
@@ -7,6 +8,15 @@ class OCRResult:
         self.source = source  # ocr_a / ocr_b
 
 class BaseOCR(ABC):
+    """
+    OCR 引擎基底類別
+
+    backend 負責實際呼叫 Tesseract（見 services/ocr/tesseract_backend.py），
+    未指定時依 settings.OCR_BACKEND 選擇
+    """
+    def __init__(self, backend=None):
+        self.backend = backend or get_backend()
+
     @abstractmethod
     def extract(self, image) -> OCRResult:
         pass
@@ -1,35 +1,106 @@
 # services/ocr/dual_ocr.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from django.conf import settings
+from services.ocr.layout import ReceiptLayout
 from services.ocr.ocr_chi_eng import ChiEngOCR
 from services.ocr.ocr_eng_digits import EngDigitsOCR
 
+
+def available_cores() -> int:
+    """此 worker 實際可用的 CPU 核心數（考慮 taskset / cgroup affinity）"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return max(1, os.cpu_count() or 1)
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """
+    行程共用的 OCR 執行緒池，大小以可用核心數為上限
+
+    Tesseract 在子行程中執行，執行緒只負責等待，不受 GIL 影響
+    """
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=available_cores(),
+                    thread_name_prefix='dual-ocr'
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
 class DualOCRService:
     """
     Dual OCR Strategy
     OCR-A: chi_tra + eng
     OCR-B: eng + digits
+
+    兩個 pass 同時執行，總耗時接近較慢的那一個；
+    啟用版面分析時，各 pass 只辨識自己需要的區段（見 ReceiptLayout）
     """
 
-    def __init__(self):
+    def __init__(self, use_layout: Optional[bool] = None):
         self.ocr_a = ChiEngOCR()
         self.ocr_b = EngDigitsOCR()
+        if use_layout is None:
+            use_layout = getattr(settings, 'OCR_ROI_ENABLED', True)
+        self.use_layout = use_layout
 
     def extract(self, image) -> dict:
         """
-        回傳結構化結果，保留來源
+        回傳結構化結果，保留來源與各 pass 耗時（秒）
         """
         print("services/ocr/dual_ocr.py DualOCRService.extract() - start")
-        result_a = self.ocr_a.extract(image)
-        result_b = self.ocr_b.extract(image)
-        print("services/ocr/dual_ocr.py DualOCRService.extract() - \n\tOCR-A result:", result_a)
-        print("services/ocr/dual_ocr.py DualOCRService.extract() - \n\tOCR-B result:", result_b)
+        started = time.perf_counter()
+        image_a = image_b = image
+        pixels = None
+        if self.use_layout:
+            crops = ReceiptLayout.split(image)
+            if crops is not None:
+                image_a, image_b = crops.ocr_a, crops.ocr_b
+                pixels = crops.pixels
+
+        if available_cores() > 1:
+            executor = _get_executor()
+            future_a = executor.submit(self._timed, self.ocr_a, image_a)
+            future_b = executor.submit(self._timed, self.ocr_b, image_b)
+            result_a, elapsed_a = future_a.result()
+            result_b, elapsed_b = future_b.result()
+        else:
+            result_a, elapsed_a = self._timed(self.ocr_a, image_a)
+            result_b, elapsed_b = self._timed(self.ocr_b, image_b)
+        elapsed = time.perf_counter() - started
+        print(f"services/ocr/dual_ocr.py DualOCRService.extract() - \n\tOCR-A {elapsed_a:.2f}s, OCR-B {elapsed_b:.2f}s, total {elapsed:.2f}s, pixels {pixels}")
         print("services/ocr/dual_ocr.py DualOCRService.extract() - end")
         return {
             "ocr_a": {
                 "purpose": "store_name / items",
-                "text": result_a.text
+                "text": result_a.text,
+                "elapsed": elapsed_a
             },
             "ocr_b": {
                 "purpose": "amount / date / invoice_number",
-                "text": result_b.text
-            }
+                "text": result_b.text,
+                "elapsed": elapsed_b
+            },
+            "elapsed": elapsed,
+            "pixels": pixels
         }
+
+    @staticmethod
+    def _timed(ocr, image):
+        started = time.perf_counter()
+        result = ocr.extract(image)
+        return result, time.perf_counter() - started
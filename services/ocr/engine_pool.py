@@ -0,0 +1,159 @@
+# services/ocr/engine_pool.py
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OCREngineUnavailable(Exception):
+    """OCR 引擎池在等待時間內無可用引擎"""
+    pass
+
+
+class OCREnginePool:
+    """
+    OCR 引擎池（每個 worker 行程共用一份）
+
+    OCRService 建構時會載入 easyocr 模型與 DualOCRService，需要數秒；
+    這裡在行程啟動時一次建立 size 個引擎，請求時借出、用完歸還，
+    避免每張紙本發票都重新載入模型。
+    """
+
+    def __init__(self, size: int = 1, factory: Optional[Callable] = None):
+        if size < 1:
+            raise ValueError("OCR 引擎池大小至少為 1")
+        self.size = size
+        self.pid = os.getpid()
+        self._factory = factory
+        self._engines = queue.Queue(maxsize=size)
+        self._warm_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._error = None
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._in_use = 0
+
+    @property
+    def ready(self) -> bool:
+        """所有引擎是否已載入完成"""
+        return self._ready.is_set()
+
+    def warm(self):
+        """
+        同步建立所有引擎
+
+        多個執行緒同時呼叫時只會建立一次，其餘呼叫會等到建立完成。
+        """
+        if self._ready.is_set():
+            return
+        with self._warm_lock:
+            if self._ready.is_set():
+                return
+            factory = self._factory or _default_factory
+            started = time.monotonic()
+            try:
+                while self._engines.qsize() < self.size:
+                    self._engines.put_nowait(factory())
+            except Exception as e:
+                self._error = str(e)
+                raise
+            self._error = None
+            self._ready.set()
+            logger.info(
+                f"OCR 引擎池已就緒: {self.size} 個引擎, 耗時 {time.monotonic() - started:.2f}s"
+            )
+
+    def warm_async(self) -> threading.Thread:
+        """在背景執行緒預熱，讓 worker 啟動不被模型載入卡住"""
+        def _run():
+            try:
+                self.warm()
+            except Exception:
+                logger.exception("OCR 引擎池預熱失敗")
+
+        thread = threading.Thread(target=_run, name='ocr-engine-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None):
+        """
+        借出一個引擎，離開 with 區塊時自動歸還
+
+        尚未預熱時會先同步預熱；全部引擎都在使用中時等待，
+        超過 timeout 秒則拋出 OCREngineUnavailable。
+        """
+        if not self._ready.is_set():
+            self.warm()
+
+        waited = 0.0
+        try:
+            engine = self._engines.get_nowait()
+        except queue.Empty:
+            started = time.monotonic()
+            try:
+                engine = self._engines.get(timeout=timeout)
+            except queue.Empty:
+                raise OCREngineUnavailable(f"等待 OCR 引擎超過 {timeout} 秒")
+            waited = time.monotonic() - started
+
+        with self._stats_lock:
+            self._checkouts += 1
+            self._in_use += 1
+            if waited:
+                self._waits += 1
+                self._wait_seconds += waited
+
+        try:
+            yield engine
+        finally:
+            with self._stats_lock:
+                self._in_use -= 1
+            self._engines.put_nowait(engine)
+
+    def stats(self) -> Dict:
+        """引擎池狀態與計數器"""
+        with self._stats_lock:
+            return {
+                'ready': self._ready.is_set(),
+                'size': self.size,
+                'in_use': self._in_use,
+                'available': self._engines.qsize(),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_seconds': round(self._wait_seconds, 3),
+                'error': self._error,
+            }
+
+
+def _default_factory():
+    # 延遲 import，避免載入本模組時就初始化 easyocr
+    from services.ocr_service import OCRService
+    return OCRService()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_engine_pool() -> OCREnginePool:
+    """
+    取得本行程的 OCR 引擎池
+
+    以 pid 判斷，fork 出來的 worker 會各自建立自己的引擎池。
+    """
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = OCREnginePool(size=getattr(settings, 'OCR_ENGINE_POOL_SIZE', 1))
+    return _pool
@@ -0,0 +1,188 @@
+# services/ocr/layout.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+import numpy as np
+from services.image_adapter import ImageAdapter
+
+Band = Tuple[int, int]
+
+
+@dataclass
+class LayoutCrops:
+    """版面分析結果：各 OCR 引擎要處理的影像與對應區段（原圖座標）"""
+    ocr_a: Image.Image
+    ocr_b: Image.Image
+    bands: Dict[str, List[Band]] = field(default_factory=dict)
+    pixels: Dict[str, int] = field(default_factory=dict)
+
+
+class ReceiptLayout:
+    """
+    發票版面分析（投影剖面）
+
+    以水平投影找出每一行；墨水密度過高的區塊（條碼、logo）不送 OCR，
+    高度遠超過一般行高的區塊（QR Code）視為表頭與品項明細的分界：
+    分界上方為表頭（店名、字軌、日期、總計），下方為品項明細。
+
+    OCR-A（店名 / 品項）：表頭前幾列 + 品項區
+    OCR-B（金額 / 日期 / 號碼）：表頭 + 品項區最後幾列（總計 / 合計）
+    """
+
+    ANALYSIS_WIDTH = 1000       # 分析用縮圖寬度
+    ANALYSIS_COLUMNS = (0.3, 0.7)  # 只在畫面中央取投影，避開兩側桌面 / 其他單據
+    MIN_ROW_INK = 0.02          # 列墨水比例超過此值視為文字列
+    GRAPHIC_DENSITY = 0.35      # 密度超過此值視為圖形（條碼 / logo）
+    TALL_RATIO = 3.0            # 高度超過中位行高倍數視為 QR 等分界區塊
+    MIN_HEADER_LINES = 3        # 分界上方至少要有幾行才採用
+    HEADER_MAX_LINES = 10       # 找不到分界時表頭的行數
+    STORE_NAME_LINES = 3        # 表頭前幾行給 OCR-A 辨識店名
+    FOOTER_LINES = 10           # 品項區最後幾行給 OCR-B 辨識總計
+    MIN_LINES = 3               # 行數太少時不裁切，直接用整張圖
+    PADDING = 3                 # 每段上下保留的像素（縮圖像素）
+    SEPARATOR = 8               # 拼接時各段之間的空白（原圖像素）
+
+    @staticmethod
+    def split(image: Image.Image) -> Optional[LayoutCrops]:
+        """
+        依版面切出兩個 OCR 引擎各自需要的區段並拼接
+
+        Returns:
+            LayoutCrops；版面無法判讀時回傳 None，呼叫端應改用整張圖
+        """
+        gray, scale = ReceiptLayout._analysis_gray(image)
+        lines = ReceiptLayout.find_lines(gray)
+        if len(lines) < ReceiptLayout.MIN_LINES:
+            return None
+
+        header, items = ReceiptLayout._sections(lines)
+        selected = {
+            'ocr_a': header[:ReceiptLayout.STORE_NAME_LINES] + items,
+            'ocr_b': header + items[-ReceiptLayout.FOOTER_LINES:],
+        }
+        if not selected['ocr_a'] or not selected['ocr_b']:
+            return None
+
+        bands = {
+            name: ReceiptLayout._to_bands(lines, indices, scale, image.height)
+            for name, indices in selected.items()
+        }
+        crops = {name: ReceiptLayout._stack(image, b) for name, b in bands.items()}
+        return LayoutCrops(
+            ocr_a=crops['ocr_a'],
+            ocr_b=crops['ocr_b'],
+            bands=bands,
+            pixels={
+                'source': image.width * image.height,
+                'ocr_a': crops['ocr_a'].width * crops['ocr_a'].height,
+                'ocr_b': crops['ocr_b'].width * crops['ocr_b'].height,
+            }
+        )
+
+    @staticmethod
+    def find_lines(gray: np.ndarray) -> List[Tuple[int, int, str]]:
+        """
+        以水平投影找出每一行
+
+        Returns:
+            [(top, bottom, kind), ...]，kind 為 'text' / 'graphic' / 'tall'，
+            座標為輸入陣列的列索引
+        """
+        width = gray.shape[1]
+        left, right = ReceiptLayout.ANALYSIS_COLUMNS
+        window = gray[:, int(width * left):max(int(width * right), int(width * left) + 1)]
+        if window.size == 0:
+            return []
+        ink = window <= ReceiptLayout._otsu(window)
+        row_ink = ink.mean(axis=1)
+
+        is_text = (row_ink > ReceiptLayout.MIN_ROW_INK).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], is_text, [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        if starts.size == 0:
+            return []
+
+        heights = ends - starts
+        valid = heights >= 2
+        starts, ends, heights = starts[valid], ends[valid], heights[valid]
+        if starts.size == 0:
+            return []
+
+        cumulative = np.concatenate(([0.0], np.cumsum(row_ink)))
+        density = (cumulative[ends] - cumulative[starts]) / heights
+        median_h = float(np.median(heights))
+        kinds = np.where(
+            density > ReceiptLayout.GRAPHIC_DENSITY, 'graphic',
+            np.where(heights > ReceiptLayout.TALL_RATIO * median_h, 'tall', 'text')
+        )
+        return [
+            (int(s), int(e), str(k))
+            for s, e, k in zip(starts, ends, kinds)
+        ]
+
+    @staticmethod
+    def _sections(lines: List[Tuple[int, int, str]]) -> Tuple[List[int], List[int]]:
+        """
+        將行索引分成表頭與品項區
+
+        以最後一個夠高的區塊（QR Code）為分界，分界本身與條碼 / logo 不送 OCR；
+        大字標題（字軌、期別）也可能被判為 tall，因此分界以上的 tall 區塊保留在表頭
+        """
+        text = [i for i, line in enumerate(lines) if line[2] == 'text']
+        tall = [i for i, line in enumerate(lines) if line[2] == 'tall']
+        for boundary in reversed(tall):
+            header = [i for i in range(boundary) if lines[i][2] != 'graphic']
+            if len(header) >= ReceiptLayout.MIN_HEADER_LINES:
+                items = [i for i in text if i > boundary]
+                return header, items
+        return text[:ReceiptLayout.HEADER_MAX_LINES], text[ReceiptLayout.HEADER_MAX_LINES:]
+
+    @staticmethod
+    def _to_bands(lines, indices: List[int], scale: float, height: int) -> List[Band]:
+        """相鄰的行合併成一段，並換算回原圖座標"""
+        bands = []
+        for idx in sorted(indices):
+            top, bottom, _ = lines[idx]
+            if bands and bands[-1][2] == idx - 1:
+                bands[-1] = (bands[-1][0], bottom, idx)
+            else:
+                bands.append((top, bottom, idx))
+        pad = ReceiptLayout.PADDING
+        return [
+            (max(0, int((top - pad) / scale)), min(height, int(round((bottom + pad) / scale))))
+            for top, bottom, _ in bands
+        ]
+
+    @staticmethod
+    def _stack(image: Image.Image, bands: List[Band]) -> Image.Image:
+        """將各段垂直拼接成一張圖，讓每個引擎只需呼叫一次 OCR"""
+        sep = ReceiptLayout.SEPARATOR
+        total = sum(bottom - top for top, bottom in bands) + sep * (len(bands) - 1)
+        canvas = Image.new(image.mode, (image.width, total), 'white')
+        y = 0
+        for top, bottom in bands:
+            canvas.paste(image.crop((0, top, image.width, bottom)), (0, y))
+            y += bottom - top + sep
+        return canvas
+
+    @staticmethod
+    def _analysis_gray(image: Image.Image) -> Tuple[np.ndarray, float]:
+        """取得分析用灰階縮圖與縮放比例"""
+        gray = image if image.mode == 'L' else image.convert('L')
+        factor = image.width // ReceiptLayout.ANALYSIS_WIDTH
+        if factor > 1:
+            gray = gray.reduce(factor)
+        return ImageAdapter.as_array(gray), gray.width / image.width
+
+    @staticmethod
+    def _otsu(gray: np.ndarray) -> int:
+        """Otsu 門檻值"""
+        hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+        prob = hist / gray.size
+        omega = np.cumsum(prob)
+        mu = np.cumsum(prob * np.arange(256))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma_b = (mu[-1] * omega - mu) ** 2 / (omega * (1.0 - omega))
+        sigma_b = np.nan_to_num(sigma_b)
+        return int(np.argmax(sigma_b))
@@ -1,6 +1,5 @@
 # services/ocr/ocr_eng_digits.py
 from services.ocr.base import BaseOCR, OCRResult
-import pytesseract
 from PIL import Image
 
 class EngDigitsOCR(BaseOCR):
@@ -8,19 +7,18 @@ class EngDigitsOCR(BaseOCR):
     OCR-B
     用於：金額 / 日期 / 發票號碼
     """
+    LANG = 'eng+digits'
+    PSM = 6
+    WHITELIST = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-/'
+
     def extract(self, image) -> OCRResult:
         text = self._run_ocr(image)
         return OCRResult(text=text, source="ocr_b")
 
     def _run_ocr(self, image: Image.Image) -> str:
         print("services/ocr/ocr_eng_digits.py EngDigitsOCR._run_ocr()")
-        print("text ocr-b:", pytesseract.image_to_string(
-            image,
-            lang='eng+digits',
-            config='--psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-/'
-            ))
-        return pytesseract.image_to_string(
-            image,
-            lang='eng+digits',
-            config='--psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-/'
-            )
+        text = self.backend.image_to_string(
+            image, lang=self.LANG, psm=self.PSM, whitelist=self.WHITELIST
+        )
+        print("text ocr-b:", text)
+        return text
@@ -0,0 +1,120 @@
+# services/ocr/preprocess.py
+import math
+from typing import Optional, Tuple
+from PIL import Image
+import numpy as np
+from django.conf import settings
+from services.image_adapter import ImageAdapter
+from services.ocr.layout import ReceiptLayout
+
+
+class OCRPreprocessor:
+    """
+    OCR 前處理：Grayscale → 字高正規化 → Adaptive Threshold（Sauvola）
+
+    輸出單通道二值影像（文字 0、背景 255），OCR-A / OCR-B 共用同一張，
+    縮放到目標行高後 tesseract 處理的像素也大幅減少
+    """
+
+    MIN_SCALE = 0.25
+    MAX_SCALE = 2.0
+    SCALE_TOLERANCE = 0.2   # 行高與目標相差 20% 以內不縮放
+    SAUVOLA_R = 128.0       # 標準差動態範圍（8-bit 灰階）
+
+    @staticmethod
+    def process(image: Image.Image, target_line_height: Optional[int] = None,
+                k: Optional[float] = None) -> Image.Image:
+        """
+        Args:
+            image: 任意模式的 PIL.Image
+            target_line_height: 目標文字行高（像素），預設 settings.OCR_TARGET_LINE_HEIGHT
+            k: Sauvola 參數，預設 settings.OCR_SAUVOLA_K
+
+        Returns:
+            PIL.Image.Image ('L' mode, 只有 0 / 255)
+        """
+        if target_line_height is None:
+            target_line_height = getattr(settings, 'OCR_TARGET_LINE_HEIGHT', 32)
+        if k is None:
+            k = getattr(settings, 'OCR_SAUVOLA_K', 0.2)
+
+        gray = image if image.mode == 'L' else image.convert('L')
+        gray = OCRPreprocessor.normalize_scale(gray, target_line_height)
+
+        window = max(15, (2 * target_line_height) | 1)
+        binary = OCRPreprocessor.sauvola(ImageAdapter.as_array(gray), window, k)
+        return ImageAdapter.share(binary)
+
+    @staticmethod
+    def estimate_line_height(gray: Image.Image) -> Optional[float]:
+        """以版面分析的文字行估計行高（原圖像素），找不到文字時回傳 None"""
+        analysis, scale = ReceiptLayout._analysis_gray(gray)
+        heights = [
+            bottom - top
+            for top, bottom, kind in ReceiptLayout.find_lines(analysis)
+            if kind == 'text'
+        ]
+        if not heights:
+            return None
+        return float(np.median(heights)) / scale
+
+    @staticmethod
+    def decode_side(probe: Image.Image, full_size: Tuple[int, int],
+                    target_line_height: Optional[int] = None) -> Optional[int]:
+        """
+        由縮圖估計行高，回傳 OCR 需要的解碼長邊（像素）
+
+        原圖行高遠大於目標時不必以原始解析度解碼（見 DecodedImage.get）；
+        找不到文字或需要放大時回傳 None（原始解析度）
+        """
+        if target_line_height is None:
+            target_line_height = getattr(settings, 'OCR_TARGET_LINE_HEIGHT', 32)
+        line_height = OCRPreprocessor.estimate_line_height(probe)
+        if not line_height:
+            return None
+        scale = target_line_height / (line_height * full_size[0] / probe.width)
+        if scale >= 1.0 - OCRPreprocessor.SCALE_TOLERANCE:
+            return None
+        scale = max(OCRPreprocessor.MIN_SCALE, scale)
+        return math.ceil(max(full_size) * scale)
+
+    @staticmethod
+    def normalize_scale(gray: Image.Image, target_line_height: int) -> Image.Image:
+        """將影像縮放到目標行高（手機照片通常是縮小）"""
+        line_height = OCRPreprocessor.estimate_line_height(gray)
+        if not line_height:
+            return gray
+        scale = target_line_height / line_height
+        scale = min(OCRPreprocessor.MAX_SCALE, max(OCRPreprocessor.MIN_SCALE, scale))
+        if abs(scale - 1.0) <= OCRPreprocessor.SCALE_TOLERANCE:
+            return gray
+        size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+        resample = Image.LANCZOS if scale < 1 else Image.BICUBIC
+        return gray.resize(size, resample)
+
+    @staticmethod
+    def sauvola(gray: np.ndarray, window: int, k: float) -> np.ndarray:
+        """
+        Sauvola 區域門檻（積分影像，O(像素) 與視窗大小無關）
+
+        T = m * (1 + k * (s / R - 1))，m / s 為視窗內平均與標準差
+        """
+        h, w = gray.shape
+        half = window // 2
+        padded = np.pad(gray, half + 1, mode='edge').astype(np.int64)[:-1, :-1]
+        integral = padded.cumsum(axis=0).cumsum(axis=1)
+        integral_sq = (padded * padded).cumsum(axis=0).cumsum(axis=1)
+
+        def box(table):
+            return (
+                table[window:window + h, window:window + w]
+                - table[:h, window:window + w]
+                - table[window:window + h, :w]
+                + table[:h, :w]
+            )
+
+        area = float(window * window)
+        mean = box(integral) / area
+        var = np.maximum(box(integral_sq) / area - mean * mean, 0.0)
+        threshold = mean * (1.0 + k * (np.sqrt(var) / OCRPreprocessor.SAUVOLA_R - 1.0))
+        return np.where(gray > threshold, np.uint8(255), np.uint8(0))
@@ -0,0 +1,79 @@
+# services/ocr/single_pass.py
+import re
+import time
+from typing import Dict, Optional
+from PIL import Image
+from django.conf import settings
+from services.ocr.base import BaseOCR, OCRResult
+from services.ocr.ocr_chi_eng import ChiEngOCR
+from services.ocr.ocr_eng_digits import EngDigitsOCR
+from services.invoice_parser import InvoiceParser
+
+
+class SinglePassOCRService(BaseOCR):
+    """
+    Single-pass OCR
+
+    只跑一次 chi_tra+eng 並取得逐字外框與信心值，
+    信心值偏低且含數字的 token 才以 OCR-B 的白名單在小區塊上重新辨識
+    """
+
+    NUMERIC = re.compile(r'\d')
+    CROP_PADDING = 4
+
+    def __init__(self, backend=None, min_confidence: Optional[float] = None):
+        super().__init__(backend)
+        if min_confidence is None:
+            min_confidence = getattr(settings, 'OCR_REOCR_CONFIDENCE', 80)
+        self.min_confidence = min_confidence
+
+    def extract(self, image: Image.Image) -> OCRResult:
+        return OCRResult(text=self.extract_tokens(image)['text'], source="single")
+
+    def extract_tokens(self, image: Image.Image) -> Dict:
+        """
+        Returns:
+            {
+                'tokens': [{'text', 'conf', 'left', 'top', 'width', 'height', 'line', 'reocr'}],
+                'text': '逐行合併的文字',
+                'reocr': 重新辨識的 token 數,
+                'elapsed': 秒
+            }
+        """
+        print("services/ocr/single_pass.py SinglePassOCRService.extract_tokens() - start")
+        started = time.perf_counter()
+        tokens = self.backend.image_to_data(image, lang=ChiEngOCR.LANG, psm=ChiEngOCR.PSM)
+
+        reocr = 0
+        for token in tokens:
+            token['reocr'] = False
+            if token['conf'] >= self.min_confidence or not self.NUMERIC.search(token['text']):
+                continue
+            text = self.backend.image_to_string(
+                self._crop(image, token),
+                lang=EngDigitsOCR.LANG,
+                psm=8,  # single word
+                whitelist=EngDigitsOCR.WHITELIST
+            ).strip()
+            if text:
+                token['text'] = text
+                token['reocr'] = True
+                reocr += 1
+
+        elapsed = time.perf_counter() - started
+        print(f"services/ocr/single_pass.py SinglePassOCRService.extract_tokens() - \n\t{len(tokens)} tokens, {reocr} re-OCR, {elapsed:.2f}s")
+        return {
+            'tokens': tokens,
+            'text': '\n'.join(InvoiceParser.join_token_lines(tokens)),
+            'reocr': reocr,
+            'elapsed': elapsed
+        }
+
+    def _crop(self, image: Image.Image, token: Dict) -> Image.Image:
+        pad = self.CROP_PADDING
+        return image.crop((
+            max(0, token['left'] - pad),
+            max(0, token['top'] - pad),
+            min(image.width, token['left'] + token['width'] + pad),
+            min(image.height, token['top'] + token['height'] + pad),
+        ))
@@ -0,0 +1,148 @@
+# services/ocr/tesseract_backend.py
+import logging
+import threading
+from typing import Dict, List, Optional
+from PIL import Image
+import pytesseract
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PyTesseractBackend:
+    """
+    pytesseract 後端（備援）
+
+    每次呼叫都會啟動 tesseract 子行程、寫入暫存圖檔並重新載入 traineddata
+    """
+    name = 'pytesseract'
+
+    def image_to_string(self, image: Image.Image, lang: str, psm: int = 6,
+                        whitelist: Optional[str] = None) -> str:
+        config = f'--psm {psm}'
+        if whitelist:
+            config += f' -c tessedit_char_whitelist={whitelist}'
+        return pytesseract.image_to_string(image, lang=lang, config=config)
+
+    def image_to_data(self, image: Image.Image, lang: str, psm: int = 6) -> List[Dict]:
+        """逐字（word）輸出文字、信心值、外框與行編號"""
+        data = pytesseract.image_to_data(
+            image, lang=lang, config=f'--psm {psm}', output_type=pytesseract.Output.DICT
+        )
+        tokens = []
+        line_ids = {}
+        for i, text in enumerate(data['text']):
+            text = (text or '').strip()
+            if data['level'][i] != 5 or not text:
+                continue
+            key = (data['page_num'][i], data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            line = line_ids.setdefault(key, len(line_ids))
+            tokens.append(_token(
+                text, float(data['conf'][i]), data['left'][i], data['top'][i],
+                data['width'][i], data['height'][i], line
+            ))
+        return tokens
+
+
+class TesserocrBackend:
+    """
+    tesserocr 後端（行程內 Tesseract API）
+
+    每個執行緒、每組語言保留一個已初始化的 PyTessBaseAPI，
+    traineddata 只載入一次，影像直接以記憶體中的 PIL.Image 傳入
+    """
+    name = 'tesserocr'
+
+    def __init__(self, tessdata_path: Optional[str] = None):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._tessdata_path = tessdata_path
+        self._local = threading.local()
+
+    def image_to_string(self, image: Image.Image, lang: str, psm: int = 6,
+                        whitelist: Optional[str] = None) -> str:
+        api = self._api(lang)
+        api.SetPageSegMode(psm)
+        api.SetVariable('tessedit_char_whitelist', whitelist or '')
+        api.SetImage(image)
+        return api.GetUTF8Text()
+
+    def image_to_data(self, image: Image.Image, lang: str, psm: int = 6) -> List[Dict]:
+        """逐字（word）輸出文字、信心值、外框與行編號"""
+        RIL = self._tesserocr.RIL
+        api = self._api(lang)
+        api.SetPageSegMode(psm)
+        api.SetVariable('tessedit_char_whitelist', '')
+        api.SetImage(image)
+        api.Recognize()
+
+        tokens = []
+        line = -1
+        for word in self._tesserocr.iterate_level(api.GetIterator(), RIL.WORD):
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line += 1
+            text = (word.GetUTF8Text(RIL.WORD) or '').strip()
+            if not text:
+                continue
+            box = word.BoundingBox(RIL.WORD)
+            if box is None:
+                continue
+            x1, y1, x2, y2 = box
+            tokens.append(_token(text, word.Confidence(RIL.WORD), x1, y1, x2 - x1, y2 - y1, max(line, 0)))
+        return tokens
+
+    def _api(self, lang: str):
+        """取得本執行緒該語言的 API，第一次使用時才初始化"""
+        apis = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+        api = apis.get(lang)
+        if api is None:
+            kwargs = {'lang': lang}
+            if self._tessdata_path:
+                kwargs['path'] = self._tessdata_path
+            api = self._tesserocr.PyTessBaseAPI(**kwargs)
+            apis[lang] = api
+            logger.info(f"初始化 Tesseract API: lang={lang}, thread={threading.current_thread().name}")
+        return api
+
+
+def _token(text: str, conf: float, left: int, top: int, width: int, height: int, line: int) -> Dict:
+    return {
+        'text': text,
+        'conf': conf,
+        'left': int(left),
+        'top': int(top),
+        'width': int(width),
+        'height': int(height),
+        'line': line,
+    }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    依 settings.OCR_BACKEND 取得行程共用的 OCR 後端
+
+    設定為 'tesserocr' 但未安裝時自動改用 pytesseract
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend(getattr(settings, 'OCR_BACKEND', 'pytesseract'))
+    return _backend
+
+
+def _create_backend(name: str):
+    if name == TesserocrBackend.name:
+        try:
+            return TesserocrBackend(getattr(settings, 'TESSDATA_PATH', None))
+        except ImportError:
+            logger.warning("未安裝 tesserocr，改用 pytesseract")
+    elif name != PyTesseractBackend.name:
+        logger.warning(f"未知的 OCR_BACKEND: {name}，改用 pytesseract")
+    return PyTesseractBackend()
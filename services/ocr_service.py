@@ -1,10 +1,11 @@
 # services/ocr_service.py
 import easyocr
 from PIL import Image
-import numpy as np
 from typing import Dict
+from django.conf import settings
 from services.ocr.dual_ocr import DualOCRService
-from services.invoice_parser import InvoiceParser
+from services.ocr.preprocess import OCRPreprocessor
+from services.ocr.single_pass import SinglePassOCRService
 
 class OCRService:
     """OCR 文字辨識服務"""
@@ -12,6 +13,7 @@ class OCRService:
     def __init__(self): 
         self.reader = easyocr.Reader(['ch_tra'], gpu=False)
         self.dual_ocr = DualOCRService()
+        self.single_pass = SinglePassOCRService()
 
     def extract_text(self, image: Image.Image) -> Dict[str, str]:
         """
@@ -19,24 +21,31 @@ class OCRService:
         
         Returns:
             {'raw_text': 'extracted text'}
+            dual 模式另含 'text_items'（OCR-A）/ 'text_meta'（OCR-B），
+            single 模式另含 'tokens'
         """
         print("services/ocr_service.py OCRService.extract_text() - start")
-        # 轉為 numpy array
-        img_array = np.array(image)
-        # print("services/ocr_service.py OCRService.extract_text() - \n\timage converted to numpy array", img_array)
-        
         # OCR 辨識
         # result = self.reader.readtext(img_array, detail=0)
         # print("services/ocr_service.py OCRService.extract_text() - \n\tOCR result:", result)
         # raw_text = '\n'.join(result)
         # print("services/ocr_service.py OCRService.extract_text() - \n\textracted raw_text:", raw_text)
         
-        ocr_result = self.dual_ocr.extract(image)
+        # 前處理（灰階 → 字高正規化 → Sauvola）只做一次，兩個 pass 共用
+        if getattr(settings, 'OCR_PREPROCESS_ENABLED', True):
+            image = OCRPreprocessor.process(image)
 
-        parsed_invoice = InvoiceParser().parse_ocr(
-            text_items=ocr_result["ocr_a"]["text"],
-            text_meta=ocr_result["ocr_b"]["text"]
-        )
-        print("services/ocr_service.py OCRService.extract_text() - \n\tparsed_invoice:", parsed_invoice)
+        # single-pass：一次 chi_tra+eng 取逐字結果，只重新辨識低信心的數字
+        if getattr(settings, 'OCR_MODE', 'dual') == 'single':
+            result = self.single_pass.extract_tokens(image)
+            return {'raw_text': result['text'], 'tokens': result['tokens']}
 
-        # return {'raw_text': raw_text}
+        ocr_result = self.dual_ocr.extract(image)
+        text_items = ocr_result["ocr_a"]["text"]
+        text_meta = ocr_result["ocr_b"]["text"]
+        print("services/ocr_service.py OCRService.extract_text() - end")
+        return {
+            'raw_text': '\n'.join(text for text in (text_items, text_meta) if text),
+            'text_items': text_items,
+            'text_meta': text_meta
+        }
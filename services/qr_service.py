@@ -1,48 +1,286 @@
 ﻿# services/qr_service.py
-from pyzbar.pyzbar import decode
-from PIL import Image
-from typing import List, Dict
+import threading
+from collections import OrderedDict
+from pyzbar.pyzbar import decode, ZBarSymbol
+from PIL import Image, ImageFilter, ImageOps
+import numpy as np
+from django.conf import settings
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from services.image_adapter import DecodedImage, ImageAdapter
+
+# 賣方統編 → 實際可解碼的編碼（右側 "**" QR 沿用同一賣方的編碼）
+_seller_encodings = OrderedDict()
+_seller_lock = threading.Lock()
 
 
 class QRService:
     """QR Code 掃描服務"""
-    
+
+    # 多尺度定位參數
+    SMALL_SIDE = 800            # 先掃描的灰階縮圖長邊
+    EXPECTED_CODES = 2          # 電子發票左右兩個 QR，找到即停止
+    CELL = 16                   # 定位格大小（縮圖像素）
+    EDGE_THRESHOLD = 40         # 相鄰像素差超過此值視為邊緣
+    CELL_DENSITY = 0.3          # 格內水平、垂直邊緣比例都超過此值視為 QR 候選
+    MIN_CELLS = 4               # 候選區塊最少格數
+    MAX_BOXES = 6               # 最多嘗試幾個候選區塊
+    CROP_MARGIN = 0.25          # 裁切時外擴比例（QR 需要 quiet zone）
+    # 前面都失敗時依序嘗試的廉價變形，依 decode() 回報的 variant 調整順序
+    VARIANT_ORDER = ('inverted', 'sharpened', 'rotated_90')
+
+    # 電子發票 QR 文字編碼（20260203_發票字軌.txt 第 12 欄：中文編碼參數）
+    HEADER_LENGTH = 77
+    CONTINUATION = b'**'        # 右側 QR 開頭
+    SELLER_ID = slice(45, 53)
+    ENCODING_FLAGS = {
+        b'0': 'cp950',          # Big5（cp950 為其超集）
+        b'1': 'utf-8',
+        b'2': 'ascii',          # Base64，品項內容留給解析器處理
+    }
+    FALLBACK_ENCODINGS = ('utf-8', 'cp950')
+
     @staticmethod
-    def decode(image: Image.Image) -> Dict[str, List[str]]:
+    def decode(image: Union[Image.Image, DecodedImage]) -> Dict:
         """
         掃描影像中的所有 QR Code
-        
+
+        先在灰階縮圖上掃描；不足時在定位到的區塊以原始解析度解碼，
+        再試反相 / 銳化 / 旋轉，最後才掃描整張原圖
+
         Returns:
-            {'raw_qrs': ['qr_string_1', 'qr_string_2']}
+            {
+                'raw_qrs': ['qr_string_1', 'qr_string_2'],
+                'variant': 'small',              # 第一個成功的嘗試，全部失敗為 None
+                'variants': ['small', 'located'] # 有解出 QR 的所有嘗試
+            }
         """
         print("services/qr_service.py QRService.decode() - called")
-        decoded_objs = decode(image)
-        raw_qrs = []
+        found = QRService.scan(image)
+        raw_qrs = [text for text in QRService.decode_payloads(list(found)) if len(text) >= 8]
+        variants = list(dict.fromkeys(found.values()))
+        print(f"services/qr_service.py QRService.decode() - decoded {len(raw_qrs)} QR codes, variants: {variants}")
+        return {
+            'raw_qrs': raw_qrs,
+            'variant': variants[0] if variants else None,
+            'variants': variants
+        }
+
+    @staticmethod
+    def decode_payloads(payloads: List[Union[bytes, str]]) -> List[str]:
+        """
+        依規格將 QR 原始資料轉成文字（保留順序）
 
-        def decode_bytes(data: bytes) -> str:
-            # 若 pyzbar 回傳的是已解碼字串，嘗試以 latin1 還原原始 bytes 再解碼
+        左側 QR 讀取 77 碼後的中文編碼參數只解碼一次；
+        右側 "**" QR 沒有編碼參數，沿用同一張發票左側 QR 的編碼
+        """
+        payloads = [QRService._to_bytes(data) for data in payloads]
+        texts = [None] * len(payloads)
+        encoding = None
+        for i, data in enumerate(payloads):
+            if isinstance(data, bytes) and not data.startswith(QRService.CONTINUATION):
+                texts[i], encoding = QRService._decode_left(data)
+        for i, data in enumerate(payloads):
+            if texts[i] is not None:
+                continue
             if isinstance(data, str):
-                try:
-                    return decode_bytes(data.encode("latin1"))
-                except Exception:
-                    return data.strip()
-            # 嘗試多種常見編碼，避免出現亂碼
-            for enc in ("utf-8", "utf-8-sig", "big5hkscs", "big5", "cp950", "gb18030", "shift_jis", "latin1"):
-                try:
-                    text = data.decode(enc).strip()
-                    if text:
-                        return text
-                except Exception:
-                    continue
-            return data.decode("utf-8", errors="replace").strip()
-        
-        for obj in decoded_objs:
+                texts[i] = data.strip()
+            else:
+                texts[i] = QRService.decode_text(data, encoding)[0]
+        return texts
+
+    @staticmethod
+    def encoding_flag(data: bytes) -> Optional[bytes]:
+        """
+        取出左側 QR 的中文編碼參數
+
+        77 碼之後為 :營業人自行使用區:品目筆數:總筆數:編碼參數:品項...
+        """
+        header = QRService.HEADER_LENGTH
+        if len(data) <= header or data[header:header + 1] != b':':
+            return None
+        parts = data[header + 1:].split(b':', 4)
+        if len(parts) < 4:
+            return None
+        return parts[3].strip() or None
+
+    @staticmethod
+    def decode_text(data: bytes, encoding: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """
+        以指定編碼解碼，失敗才依 FALLBACK_ENCODINGS 嘗試
+
+        Returns:
+            (文字, 成功的編碼)；都失敗時以 utf-8 取代無法解碼的字元，編碼為 None
+        """
+        for enc in dict.fromkeys((encoding,) + QRService.FALLBACK_ENCODINGS):
+            if enc is None:
+                continue
             try:
-                data = decode_bytes(obj.data)
-                # 過濾太短的資料
-                if len(data) >= 8:
-                    raw_qrs.append(data)
-            except Exception:
+                return data.decode(enc).strip(), enc
+            except UnicodeDecodeError:
                 continue
-        print(f"services/qr_service.py QRService.decode() - decoded {len(raw_qrs)} QR codes")
-        return {'raw_qrs': raw_qrs}
+        return data.decode('utf-8', errors='replace').strip(), None
+
+    @staticmethod
+    def _decode_left(data: bytes) -> Tuple[str, Optional[str]]:
+        seller = None
+        if len(data) >= QRService.HEADER_LENGTH:
+            seller = data[QRService.SELLER_ID].decode('ascii', errors='ignore')
+        encoding = QRService.ENCODING_FLAGS.get(QRService.encoding_flag(data))
+        if encoding is None and seller:
+            encoding = QRService._cached_encoding(seller)
+        text, encoding = QRService.decode_text(data, encoding)
+        if seller and encoding:
+            QRService._remember_encoding(seller, encoding)
+        return text, encoding
+
+    @staticmethod
+    def _to_bytes(data: Union[bytes, str]) -> Union[bytes, str]:
+        """pyzbar 回傳已解碼字串時，以 latin1 還原原始 bytes；無法還原則保留字串"""
+        if isinstance(data, bytes):
+            return data
+        try:
+            return data.encode('latin1')
+        except UnicodeEncodeError:
+            return data
+
+    @staticmethod
+    def _cached_encoding(seller: str) -> Optional[str]:
+        with _seller_lock:
+            encoding = _seller_encodings.get(seller)
+            if encoding is not None:
+                _seller_encodings.move_to_end(seller)
+            return encoding
+
+    @staticmethod
+    def _remember_encoding(seller: str, encoding: str):
+        with _seller_lock:
+            _seller_encodings[seller] = encoding
+            _seller_encodings.move_to_end(seller)
+            while len(_seller_encodings) > getattr(settings, 'QR_ENCODING_CACHE_SIZE', 1024):
+                _seller_encodings.popitem(last=False)
+
+    @staticmethod
+    def scan(image: Union[Image.Image, DecodedImage]) -> Dict[bytes, str]:
+        """
+        依序嘗試各種來源，回傳 {原始 QR bytes: 成功的嘗試名稱}（保留順序）
+
+        傳入 DecodedImage 時縮圖直接以縮小解碼取得，原始解析度的灰階影像
+        只有在縮圖不足、需要 'located' / 'full' 嘗試時才解碼
+        """
+        if isinstance(image, DecodedImage):
+            small = image.get('L', QRService.SMALL_SIDE)
+            full_size = image.size
+            scale = small.width / full_size[0]
+            full = lambda: image.get('L')
+        else:
+            gray = image if image.mode == 'L' else image.convert('L')
+            small, scale = QRService._downscale(gray)
+            full_size = gray.size
+            full = lambda: gray
+        found = {}
+        for name, candidates in QRService._attempts(full, small, scale, full_size):
+            for candidate in candidates:
+                for obj in decode(candidate, symbols=[ZBarSymbol.QRCODE]):
+                    found.setdefault(obj.data, name)
+                if len(found) >= QRService.EXPECTED_CODES:
+                    return found
+            # 縮圖只解出部分 QR 時，再到定位區塊以原始解析度補齊；其餘嘗試有結果即停止
+            if found and name != 'small':
+                return found
+        return found
+
+    @staticmethod
+    def _attempts(full: Callable[[], Image.Image], small: Image.Image, scale: float,
+                  full_size: Tuple[int, int]) -> Iterator[Tuple[str, List[Image.Image]]]:
+        """產生各次嘗試的影像（lazy，前面成功就不會計算後面的）"""
+        yield 'small', [small]
+        boxes = QRService.locate(small, scale, full_size)
+        yield 'located', [full().crop(box) for box in boxes] if boxes else []
+        for name in QRService.VARIANT_ORDER:
+            yield name, [QRService._variant(small, name)]
+        if scale < 1.0:
+            yield 'full', [full()]
+
+    @staticmethod
+    def locate(small: Image.Image, scale: float, full_size: Tuple[int, int]) -> List[Tuple[int, int, int, int]]:
+        """
+        在灰階縮圖上找出 QR 候選區塊，回傳原圖座標 (left, top, right, bottom)
+
+        QR 模組在水平、垂直方向都有密集的明暗變化；條碼只有水平變化，
+        一般文字密度較低。以格為單位統計邊緣比例後取相連區塊
+        """
+        pixels = ImageAdapter.as_array(small).astype(np.int16)
+        cell = QRService.CELL
+        rows, cols = (pixels.shape[0] - 1) // cell, (pixels.shape[1] - 1) // cell
+        if rows == 0 or cols == 0:
+            return []
+
+        dx = np.abs(np.diff(pixels, axis=1))[:rows * cell, :cols * cell] > QRService.EDGE_THRESHOLD
+        dy = np.abs(np.diff(pixels, axis=0))[:rows * cell, :cols * cell] > QRService.EDGE_THRESHOLD
+        density_x = dx.reshape(rows, cell, cols, cell).mean(axis=(1, 3))
+        density_y = dy.reshape(rows, cell, cols, cell).mean(axis=(1, 3))
+        density = np.minimum(density_x, density_y)
+        candidate = density > QRService.CELL_DENSITY
+
+        boxes = []
+        for top, left, bottom, right, count in QRService._components(candidate):
+            height, width = bottom - top, right - left
+            if count < QRService.MIN_CELLS or max(height, width) > 3 * min(height, width):
+                continue
+            margin_y = int(height * QRService.CROP_MARGIN) + 1
+            margin_x = int(width * QRService.CROP_MARGIN) + 1
+            score = float(density[top:bottom, left:right].mean())
+            boxes.append((score, (
+                max(0, int((left - margin_x) * cell / scale)),
+                max(0, int((top - margin_y) * cell / scale)),
+                min(full_size[0], int((right + margin_x) * cell / scale)),
+                min(full_size[1], int((bottom + margin_y) * cell / scale)),
+            )))
+        # QR 是最密的區塊，優先嘗試
+        boxes.sort(key=lambda item: -item[0])
+        return [box for _, box in boxes[:QRService.MAX_BOXES]]
+
+    @staticmethod
+    def _components(mask: np.ndarray) -> List[Tuple[int, int, int, int, int]]:
+        """候選格的相連區塊（8 鄰接），回傳 (top, left, bottom, right, 格數)"""
+        seen = np.zeros_like(mask)
+        height, width = mask.shape
+        components = []
+        for y, x in zip(*np.nonzero(mask)):
+            if seen[y, x]:
+                continue
+            seen[y, x] = True
+            stack = [(y, x)]
+            top, left, bottom, right, count = y, x, y + 1, x + 1, 0
+            while stack:
+                cy, cx = stack.pop()
+                count += 1
+                top, left = min(top, cy), min(left, cx)
+                bottom, right = max(bottom, cy + 1), max(right, cx + 1)
+                for ny in range(max(0, cy - 1), min(height, cy + 2)):
+                    for nx in range(max(0, cx - 1), min(width, cx + 2)):
+                        if mask[ny, nx] and not seen[ny, nx]:
+                            seen[ny, nx] = True
+                            stack.append((ny, nx))
+            components.append((int(top), int(left), int(bottom), int(right), count))
+        return components
+
+    @staticmethod
+    def _downscale(gray: Image.Image) -> Tuple[Image.Image, float]:
+        """長邊縮到 SMALL_SIDE，回傳縮圖與縮放比例"""
+        longest = max(gray.size)
+        if longest <= QRService.SMALL_SIDE:
+            return gray, 1.0
+        scale = QRService.SMALL_SIDE / longest
+        size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+        return gray.resize(size, Image.BILINEAR, reducing_gap=2.0), scale
+
+    @staticmethod
+    def _variant(small: Image.Image, name: str) -> Image.Image:
+        if name == 'inverted':
+            return ImageOps.invert(small)
+        if name == 'sharpened':
+            return small.filter(ImageFilter.SHARPEN)
+        if name == 'rotated_90':
+            return small.transpose(Image.Transpose.ROTATE_90)
+        raise ValueError(f"未知的 QR 變形: {name}")
@@ -0,0 +1,201 @@
+# services/result_cache.py
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    以影像內容雜湊為 key 的辨識結果快取（兩層）
+
+    - 記憶體：LRU，最多 RESULT_CACHE_SIZE 筆（每個行程各自一份）
+    - 磁碟：<RESULT_CACHE_PATH>/<版本>/<前 2 碼>/<sha256>.json，多個 worker 行程共用，
+      超過 RESULT_CACHE_TTL_SECONDS 視為過期；每 RESULT_CACHE_SWEEP_EVERY 次寫入（以及
+      run_invoice_worker 的清除週期）執行 sweep()，刪除過期與舊版本的檔案，
+      總大小超過 RESULT_CACHE_MAX_BYTES 時由最舊的檔案開始刪除
+
+    key 含流程版本（InvoicePipeline.VERSION），QR / OCR / 解析邏輯改版後舊結果自動失效。
+    值以 JSON 字串保存，每次取出都是新的物件，呼叫端可以直接修改
+    """
+
+    SIZE = 512
+    TTL_SECONDS = 7 * 24 * 3600
+    MAX_BYTES = 512 * 1024 * 1024
+    SWEEP_EVERY = 500
+
+    def __init__(self, path: Optional[Path], size: int = SIZE, ttl: float = TTL_SECONDS,
+                 max_bytes: int = MAX_BYTES, sweep_every: int = SWEEP_EVERY):
+        self.path = Path(path) if path else None
+        self.size = size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'swept': 0}
+
+    @staticmethod
+    def key(content: bytes, version) -> str:
+        return ResultCache.digest_key(hashlib.sha256(content).hexdigest(), version)
+
+    @staticmethod
+    def digest_key(digest: str, version) -> str:
+        """已算好的 SHA-256（例如 SpooledUpload 寫入時計算）"""
+        return f"{version}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return json.loads(text)
+
+        text = self._read(key)
+        with self._lock:
+            if text is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._remember(key, text)
+        return json.loads(text)
+
+    def put(self, key: str, value: Dict):
+        text = json.dumps(value, ensure_ascii=False, cls=DjangoJSONEncoder)
+        with self._lock:
+            self._stats['stores'] += 1
+            self._remember(key, text)
+            sweep = self.sweep_every and self._stats['stores'] % self.sweep_every == 0
+        self._write(key, text)
+        if sweep:
+            self.sweep(key.split(':', 1)[0])
+
+    def sweep(self, version=None) -> int:
+        """
+        清理磁碟層：過期的檔案、寫入中斷留下的暫存檔、version 以外的舊版本目錄，
+        之後總大小仍超過 max_bytes 時由最舊的檔案開始刪除
+
+        同一行程同時只執行一次（其他呼叫直接略過）；多個行程同時清理時忽略已被刪除的檔案
+
+        Returns:
+            刪除的檔案數
+        """
+        if self.path is None or not self._sweep_lock.acquire(blocking=False):
+            return 0
+        try:
+            removed = 0
+            now = time.time()
+            kept = []
+            for path in self.path.glob('*/*/*'):
+                try:
+                    stat = path.stat()
+                    stale = version is not None and path.parent.parent.name != str(version)
+                    if stale or now - stat.st_mtime > self.ttl:
+                        path.unlink()
+                        removed += 1
+                    elif path.name.endswith('.json'):
+                        kept.append((stat.st_mtime, stat.st_size, path))
+                except OSError:
+                    continue
+
+            total = sum(size for _, size, _ in kept)
+            for _, size, path in sorted(kept, key=lambda entry: entry[0]):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+
+            for directory in sorted(self.path.glob('*/*'), reverse=True) + sorted(self.path.glob('*')):
+                try:
+                    directory.rmdir()       # 只刪除空目錄
+                except OSError:
+                    continue
+            with self._lock:
+                self._stats['swept'] += removed
+            if removed:
+                logger.info(f"辨識結果快取已清除 {removed} 個檔案")
+            return removed
+        finally:
+            self._sweep_lock.release()
+
+    def clear(self):
+        """只清除記憶體層（磁碟層由 sweep() 清理）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), size=self.size)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        stats['disk'] = str(self.path) if self.path else None
+        return stats
+
+    def _remember(self, key: str, text: str):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def _file(self, key: str) -> Path:
+        version, digest = key.split(':', 1)
+        return self.path / version / digest[:2] / f'{digest}.json'
+
+    def _read(self, key: str) -> Optional[str]:
+        if self.path is None:
+            return None
+        path = self._file(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+    def _write(self, key: str, text: str):
+        if self.path is None:
+            return
+        path = self._file(key)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(text, encoding='utf-8')
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"寫入辨識結果快取失敗: {e}")
+            tmp.unlink(missing_ok=True)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """行程共用的辨識結果快取；RESULT_CACHE_ENABLED 為 False 時回傳 None"""
+    global _cache
+    if not getattr(settings, 'RESULT_CACHE_ENABLED', True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    getattr(settings, 'RESULT_CACHE_PATH', Path(settings.BASE_DIR) / 'cache' / 'results'),
+                    getattr(settings, 'RESULT_CACHE_SIZE', ResultCache.SIZE),
+                    getattr(settings, 'RESULT_CACHE_TTL_SECONDS', ResultCache.TTL_SECONDS),
+                    getattr(settings, 'RESULT_CACHE_MAX_BYTES', ResultCache.MAX_BYTES),
+                    getattr(settings, 'RESULT_CACHE_SWEEP_EVERY', ResultCache.SWEEP_EVERY)
+                )
+    return _cache
@@ -0,0 +1,196 @@
+# services/seller_index.py
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from django.conf import settings
+from domain.enums import Category, SubCategory
+
+logger = logging.getLogger(__name__)
+
+IDS_FILE = 'ids.npy'
+LABELS_FILE = 'labels.npy'
+OFFSETS_FILE = 'offsets.npy'
+NAMES_FILE = 'names.bin'
+META_FILE = 'meta.json'
+
+# 行業代號（財政部稅務行業標準分類，前 4 碼與 ISIC 相同）→ 預設分類
+# (代號前綴, 主分類, 細分類, 是否高信心)；高信心的賣方整張發票直接採用
+INDUSTRY_RULES = [
+    ('4730', Category.TRANSPORT, SubCategory.GASOLINE, True),        # 汽車燃料零售（加油站）
+    ('5221', Category.TRANSPORT, SubCategory.PARKING, True),         # 停車場
+    ('4911', Category.TRANSPORT, SubCategory.TRA, True),             # 鐵路客運
+    ('3510', Category.HOUSING, SubCategory.WATER_ELECTRIC, True),    # 電力供應
+    ('3600', Category.HOUSING, SubCategory.WATER_ELECTRIC, True),    # 用水供應
+    ('3520', Category.HOUSING, SubCategory.GAS_FEE, True),           # 氣體燃料供應
+    ('6110', Category.HOUSING, SubCategory.PHONE, True),             # 有線電信
+    ('6120', Category.HOUSING, SubCategory.PHONE, True),             # 無線電信
+    ('5914', Category.ENTERTAINMENT, SubCategory.MOVIE, True),       # 電影放映
+    ('5610', Category.FOOD, SubCategory.RESTAURANT, False),          # 餐館
+    ('5630', Category.FOOD, SubCategory.DRINK, False),               # 飲料店
+    ('4772', Category.MEDICAL, None, False),                         # 藥品及醫療用品零售
+    ('4711', Category.HOUSEHOLD_GOODS, SubCategory.SUNDRIES, False), # 綜合商品零售（超市 / 便利商店）
+]
+
+
+@dataclass(slots=True)
+class SellerInfo:
+    """賣方資料"""
+    seller_id: str
+    name: str
+    category: Optional[Category] = None
+    subcategory: Optional[SubCategory] = None
+    confident: bool = False     # 是否可直接決定整張發票的分類
+
+
+class SellerIndex:
+    """
+    賣方統編索引
+
+    統編轉成 uint32 排序存放，以 np.searchsorted 查詢（O(log n)）；
+    店名以 UTF-8 串接成一個檔案加上位移表，全部檔案都以 mmap 開啟，
+    上百萬筆營業登記資料也只佔用實際讀到的分頁
+    """
+
+    def __init__(self, ids: np.ndarray, labels: np.ndarray, offsets: np.ndarray, names,
+                 label_table: List[Tuple[Optional[Category], Optional[SubCategory], bool]]):
+        self.ids = ids
+        self.labels = labels
+        self.offsets = offsets
+        self.names = names
+        self.label_table = label_table
+
+    def __len__(self):
+        return int(self.ids.size)
+
+    def get(self, seller_id: Optional[str]) -> Optional[SellerInfo]:
+        key = SellerIndex._to_key(seller_id)
+        if key is None:
+            return None
+        pos = int(np.searchsorted(self.ids, key))
+        if pos >= self.ids.size or int(self.ids[pos]) != key:
+            return None
+        name = bytes(self.names[int(self.offsets[pos]):int(self.offsets[pos + 1])]).decode('utf-8')
+        category, subcategory, confident = self.label_table[int(self.labels[pos])]
+        return SellerInfo(seller_id, name, category, subcategory, confident)
+
+    @staticmethod
+    def build(rows: Iterable[Tuple[str, str, Optional[Category], Optional[SubCategory], bool]]) -> 'SellerIndex':
+        """
+        Args:
+            rows: [(統編, 店名, 主分類, 細分類, 是否高信心), ...]；統編重複時後者覆蓋前者
+        """
+        label_table = [(None, None, False)]
+        label_index = {label_table[0]: 0}
+        entries = {}
+        for seller_id, name, category, subcategory, confident in rows:
+            key = SellerIndex._to_key(seller_id)
+            if key is None:
+                continue
+            label = (category, subcategory, bool(confident and category is not None))
+            if label not in label_index:
+                label_index[label] = len(label_table)
+                label_table.append(label)
+            entries[key] = (name or '', label_index[label])
+
+        ids = np.fromiter(sorted(entries), dtype=np.uint32, count=len(entries))
+        labels = np.empty(ids.size, dtype=np.uint16)
+        offsets = np.zeros(ids.size + 1, dtype=np.int64)
+        blob = bytearray()
+        for pos, key in enumerate(ids.tolist()):
+            name, label = entries[key]
+            blob += name.encode('utf-8')
+            labels[pos] = label
+            offsets[pos + 1] = len(blob)
+        return SellerIndex(ids, labels, offsets, np.frombuffer(bytes(blob), dtype=np.uint8), label_table)
+
+    def save(self, path):
+        """寫入索引目錄（meta.json 最後寫入，載入端以它判斷是否更新）"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        arrays = {IDS_FILE: self.ids, LABELS_FILE: self.labels, OFFSETS_FILE: self.offsets}
+        for filename, array in arrays.items():
+            with open(path / f'{filename}.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+        (path / f'{NAMES_FILE}.tmp').write_bytes(bytes(self.names))
+        meta = {
+            'count': len(self),
+            'labels': [
+                [category.value if category else None, subcategory.value if subcategory else None, confident]
+                for category, subcategory, confident in self.label_table
+            ],
+        }
+        (path / f'{META_FILE}.tmp').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        for filename in (*arrays, NAMES_FILE, META_FILE):
+            os.replace(path / f'{filename}.tmp', path / filename)
+
+    @staticmethod
+    def load(path) -> 'SellerIndex':
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text(encoding='utf-8'))
+        label_table = [
+            (Category(category) if category else None, SubCategory.from_value(subcategory), confident)
+            for category, subcategory, confident in meta['labels']
+        ]
+        names = path / NAMES_FILE
+        if names.stat().st_size:
+            names = np.memmap(names, dtype=np.uint8, mode='r')
+        else:
+            names = np.empty(0, dtype=np.uint8)     # 空檔案無法 mmap
+        return SellerIndex(
+            np.load(path / IDS_FILE, mmap_mode='r'),
+            np.load(path / LABELS_FILE, mmap_mode='r'),
+            np.load(path / OFFSETS_FILE, mmap_mode='r'),
+            names,
+            label_table
+        )
+
+    @staticmethod
+    def industry_rule(code: Optional[str]) -> Optional[Tuple[Category, Optional[SubCategory], bool]]:
+        """依行業代號前綴取得預設分類"""
+        code = (code or '').strip()
+        for prefix, category, subcategory, confident in INDUSTRY_RULES:
+            if code.startswith(prefix):
+                return category, subcategory, confident
+        return None
+
+    @staticmethod
+    def _to_key(seller_id: Optional[str]) -> Optional[int]:
+        seller_id = (seller_id or '').strip()
+        if len(seller_id) != 8 or not seller_id.isdigit():
+            return None
+        return int(seller_id)
+
+
+_index = None
+_index_key = None
+_index_lock = threading.Lock()
+
+
+def get_seller_index() -> Optional[SellerIndex]:
+    """
+    行程共用的賣方索引；索引檔不存在時回傳 None
+
+    重新匯入後（meta.json 修改時間改變）下次呼叫自動重新載入
+    """
+    global _index, _index_key
+    path = Path(getattr(settings, 'SELLER_INDEX_PATH', Path(settings.BASE_DIR) / 'models' / 'seller_index'))
+    try:
+        key = (str(path), (path / META_FILE).stat().st_mtime_ns)
+    except OSError:
+        return None
+    if key != _index_key:
+        with _index_lock:
+            if key != _index_key:
+                try:
+                    _index = SellerIndex.load(path)
+                    logger.info(f"載入賣方索引: {path} ({len(_index)} 筆)")
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"載入賣方索引失敗: {e}")
+                    _index = None
+                _index_key = key
+    return _index
@@ -0,0 +1,11 @@
+# services/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from services.models import ClassificationRule, ClassificationRuleVersion
+
+
+@receiver(post_save, sender=ClassificationRule)
+@receiver(post_delete, sender=ClassificationRule)
+def bump_rule_version(sender, **kwargs):
+    """規則新增 / 修改 / 刪除時遞增版本"""
+    ClassificationRuleVersion.bump()
@@ -0,0 +1,110 @@
+# services/test_batch_processor.py
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.test import TestCase, override_settings
+from PIL import Image
+from services import batch_processor
+from services.batch_processor import BatchError, BatchProcessor
+from services.invoice_pipeline import InvoiceNotRecognized
+
+OUTCOME = {'data': {'number': 'DF62269413', 'items': []}, 'raw_qr_data': None, 'raw_ocr_data': None}
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+def make_png(size):
+    buffer = io.BytesIO()
+    Image.new('L', size).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def sources(files):
+    return [(name, io.BytesIO(content)) for name, content in files]
+
+
+def read_entries(batch):
+    return [(name, open(path, 'rb').read()) for name, path in batch]
+
+
+def fake_run(content):
+    if content == b'blank':
+        raise InvoiceNotRecognized('無法辨識發票內容')
+    return OUTCOME
+
+
+class BatchProcessorTestCase(TestCase):
+
+    def test_collect_expands_zip(self):
+        """測試 zip 內的影像展開，非影像與 macOS 中繼資料略過"""
+        archive = make_zip({'b.jpg': b'b', 'a.png': b'a', 'notes.txt': b'x', '__MACOSX/._a.png': b'x'})
+
+        with BatchProcessor.collect(sources([('month.zip', archive), ('c.jpg', b'c')])) as batch:
+            entries = read_entries(batch)
+            paths = [path for _, path in batch]
+
+        self.assertEqual(entries, [('month.zip/a.png', b'a'), ('month.zip/b.jpg', b'b'), ('c.jpg', b'c')])
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    @override_settings(BATCH_MAX_IMAGES=2, BATCH_MAX_IMAGE_BYTES=4)
+    def test_collect_limits(self):
+        """測試張數與大小上限"""
+        with self.assertRaises(BatchError):
+            BatchProcessor.collect(sources([('a.jpg', b'a'), ('b.jpg', b'b'), ('c.jpg', b'c')]))
+        with self.assertRaises(BatchError):
+            BatchProcessor.collect(sources([('big.jpg', b'12345')]))
+        with self.assertRaises(BatchError):
+            BatchProcessor.collect(sources([('big.zip', make_zip({'big.jpg': b'12345'}))]))
+
+    @override_settings(UPLOAD_MAX_PIXELS=10000)
+    def test_collect_checks_pixels_from_header(self):
+        """測試每張影像（含 zip 內的影像）送出前只讀標頭檢查像素上限"""
+        small, large = make_png((50, 50)), make_png((200, 100))
+        with BatchProcessor.collect(sources([('a.png', small)])) as batch:
+            self.assertEqual(len(batch), 1)
+
+        with mock.patch('PIL.ImageFile.ImageFile.load') as load:
+            with self.assertRaises(BatchError):
+                BatchProcessor.collect(sources([('large.png', large)]))
+            with self.assertRaises(BatchError) as raised:
+                BatchProcessor.collect(sources([('month.zip', make_zip({'a.png': small, 'b.png': large}))]))
+        load.assert_not_called()
+        self.assertIn('month.zip/b.png', str(raised.exception))
+
+    def test_process_yields_each_result(self):
+        """測試每張影像各自回傳結果，失敗的影像不影響其他影像"""
+        with ThreadPoolExecutor(2) as pool, \
+                mock.patch('services.batch_processor.get_process_pool', return_value=pool), \
+                mock.patch('services.invoice_pipeline.InvoicePipeline.run', side_effect=fake_run):
+            with BatchProcessor.collect(sources([('a.jpg', b'a'), ('b.jpg', b'blank')])) as batch:
+                results = sorted(BatchProcessor.process(batch), key=lambda r: r['index'])
+
+        self.assertEqual(results[0]['data'], OUTCOME['data'])
+        self.assertEqual((results[0]['filename'], results[0]['status']), ('a.jpg', 200))
+        self.assertEqual((results[1]['success'], results[1]['status']), (False, 400))
+
+    @override_settings(BATCH_PROCESS_POOL_SIZE=1)
+    def test_process_pool(self):
+        """測試實際的行程池（無法讀取的影像在子行程中回傳錯誤）"""
+        batch_processor.reset_process_pool()
+        try:
+            with BatchProcessor.collect(sources([('broken.jpg', b'not an image')])) as batch:
+                results = list(BatchProcessor.process(batch))
+        finally:
+            batch_processor.reset_process_pool()
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual((results[0]['success'], results[0]['status']), (False, 400))
+        self.assertIn('影像處理失敗', results[0]['error'])
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_batch_processor
@@ -0,0 +1,125 @@
+# services/test_category_memo.py
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from domain.enums import Category, SubCategory
+from services.category_memo import CategoryMemo, _cache
+from services.classify_service import InvoiceClassifier
+from services.models import ItemCategoryMemo
+
+
+class CategoryMemoTestCase(TestCase):
+
+    def setUp(self):
+        CategoryMemo.clear_cache()
+
+    def tearDown(self):
+        CategoryMemo.clear_cache()
+
+    def test_normalize(self):
+        """測試品名正規化"""
+        self.assertEqual(CategoryMemo.normalize(' ＫＳ 有機-橄欖油 '), 'ks有機橄欖油')
+
+    def test_record_and_lookup(self):
+        """測試記錄後查詢，品名寫法不同也能命中"""
+        CategoryMemo.record('KS 綜合堅果', Category.FOOD.value, SubCategory.SNACK.label, seller_id='47025240')
+
+        self.assertEqual(CategoryMemo.lookup('ks綜合堅果'), (SubCategory.SNACK, Category.FOOD))
+        self.assertEqual(ItemCategoryMemo.objects.count(), 2)
+
+    def test_seller_record_preferred(self):
+        """測試同一賣方的紀錄優先於不分賣方的紀錄"""
+        CategoryMemo.record('礦泉水', Category.FOOD.value, SubCategory.DRINK.value, seller_id='11111111')
+        CategoryMemo.record('礦泉水', Category.HOUSEHOLD_GOODS.value, seller_id='22222222')
+
+        self.assertEqual(CategoryMemo.lookup('礦泉水', '11111111'), (SubCategory.DRINK, Category.FOOD))
+        self.assertEqual(CategoryMemo.lookup('礦泉水', '33333333'), (None, Category.HOUSEHOLD_GOODS))
+
+    def test_cache_avoids_queries_and_updates_on_record(self):
+        """測試查詢結果（含查無資料）留在記憶體，確認後立即更新"""
+        with self.assertNumQueries(1):
+            self.assertIsNone(CategoryMemo.lookup('保鮮膜'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(CategoryMemo.lookup('保鮮膜'))
+
+        CategoryMemo.record('保鮮膜', Category.HOUSEHOLD_GOODS.value)
+        with self.assertNumQueries(0):
+            self.assertEqual(CategoryMemo.lookup('保鮮膜'), (None, Category.HOUSEHOLD_GOODS))
+
+    def test_classifier_uses_memo_first(self):
+        """測試分類時優先採用使用者確認過的分類"""
+        CategoryMemo.record('可口可樂', Category.ENTERTAINMENT.value)
+
+        result = InvoiceClassifier.classify({'items': [
+            {'name': '可口可樂', 'qty': 1, 'price': 38},
+            {'name': '咖啡', 'qty': 1, 'price': 50},
+        ]})
+
+        self.assertEqual(result['items'][0]['category'], Category.ENTERTAINMENT.value)
+        self.assertEqual(result['items'][1]['subcategory'], SubCategory.DRINK.value)
+
+    def test_prune(self):
+        """測試超過上限時刪除最舊的紀錄"""
+        for name in ('a', 'b', 'c'):
+            CategoryMemo.record(name, Category.FOOD.value)
+
+        self.assertEqual(CategoryMemo.prune(max_rows=2), 1)
+        self.assertEqual(ItemCategoryMemo.objects.count(), 2)
+
+
+    @override_settings(ITEM_MEMO_CACHE_TTL=60)
+    def test_cached_miss_expires(self):
+        """測試查無資料的快取到期後重新查詢（其他行程新增的紀錄因此生效）"""
+        self.assertIsNone(CategoryMemo.lookup('保鮮膜'))
+        ItemCategoryMemo.objects.create(name='保鮮膜', seller_id='', category=Category.HOUSEHOLD_GOODS.value)
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(CategoryMemo.lookup('保鮮膜'))
+        for key, (value, expires) in list(_cache.items()):
+            _cache[key] = (value, expires - 61)
+        with self.assertNumQueries(1):
+            self.assertEqual(CategoryMemo.lookup('保鮮膜'), (None, Category.HOUSEHOLD_GOODS))
+
+
+class ConfirmItemCategoryTestCase(TestCase):
+
+    def setUp(self):
+        CategoryMemo.clear_cache()
+        session = self.client.session
+        session['invoice_data'] = {'items': [
+            {'name': '可口可樂', 'qty': 1, 'price': 38,
+             'category': Category.FOOD.value, 'subcategory': SubCategory.DRINK.value},
+            {'name': '衛生紙', 'qty': 1, 'price': 99,
+             'category': Category.FOOD.value, 'subcategory': SubCategory.SNACK.value},
+        ]}
+        session.save()
+
+    def tearDown(self):
+        CategoryMemo.clear_cache()
+
+    def test_item_selects_rendered(self):
+        """測試確認頁輸出每個品項的分類選單，預選分類器的建議"""
+        response = self.client.get(reverse('client:confirm'))
+
+        self.assertContains(response, 'name="items-1-category"')
+        self.assertContains(response, 'name="items-1-subcategory"')
+        self.assertContains(response, '<option value="drink" selected>')
+
+    def test_only_changed_categories_recorded(self):
+        """測試只記錄使用者改過的品項分類，沒改的不寫入品名分類紀錄"""
+        data = {
+            'number': 'AB12345678', 'buyer_id': '', 'seller_id': '12345678', 'date': '2025-01-01',
+            'total': '137', 'category': Category.FOOD.value, 'subcategory': SubCategory.DRINK.value,
+            'owner': 'familyUse', 'invoice_type': 'paper',
+            'items-0-category': Category.FOOD.value, 'items-0-subcategory': SubCategory.DRINK.value,
+            'items-1-category': Category.HOUSEHOLD_GOODS.value, 'items-1-subcategory': '',
+        }
+        with mock.patch('client.views.GoogleSheetsService'):
+            response = self.client.post(reverse('client:confirm'), data)
+
+        self.assertRedirects(response, reverse('client:success'), fetch_redirect_response=False)
+        self.assertEqual(set(ItemCategoryMemo.objects.values_list('name', flat=True)), {'衛生紙'})
+        self.assertEqual(CategoryMemo.lookup('衛生紙', '12345678'), (None, Category.HOUSEHOLD_GOODS))
+
+# 單一測試檔案執行
+# python manage.py test services.test_category_memo
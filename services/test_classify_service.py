@@ -1,6 +1,11 @@
 # service/test_classify_service.py
-from django.test import TestCase
-from services.classify_service import InvoiceClassifier
+from unittest import mock
+from django.test import TestCase, override_settings
+from domain.enums import Category, SubCategory
+from services import classify_service
+from services.classify_service import InvoiceClassifier, KeywordMatcher
+from services.models import ClassificationRule, ClassificationRuleVersion
+from services.keyword_automaton import KeywordAutomaton
 
 class InvoiceClassifierTestCase(TestCase):
     
@@ -31,6 +36,107 @@ class InvoiceClassifierTestCase(TestCase):
         self.assertEqual(result['main_category'], '行(交通費/油錢)')
 
 
+    def test_subcategory_precedence(self):
+        """測試細分類優先於主分類，且依規則順序而非字串位置"""
+        # '蛋' 是主分類關鍵字且出現在前面，'咖啡' 是細分類關鍵字
+        self.assertEqual(InvoiceClassifier._classify_item('蛋咖啡'), (SubCategory.DRINK, Category.FOOD))
+        # '餐' (RESTAURANT) 與 '茶' (DRINK) 同時出現時取規則順序較前的 DRINK
+        self.assertEqual(InvoiceClassifier._classify_item('餐後茶'), (SubCategory.DRINK, Category.FOOD))
+        self.assertEqual(InvoiceClassifier._classify_item('科克蘭保鮮膜'), (None, Category.OTHER))
+
+    def test_builtin_rules_when_table_unavailable(self):
+        """測試資料表無法使用時改用類別上的規則，內容改變才重新編譯"""
+        with mock.patch('services.classify_service.InvoiceClassifier._rules_version',
+                        side_effect=lambda: ('builtin', KeywordMatcher.signature(
+                            InvoiceClassifier.SUBCATEGORY_KEYWORDS, InvoiceClassifier.KEYWORDS))), \
+                override_settings(CLASSIFY_RULES_CHECK_SECONDS=0):
+            matcher = InvoiceClassifier.matcher()
+            self.assertIs(InvoiceClassifier.matcher(), matcher)
+
+            rules = dict(InvoiceClassifier.KEYWORDS)
+            rules[Category.FOOD] = rules[Category.FOOD] + ['堅果']
+            with mock.patch.object(InvoiceClassifier, 'KEYWORDS', rules):
+                self.assertIsNot(InvoiceClassifier.matcher(), matcher)
+                self.assertEqual(InvoiceClassifier._classify_item('綜合堅果'), (None, Category.FOOD))
+        classify_service._snapshot = None
+
+
+@override_settings(CLASSIFY_RULES_CHECK_SECONDS=0)
+class ClassificationRuleTestCase(TestCase):
+
+    def setUp(self):
+        classify_service._snapshot = None
+
+    def tearDown(self):
+        classify_service._snapshot = None
+
+    def test_seeded_rules_match_builtin(self):
+        """測試資料表預設規則與類別上的規則結果相同"""
+        builtin = KeywordMatcher.from_tables(InvoiceClassifier.SUBCATEGORY_KEYWORDS, InvoiceClassifier.KEYWORDS)
+        matcher = InvoiceClassifier.matcher()
+        for name in ('蛋咖啡', '餐後茶', '停車費', '電影票', '衛生紙', '保鮮膜', '台鐵便當'):
+            self.assertEqual(matcher.match(name), builtin.match(name), name)
+
+    def test_rule_change_swaps_matcher(self):
+        """測試規則變更後版本遞增並替換比對器，版本不變時沿用"""
+        matcher = InvoiceClassifier.matcher()
+        self.assertIs(InvoiceClassifier.matcher(), matcher)
+
+        ClassificationRule.objects.create(category=Category.FOOD.value, subcategory=SubCategory.SNACK.value,
+                                          keywords='堅果，洋芋片', priority=1)
+
+        swapped = InvoiceClassifier.matcher()
+        self.assertIsNot(swapped, matcher)
+        self.assertEqual(swapped.match('綜合堅果'), (SubCategory.SNACK, Category.FOOD))
+        self.assertEqual(matcher.match('綜合堅果'), (None, Category.OTHER))
+
+        ClassificationRule.objects.filter(keywords__contains='堅果').delete()
+        self.assertEqual(InvoiceClassifier.matcher().match('綜合堅果'), (None, Category.OTHER))
+
+    def test_inactive_rule_ignored(self):
+        """測試停用的規則不套用"""
+        rule = ClassificationRule.objects.get(subcategory=SubCategory.PARKING.value)
+        rule.is_active = False
+        rule.save()
+
+        self.assertEqual(InvoiceClassifier._classify_item('停車費'), (None, Category.TRANSPORT))
+
+    def test_version_stays_monotonic_when_row_deleted(self):
+        """測試版本列被刪除後 bump() 重建的版本號仍大於先前的版本"""
+        for _ in range(3):
+            ClassificationRuleVersion.bump()
+        before = ClassificationRuleVersion.objects.get(pk=1).version
+        ClassificationRuleVersion.objects.all().delete()
+
+        ClassificationRuleVersion.bump()
+        rebuilt = ClassificationRuleVersion.objects.get(pk=1).version
+        self.assertGreater(rebuilt, before)
+
+        ClassificationRuleVersion.bump()
+        self.assertEqual(ClassificationRuleVersion.objects.get(pk=1).version, rebuilt + 1)
+
+    def test_version_checked_at_most_once_per_interval(self):
+        """測試檢查間隔內不查詢資料表"""
+        InvoiceClassifier.matcher()
+        with override_settings(CLASSIFY_RULES_CHECK_SECONDS=60), self.assertNumQueries(0):
+            InvoiceClassifier.matcher()
+        with self.assertNumQueries(1):
+            InvoiceClassifier.matcher()
+
+
+class KeywordAutomatonTestCase(TestCase):
+
+    def test_first_match_uses_smallest_ordinal(self):
+        """測試回傳出現關鍵字中序號最小者（含重疊與後綴）"""
+        automaton = KeywordAutomaton([('he', 2), ('she', 1), ('his', 3), ('hers', 0)])
+
+        self.assertEqual(automaton.first_match('ushers'), 0)
+        self.assertEqual(automaton.first_match('ushe'), 1)
+        self.assertEqual(automaton.first_match('ahis'), 3)
+        self.assertIsNone(automaton.first_match('xyz'))
+        self.assertEqual(automaton.size, 4)
+
+
 # 單一測試檔案執行
 # python -m unittest services.test_invoice_parser
 
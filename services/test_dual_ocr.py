@@ -0,0 +1,49 @@
+# services/test_dual_ocr.py
+import time
+from unittest import mock
+from django.test import TestCase
+from services.ocr.base import OCRResult
+from services.ocr.dual_ocr import DualOCRService
+
+
+class SleepOCR:
+    def __init__(self, text, source, seconds):
+        self.text = text
+        self.source = source
+        self.seconds = seconds
+
+    def extract(self, image):
+        time.sleep(self.seconds)
+        return OCRResult(text=self.text, source=self.source)
+
+
+class DualOCRServiceTestCase(TestCase):
+
+    def setUp(self):
+        self.service = DualOCRService.__new__(DualOCRService)
+        self.service.use_layout = False
+        self.service.ocr_a = SleepOCR("全聯福利中心", "ocr_a", 0.2)
+        self.service.ocr_b = SleepOCR("AB12345678", "ocr_b", 0.2)
+
+    def test_passes_run_concurrently(self):
+        """測試兩個 pass 並行，總耗時接近較慢者"""
+        with mock.patch('services.ocr.dual_ocr.available_cores', return_value=2):
+            result = self.service.extract(object())
+
+        self.assertEqual(result['ocr_a']['text'], "全聯福利中心")
+        self.assertEqual(result['ocr_b']['text'], "AB12345678")
+        self.assertGreaterEqual(result['ocr_a']['elapsed'], 0.2)
+        self.assertGreaterEqual(result['ocr_b']['elapsed'], 0.2)
+        self.assertLess(result['elapsed'], 0.35)
+
+    def test_single_core_runs_sequentially(self):
+        """測試單核心時依序執行"""
+        with mock.patch('services.ocr.dual_ocr.available_cores', return_value=1):
+            result = self.service.extract(object())
+
+        self.assertGreaterEqual(result['elapsed'], 0.4)
+        self.assertEqual(result['ocr_b']['purpose'], "amount / date / invoice_number")
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_dual_ocr
@@ -0,0 +1,92 @@
+# services/test_engine_pool.py
+import threading
+from django.test import TestCase
+from services.ocr.engine_pool import OCREnginePool, OCREngineUnavailable
+
+
+class OCREnginePoolTestCase(TestCase):
+
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            engine = object()
+            self.created.append(engine)
+            return engine
+
+        self.factory = factory
+
+    def test_warm_builds_engines_once(self):
+        """測試預熱只建立一次引擎"""
+        pool = OCREnginePool(size=2, factory=self.factory)
+        self.assertFalse(pool.ready)
+
+        pool.warm()
+        pool.warm()
+
+        self.assertTrue(pool.ready)
+        self.assertEqual(len(self.created), 2)
+        self.assertEqual(pool.stats()['available'], 2)
+
+    def test_checkout_warms_lazily_and_counts(self):
+        """測試未預熱時借出會先預熱，並累計借出次數"""
+        pool = OCREnginePool(size=1, factory=self.factory)
+
+        with pool.checkout() as engine:
+            self.assertIs(engine, self.created[0])
+            self.assertEqual(pool.stats()['in_use'], 1)
+        with pool.checkout() as engine:
+            self.assertIs(engine, self.created[0])
+
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['waits'], 0)
+        self.assertEqual(stats['in_use'], 0)
+
+    def test_checkout_waits_when_busy(self):
+        """測試引擎皆忙碌時會等待並記錄"""
+        pool = OCREnginePool(size=1, factory=self.factory)
+        pool.warm()
+        released = threading.Event()
+
+        def hold():
+            with pool.checkout():
+                released.wait(1)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        while pool.stats()['in_use'] == 0:
+            pass
+
+        threading.Timer(0.05, released.set).start()
+        with pool.checkout(timeout=1):
+            pass
+        holder.join()
+
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_seconds'], 0)
+
+    def test_checkout_timeout(self):
+        """測試等待逾時"""
+        pool = OCREnginePool(size=1, factory=self.factory)
+        with pool.checkout():
+            with self.assertRaises(OCREngineUnavailable):
+                with pool.checkout(timeout=0.01):
+                    pass
+
+    def test_warm_failure_reported(self):
+        """測試預熱失敗時回報錯誤且未就緒"""
+        def broken():
+            raise RuntimeError("model missing")
+
+        pool = OCREnginePool(size=1, factory=broken)
+        with self.assertRaises(RuntimeError):
+            pool.warm()
+        self.assertFalse(pool.ready)
+        self.assertEqual(pool.stats()['error'], "model missing")
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_engine_pool
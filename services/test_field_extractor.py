@@ -0,0 +1,94 @@
+# services/test_field_extractor.py
+from datetime import date
+from django.test import TestCase
+from services.field_extractor import FieldExtractor
+
+TODAY = date(2022, 7, 10)
+
+
+class FieldExtractorTestCase(TestCase):
+
+    def test_extract_basic_fields(self):
+        """測試擷取發票號碼、日期、總金額"""
+        text = "電子發票證明聯\n111-07-08 12:30\nDF-62269413\n野川蛋黃派 65\n可口可樂 38\n總計: 103元"
+
+        best = FieldExtractor.best(FieldExtractor.extract(text, today=TODAY))
+
+        self.assertEqual(best, {'number': 'DF62269413', 'date': '2022-07-08', 'total': 103})
+
+    def test_date_in_item_line_loses_to_header_date(self):
+        """測試品項行中像日期的字串不會蓋過真正的開立日期"""
+        text = "\n".join(
+            ["全聯福利中心"] + ["-"] * 10 +
+            ["效期 112/01/05 鮮奶 89", "日期: 2022/07/08 12:30"]
+        )
+        candidates = FieldExtractor.extract(text, today=TODAY)
+
+        # 112/01/05 為未來日期，直接排除
+        self.assertEqual([c.value for c in candidates['date']], ['2022-07-08'])
+
+        text = "日期: 2022/07/08\n" + "\n".join(["品項"] * 10) + "\n贈品 111/06/30 1"
+        candidates = FieldExtractor.extract(text, today=TODAY)
+        self.assertEqual(candidates['date'][0].value, '2022-07-08')
+        self.assertGreater(candidates['date'][0].score, candidates['date'][1].score)
+
+    def test_total_prefers_largest_near_keyword(self):
+        """測試總金額取總計附近最大的金額，找零 / 現金行扣分"""
+        text = "小計 90\n合計\n103\n現金 500\n找零 397"
+
+        candidates = FieldExtractor.extract(text, today=TODAY)
+
+        self.assertEqual(candidates['total'][0].value, 103)
+        self.assertNotIn(500, [c.value for c in candidates['total'][:1]])
+
+    def test_agreement_between_passes(self):
+        """測試兩個 OCR pass 都認出的值加分"""
+        candidates = FieldExtractor.extract("DF62269413\nAB12345678", "DF62269413", today=TODAY)
+
+        self.assertEqual(candidates['number'][0].value, 'DF62269413')
+        self.assertEqual(candidates['number'][0].source, 'both')
+
+    def test_extract_batch(self):
+        """測試批次擷取"""
+        results = FieldExtractor.extract_batch(
+            ["總計 800", ("日期 111/07/08", "BB87654321")], today=TODAY
+        )
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(FieldExtractor.best(results[0])['total'], 800)
+        self.assertEqual(FieldExtractor.best(results[1])['date'], '2022-07-08')
+        self.assertEqual(FieldExtractor.best(results[1])['number'], 'BB87654321')
+
+    def test_no_candidates(self):
+        """測試沒有候選值時回傳 None"""
+        best = FieldExtractor.best(FieldExtractor.extract("", today=TODAY))
+        self.assertEqual(best, {'number': None, 'date': None, 'total': None})
+
+
+    def test_tokens_weighted_by_confidence(self):
+        """測試 token 串流中信心值低的候選值輸給信心值高的（金額、字軌號碼）"""
+        def token(text, left, line, conf):
+            return {'text': text, 'conf': conf, 'left': left, 'top': line * 30,
+                    'width': 20, 'height': 20, 'line': line}
+
+        tokens = [
+            token('AB12345678', 0, 0, 30), token('CD87654321', 0, 1, 95),
+            token('總計', 0, 2, 95), token('120', 60, 2, 95),
+            token('總計', 0, 3, 95), token('720', 60, 3, 30),
+        ]
+
+        # 不看信心值時兩個總計同分，較大的 720 勝出
+        plain = FieldExtractor.extract("\n".join(text for text, _ in FieldExtractor.token_lines(tokens)), today=TODAY)
+        self.assertEqual(plain['total'][0].value, 720)
+
+        candidates = FieldExtractor.extract_tokens(tokens, today=TODAY)
+
+        self.assertEqual([c.value for c in candidates['total'][:2]], [120, 720])
+        self.assertEqual([c.value for c in candidates['number']], ['CD87654321', 'AB12345678'])
+
+        # 重新辨識過的 token 視為可靠
+        tokens[5]['reocr'] = True
+        self.assertEqual(FieldExtractor.extract_tokens(tokens, today=TODAY)['total'][0].value, 720)
+
+# 單一測試檔案執行
+# python manage.py test services.test_field_extractor
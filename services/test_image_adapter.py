@@ -4,7 +4,11 @@ from PIL import Image
 import numpy as np
 import base64
 import io
-from services.image_adapter import ImageAdapter, ImageAdapterError
+from unittest import mock
+from services.image_adapter import DecodedImage, ImageAdapter, ImageAdapterError
+from services.ocr.layout import ReceiptLayout
+from services.ocr.preprocess import OCRPreprocessor
+from services.qr_service import QRService
 
 
 class ImageAdapterTestCase(TestCase):
@@ -49,4 +53,101 @@ class ImageAdapterTestCase(TestCase):
             ImageAdapter.from_source(None)
         
         with self.assertRaises(ImageAdapterError):
-            ImageAdapter.from_source("invalid_string")
\ No newline at end of file
+            ImageAdapter.from_source("invalid_string")
+
+
+def make_jpeg(size=(4000, 3000), orientation=None):
+    """模擬手機照片（12 MP JPEG），可指定 EXIF 方向"""
+    image = Image.new('RGB', size, 'white')
+    image.paste((200, 30, 30), (size[0] // 4, size[1] // 4, size[0] // 2, size[1] // 2))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class DecodedImageTestCase(TestCase):
+
+    def test_reduced_jpeg_decode(self):
+        """測試 JPEG 以縮小解碼取得灰階縮圖，並記住解碼結果"""
+        decoded = DecodedImage(make_jpeg())
+
+        small = decoded.get('L', 800)
+
+        self.assertEqual(decoded.size, (4000, 3000))
+        self.assertEqual(small.mode, 'L')
+        self.assertEqual(small.size, (800, 600))
+        self.assertIs(decoded.get('L', 800), small)
+        # 長邊已小於上限時與原始解析度共用同一份
+        self.assertIs(decoded.get('L', 5000), decoded.get('L'))
+
+    def test_exif_orientation(self):
+        """測試 EXIF 旋轉 90 度的影像寬高互換"""
+        decoded = DecodedImage(make_jpeg(orientation=6))
+
+        self.assertEqual(decoded.size, (3000, 4000))
+        self.assertEqual(decoded.get('L', 800).size, (600, 800))
+        self.assertEqual(decoded.get('RGB').size, (3000, 4000))
+
+    def test_non_jpeg_resized_from_full_decode(self):
+        """測試無法縮小解碼的格式由原尺寸縮圖"""
+        buffer = io.BytesIO()
+        Image.new('RGBA', (1600, 400), 'blue').save(buffer, format='PNG')
+        decoded = DecodedImage(buffer.getvalue())
+
+        self.assertEqual(decoded.get('RGB', 800).size, (800, 200))
+        self.assertEqual(decoded.get('RGB').mode, 'RGB')
+
+    def test_invalid_bytes(self):
+        """測試無效的 bytes"""
+        with self.assertRaises(ImageAdapterError):
+            DecodedImage(b'not an image')
+        with self.assertRaises(ImageAdapterError):
+            DecodedImage(b'')
+
+
+class ImageBufferTestCase(TestCase):
+
+    def test_from_array_bgr_and_gray(self):
+        """測試 BGR 陣列轉 RGB，灰階陣列不複製"""
+        bgr = np.zeros((30, 40, 3), dtype=np.uint8)
+        bgr[..., 0] = 255
+        gray = np.arange(1200, dtype=np.uint8).reshape(30, 40)
+
+        self.assertEqual(ImageAdapter.from_array(bgr).getpixel((0, 0)), (0, 0, 255))
+        self.assertEqual(ImageAdapter.from_source(bgr).getpixel((0, 0)), (0, 0, 255))
+        image = ImageAdapter.from_array(gray)
+        self.assertEqual(image.mode, 'L')
+        self.assertTrue(np.shares_memory(ImageAdapter.as_array(image), gray))
+
+    def test_from_image_keeps_mode(self):
+        """測試已解碼的灰階影像不轉 RGB，各階段取得同一份"""
+        image = ImageAdapter.from_array(np.full((300, 400), 255, dtype=np.uint8))
+        decoded = DecodedImage.from_image(image)
+
+        self.assertIs(decoded.get('L'), image)
+        self.assertEqual(decoded.array(200).shape, (150, 200))
+        self.assertEqual(decoded.get('RGB').mode, 'RGB')
+
+    def test_stages_read_shared_gray_buffer(self):
+        """測試 QR 定位、版面分析、二值化都直接讀取解碼時的灰階陣列（不再經 tobytes 複製）"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 1200), 'white').save(buffer, format='JPEG')
+        decoded = DecodedImage(buffer.getvalue())
+        small, gray = decoded.get('L', QRService.SMALL_SIDE), decoded.get('L', 1000)
+
+        with mock.patch.object(Image.Image, 'tobytes', autospec=True, side_effect=Image.Image.tobytes) as tobytes:
+            QRService.locate(small, small.width / decoded.size[0], decoded.size)
+            analysis, _ = ReceiptLayout._analysis_gray(gray)
+            binary = OCRPreprocessor.process(gray)
+            binary_array = ImageAdapter.as_array(binary)
+
+        self.assertEqual(tobytes.call_count, 0)
+        self.assertTrue(np.shares_memory(analysis, decoded.array(1000)))
+        self.assertEqual(binary_array.shape, (750, 1000))
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_image_adapter
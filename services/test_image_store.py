@@ -0,0 +1,106 @@
+# services/test_image_store.py
+import io
+import os
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from domain.models import Invoice
+from services.image_store import ImageStore
+from services.upload_ingest import SpooledUpload
+
+
+def spool(color='white', size=(800, 600)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG')
+    return SpooledUpload.from_file(SimpleUploadedFile('a.jpg', buffer.getvalue()))
+
+
+class ImageStoreTestCase(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        settings_override = override_settings(IMAGE_STORE_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.store = ImageStore.default()
+
+    def _age(self, name, hours):
+        past = time.time() - hours * 3600
+        os.utime(self.store.path(name), (past, past))
+
+    def test_put_sharded_and_deduplicated(self):
+        """測試以雜湊分片儲存，同內容第二次不再寫入，且不留下暫存檔"""
+        with spool() as upload:
+            first = self.store.put(upload, '.JPG')
+            second = self.store.put(upload, '.jpg')
+
+        digest = upload.sha256
+        self.assertEqual(first['name'], f'captures/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        self.assertEqual((first['created'], second['created']), (True, False))
+        self.assertEqual(list(self.store.names()), [first['name']])
+        self.assertEqual(self.store.find(digest), first['name'])
+        self.assertEqual([p.name for p in self.store.path(first['name']).parent.iterdir()], [f'{digest}.jpg'])
+
+    def test_thumbnail_generated_once_and_deleted_with_original(self):
+        """測試縮圖第一次請求時產生（WebP），刪除原圖時一併刪除"""
+        with spool() as upload:
+            name = self.store.put(upload, '.jpg')['name']
+        digest, _ = ImageStore.split(name)
+
+        path = self.store.thumbnail(digest, 160)
+        mtime = path.stat().st_mtime_ns
+        with Image.open(path) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (160, 120)))
+        self.assertEqual(self.store.thumbnail(digest, 160).stat().st_mtime_ns, mtime)
+        with self.assertRaises(ValueError):
+            self.store.thumbnail(digest, 123)
+
+        self.store.delete(name)
+        self.assertFalse(path.exists())
+        self.assertIsNone(self.store.thumbnail(digest, 160))
+
+    def test_gc_removes_unreferenced_images(self):
+        """測試 gc_images 只刪除沒有被發票參照且超過保留時間的影像"""
+        with spool('white') as a, spool('black') as b, spool('gray') as c:
+            referenced = self.store.put(a, '.jpg')['name']
+            unreferenced = self.store.put(b, '.jpg')['name']
+            recent = self.store.put(c, '.jpg')['name']
+        for name in (referenced, unreferenced):
+            self._age(name, 48)
+        self.store.thumbnail(ImageStore.split(unreferenced)[0], 160)
+        Invoice.objects.create(
+            number='AB12345678', buyer_id='00000000', seller_id='12345678',
+            date=date(2025, 1, 1), total=100, image=referenced
+        )
+
+        call_command('gc_images', '--dry-run', stdout=io.StringIO())
+        self.assertEqual(len(list(self.store.names())), 3)
+
+        call_command('gc_images', stdout=io.StringIO())
+        self.assertEqual(sorted(self.store.names()), sorted([referenced, recent]))
+        self.assertEqual(list((self.root / ImageStore.THUMBS).glob('*/*/*')), [])
+
+    def test_kept_images_survive_gc(self):
+        """測試 keep=True 保存的影像不受 gc_images 清除，以雜湊仍找得到"""
+        with spool() as upload:
+            saved = self.store.put(upload, '.jpg', keep=True)
+        digest, _ = ImageStore.split(saved['name'])
+        self.assertTrue(saved['name'].startswith(f'{ImageStore.SAVED}/'))
+        self._age(saved['name'], 48)
+
+        call_command('gc_images', stdout=io.StringIO())
+
+        self.assertTrue(self.store.path(saved['name']).exists())
+        self.assertEqual(self.store.find(digest), saved['name'])
+        self.assertIsNotNone(self.store.thumbnail(digest, 160))
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_image_store
@@ -1,25 +1,31 @@
 # services/test_invoice_parser.py
+import base64
 from django.test import TestCase
 from services.invoice_parser import InvoiceParser
 
 class InvoiceParserTestCase(TestCase):
     
+    HEADER = "DF622694131110708397000000062000000670000000008547587XKsayZY706hvyFpe6k3TQA=="
+
     def test_parse_qr_header(self):
         """測試解析 QR Header"""
-        qr_strings = [
-            "DF622694131110708397000000003000000030000000008547587XKsayZY706hvyFpe6k3TQ==",
-        ]
+        qr_strings = [self.HEADER]
         
         result = InvoiceParser.parse_qr(qr_strings)
         
         self.assertEqual(result['number'], 'DF62269413')
         self.assertEqual(result['date'], '2022-07-08')
-        self.assertEqual(result['total'], 30)
+        self.assertEqual(result['total'], 103)
+        self.assertEqual(result['sales'], 98)
+        self.assertEqual(result['random_code'], '3970')
+        self.assertIsNone(result['buyer_id'])
+        self.assertEqual(result['seller_id'], '08547587')
+        self.assertEqual(result['items'], [])
     
     def test_parse_qr_with_items(self):
         """測試解析包含品項的 QR"""
         qr_strings = [
-            "DF622694131110708397000000003000000030000000008547587XKsayZY706hvyFpe6k3TQ==",
+            self.HEADER,
             "**********:2:2:1:野川蛋黃派10粒:1:65:可口可樂1250CC:1:38"
         ]
         
@@ -29,6 +35,38 @@ class InvoiceParserTestCase(TestCase):
         self.assertEqual(result['items'][0]['name'], '野川蛋黃派10粒')
         self.assertEqual(result['items'][0]['qty'], 1)
         self.assertEqual(result['items'][0]['price'], 65)
+        self.assertEqual(result['item_count'], 2)
+        self.assertEqual(result['encoding'], '1')
+
+    def test_parse_qr_items_continue_in_right_qr(self):
+        """測試左側 QR 記載部分品項，其餘接續在右側 QR（右側 QR 先出現也可）"""
+        qr_strings = [
+            "**:可口可樂1250CC:1:38",
+            self.HEADER + ":**********:2:2:1:野川蛋黃派10粒:1:65",
+        ]
+
+        record = InvoiceParser.parse_qr_record(qr_strings)
+
+        self.assertEqual([item.name for item in record.items], ['野川蛋黃派10粒', '可口可樂1250CC'])
+        self.assertEqual(record.items[1].price, 38)
+        self.assertEqual(record.total_item_count, 2)
+
+    def test_parse_qr_base64_names(self):
+        """測試編碼參數為 2 時品名以 Base64 解碼"""
+        name = base64.b64encode('野川蛋黃派10粒'.encode('utf-8')).decode('ascii')
+        record = InvoiceParser.parse_qr_record([self.HEADER + f":**********:1:1:2:{name}:1:65"])
+
+        self.assertEqual(record.items[0].name, '野川蛋黃派10粒')
+
+    def test_parse_qr_invalid_header(self):
+        """測試表頭不符規格時拋出 ValueError"""
+        with self.assertRaises(ValueError):
+            InvoiceParser.parse_qr(["**:可口可樂1250CC:1:38"])
+        with self.assertRaises(ValueError):
+            InvoiceParser.parse_qr([self.HEADER[:40]])
+        with self.assertRaises(ValueError):
+            # 民國 111 年 13 月
+            InvoiceParser.parse_qr([self.HEADER.replace('1110708', '1111308')])
     
     def test_parse_ocr(self):
         """測試 OCR 解析"""
@@ -44,6 +82,36 @@ class InvoiceParserTestCase(TestCase):
         self.assertIn('2022', result['date'])
         self.assertEqual(result['total'], 800)
 
+    def test_parse_ocr_dual_texts(self):
+        """測試同時傳入 OCR-A / OCR-B 文字"""
+        result = InvoiceParser.parse_ocr(
+            text_items="全聯福利中心\n鮮奶 89\n總計 189",
+            text_meta="BB87654321\n111/07/08 12:30\n總計 189"
+        )
+
+        self.assertEqual(result['number'], 'BB87654321')
+        self.assertEqual(result['date'], '2022-07-08')
+        self.assertEqual(result['total'], 189)
+        self.assertEqual(result['candidates']['total'][0]['source'], 'both')
+
+    def test_parse_tokens(self):
+        """測試解析 single-pass OCR token"""
+        def token(text, left, line):
+            return {'text': text, 'conf': 90, 'left': left, 'top': line * 30,
+                    'width': 20, 'height': 20, 'line': line}
+
+        tokens = [
+            token('BB87654321', 0, 0),
+            token('111年', 0, 1), token('7月', 40, 1), token('8日', 80, 1),
+            token('總計:', 0, 2), token('800', 60, 2), token('元', 120, 2),
+        ]
+
+        result = InvoiceParser.parse_tokens(tokens)
+
+        self.assertEqual(result['number'], 'BB87654321')
+        self.assertEqual(result['date'], '2022-07-08')
+        self.assertEqual(result['total'], 800)
+
 # 單一測試檔案執行
 # python -m unittest services.test_invoice_parser
 
@@ -0,0 +1,94 @@
+# services/test_job_queue.py
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from services.invoice_pipeline import InvoiceNotRecognized
+from services.job_queue import JobQueue
+from services.models import ProcessingJob
+from services.ocr.engine_pool import OCREngineUnavailable
+
+OUTCOME = {'data': {'number': 'DF62269413', 'items': []}, 'raw_qr_data': ['DF62269413...'], 'raw_ocr_data': None}
+
+
+@override_settings(INVOICE_JOB_LEASE_SECONDS=60, INVOICE_JOB_MAX_ATTEMPTS=2, INVOICE_JOB_TTL_SECONDS=3600)
+class JobQueueTestCase(TestCase):
+
+    def test_claim_is_exclusive(self):
+        """測試同一個工作只有一個 worker 取得"""
+        job = JobQueue.submit(b'image')
+
+        claimed = JobQueue.claim('worker-a')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.attempts, claimed.lease_owner), (ProcessingJob.RUNNING, 1, 'worker-a'))
+        self.assertIsNone(JobQueue.claim('worker-b'))
+
+    def test_expired_lease_is_reclaimed(self):
+        """測試 worker 當機（租約到期）後由其他 worker 重試，舊 worker 無法寫入結果"""
+        job = JobQueue.submit(b'image')
+        stale = JobQueue.claim('worker-a')
+        ProcessingJob.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        retried = JobQueue.claim('worker-b')
+        self.assertEqual((retried.pk, retried.attempts, retried.lease_owner), (job.pk, 2, 'worker-b'))
+        self.assertFalse(JobQueue.complete(stale, 'worker-a', OUTCOME))
+        self.assertTrue(JobQueue.complete(retried, 'worker-b', OUTCOME))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.DONE)
+        self.assertIsNone(job.payload)
+
+    def test_purge_fails_exhausted_and_deletes_expired(self):
+        """測試嘗試次數用完的工作標記失敗，過期的工作刪除"""
+        crashed = JobQueue.submit(b'image')
+        ProcessingJob.objects.filter(pk=crashed.pk).update(
+            status=ProcessingJob.RUNNING, attempts=2, lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        expired = JobQueue.submit(b'image')
+        ProcessingJob.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(JobQueue.purge(), 1)
+        crashed.refresh_from_db()
+        self.assertEqual((crashed.status, crashed.error_status), (ProcessingJob.FAILED, 500))
+        self.assertFalse(ProcessingJob.objects.filter(pk=expired.pk).exists())
+
+    def test_run_next(self):
+        """測試處理結果：成功、無法辨識、暫時性錯誤放回佇列"""
+        self.assertIsNone(JobQueue.run_next('worker'))
+
+        job = JobQueue.submit(b'image')
+        with mock.patch('services.job_queue.InvoicePipeline.run', return_value=OUTCOME) as run:
+            done = JobQueue.run_next('worker')
+        run.assert_called_once_with(b'image')
+        self.assertEqual((done.pk, done.status, done.result), (job.pk, ProcessingJob.DONE, OUTCOME))
+
+        JobQueue.submit(b'image')
+        with mock.patch('services.job_queue.InvoicePipeline.run', side_effect=InvoiceNotRecognized('無法辨識發票內容')):
+            failed = JobQueue.run_next('worker')
+        self.assertEqual((failed.status, failed.error_status), (ProcessingJob.FAILED, 400))
+
+        JobQueue.submit(b'image')
+        with mock.patch('services.job_queue.InvoicePipeline.run', side_effect=OCREngineUnavailable('busy')):
+            busy = JobQueue.run_next('worker')
+            self.assertEqual((busy.status, busy.attempts), (ProcessingJob.QUEUED, 1))
+            busy = JobQueue.run_next('worker')
+        self.assertEqual((busy.status, busy.error_status), (ProcessingJob.FAILED, 503))
+
+    def test_worker_command_once(self):
+        """測試 worker 指令處理完佇列後結束"""
+        jobs = [JobQueue.submit(b'image') for _ in range(2)]
+        out = StringIO()
+        with mock.patch('services.job_queue.InvoicePipeline.run', return_value=OUTCOME):
+            call_command('run_invoice_worker', '--once', stdout=out)
+
+        self.assertIn('共處理 2 個工作', out.getvalue())
+        self.assertEqual(
+            set(ProcessingJob.objects.filter(pk__in=[job.pk for job in jobs]).values_list('status', flat=True)),
+            {ProcessingJob.DONE}
+        )
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_job_queue
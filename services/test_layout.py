@@ -0,0 +1,75 @@
+# services/test_layout.py
+from django.test import TestCase
+from PIL import Image
+import numpy as np
+from services.ocr.layout import ReceiptLayout
+
+
+def make_receipt(header_lines=5, item_lines=20):
+    """
+    合成發票影像：表頭文字列、條碼、QR 區塊、品項文字列
+    文字列以 1/4 黑的紋路模擬，條碼 2/3 黑，QR 為高度 5 倍的文字密度區塊
+    """
+    height = 60 + (header_lines + item_lines) * 24 + 40 + 100
+    canvas = np.full((height, 600), 255, dtype=np.uint8)
+    text = np.tile(np.array([0, 255, 255, 255], dtype=np.uint8), 150)
+    bars = np.tile(np.array([0, 0, 255], dtype=np.uint8), 200)
+
+    y = 30
+    rows = {'header': [], 'qr': None, 'items': []}
+    for _ in range(header_lines):
+        canvas[y:y + 12] = text
+        rows['header'].append((y, y + 12))
+        y += 24
+    canvas[y:y + 20] = bars
+    y += 40
+    canvas[y:y + 60] = text
+    rows['qr'] = (y, y + 60)
+    y += 90
+    for _ in range(item_lines):
+        canvas[y:y + 12] = text
+        rows['items'].append((y, y + 12))
+        y += 24
+    return Image.fromarray(canvas, 'L'), rows
+
+
+class ReceiptLayoutTestCase(TestCase):
+
+    def test_find_lines_kinds(self):
+        """測試文字列、條碼、QR 區塊的判斷"""
+        image, rows = make_receipt()
+        lines = ReceiptLayout.find_lines(np.asarray(image))
+        kinds = [kind for _, _, kind in lines]
+
+        self.assertEqual(len(lines), 5 + 1 + 1 + 20)
+        self.assertEqual(kinds[5], 'graphic')
+        self.assertEqual(kinds[6], 'tall')
+        self.assertEqual(lines[6][:2], rows['qr'])
+        self.assertEqual(kinds.count('text'), 25)
+
+    def test_split_skips_graphics(self):
+        """測試各引擎只拿到自己的區段，QR 與條碼不送 OCR"""
+        image, rows = make_receipt()
+        crops = ReceiptLayout.split(image)
+        self.assertIsNotNone(crops)
+
+        qr_top, qr_bottom = rows['qr']
+        for bands in crops.bands.values():
+            for top, bottom in bands:
+                self.assertTrue(bottom <= qr_top or top >= qr_bottom)
+
+        # OCR-B：表頭 + 最後幾行（總計）
+        self.assertEqual(crops.bands['ocr_b'][0][0], rows['header'][0][0] - ReceiptLayout.PADDING)
+        self.assertGreaterEqual(crops.bands['ocr_b'][-1][1], rows['items'][-1][1])
+        self.assertLess(crops.pixels['ocr_b'], crops.pixels['source'] * 0.7)
+        self.assertLess(crops.pixels['ocr_a'], crops.pixels['source'])
+        self.assertEqual(crops.ocr_a.mode, 'L')
+
+    def test_split_blank_image(self):
+        """測試無文字時回傳 None，改用整張圖"""
+        image = Image.new('RGB', (300, 400), 'white')
+        self.assertIsNone(ReceiptLayout.split(image))
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_layout
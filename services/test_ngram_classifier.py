@@ -0,0 +1,124 @@
+# services/test_ngram_classifier.py
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from domain.enums import Category, SubCategory
+from domain.models import Invoice, Item
+from services.classify_service import InvoiceClassifier
+from services import ngram_classifier
+from services.ngram_classifier import META_FILE, WEIGHTS_FILE, NgramClassifier
+
+SAMPLES = [
+    ('舒潔抽取式衛生紙', Category.HOUSEHOLD_GOODS, SubCategory.TISSUE),
+    ('春風衛生紙', Category.HOUSEHOLD_GOODS, SubCategory.TISSUE),
+    ('樂事洋芋片', Category.FOOD, SubCategory.SNACK),
+    ('品客洋芋片', Category.FOOD, SubCategory.SNACK),
+    ('科克蘭保鮮膜', Category.HOUSEHOLD_GOODS, SubCategory.SUNDRIES),
+    ('妙潔保鮮膜', Category.HOUSEHOLD_GOODS, SubCategory.SUNDRIES),
+]
+
+
+class NgramClassifierTestCase(TestCase):
+
+    def setUp(self):
+        self.model = NgramClassifier.train(SAMPLES, dimension=1 << 12)
+
+    def test_predict_batch(self):
+        """測試整批分類，未見過的品名信心不足回傳 None"""
+        result = self.model.predict(['五月花衛生紙', '洋芋片家庭號', 'ZESPRI 奇異果', ''])
+
+        self.assertEqual(result[0], (SubCategory.TISSUE, Category.HOUSEHOLD_GOODS))
+        self.assertEqual(result[1], (SubCategory.SNACK, Category.FOOD))
+        self.assertIsNone(result[2])
+        self.assertIsNone(result[3])
+
+    def test_save_and_load_mmap(self):
+        """測試存檔後以 mmap 載入結果相同"""
+        with tempfile.TemporaryDirectory() as path:
+            self.model.save(path)
+            loaded = NgramClassifier.load(path)
+
+            self.assertEqual(loaded.weights.__class__.__name__, 'memmap')
+            self.assertEqual(loaded.labels, self.model.labels)
+            self.assertEqual(loaded.predict(['保鮮膜 30cm']), self.model.predict(['保鮮膜 30cm']))
+            del loaded
+
+    def test_load_during_save_sees_consistent_model(self):
+        """測試存檔途中（新權重已寫入、meta.json 尚未替換）載入的仍是完整的舊模型"""
+        smaller = NgramClassifier.train(SAMPLES[:4], dimension=1 << 10)
+        replace = os.replace
+        loaded = []
+
+        def replace_and_load(src, dst):
+            if Path(dst).name == META_FILE:
+                loaded.append(NgramClassifier.load(Path(dst).parent))
+            replace(src, dst)
+
+        with tempfile.TemporaryDirectory() as path:
+            self.model.save(path)
+            with mock.patch.object(ngram_classifier.os, 'replace', side_effect=replace_and_load):
+                smaller.save(path)
+            current = NgramClassifier.load(path)
+
+            self.assertEqual(loaded[0].labels, self.model.labels)
+            self.assertEqual(loaded[0].weights.shape, self.model.weights.shape)
+            self.assertEqual(current.labels, smaller.labels)
+            self.assertEqual(len(list(Path(path).glob('weights-*.npy'))), 2)      # 目前與前一版
+            loaded.clear()
+            del current
+
+    def test_load_rejects_mismatched_files(self):
+        """測試權重檔與 meta.json 的維度或標籤數不符時拋出 ValueError"""
+        with tempfile.TemporaryDirectory() as path:
+            self.model.save(path)
+            meta_path = Path(path) / META_FILE
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            os.replace(Path(path) / meta.pop('weights'), Path(path) / WEIGHTS_FILE)
+            meta['labels'] = meta['labels'][:2]
+            meta['bias'] = meta['bias'][:2]
+            meta_path.write_text(json.dumps(meta), encoding='utf-8')
+
+            with self.assertRaises(ValueError):
+                NgramClassifier.load(path)
+
+    def test_train_rejects_bad_input(self):
+        """測試沒有資料或維度不是 2 的次方時拋出 ValueError"""
+        with self.assertRaises(ValueError):
+            NgramClassifier.train([])
+        with self.assertRaises(ValueError):
+            NgramClassifier.train(SAMPLES, dimension=1000)
+
+    def test_classifier_is_fallback_behind_keywords(self):
+        """測試關鍵字規則優先，分不出來的品項才用 n-gram 分類器"""
+        with mock.patch('services.classify_service.get_classifier', return_value=self.model):
+            result = InvoiceClassifier.classify({'items': [
+                {'name': '可口可樂', 'qty': 1, 'price': 38},
+                {'name': '五月花衛生紙', 'qty': 1, 'price': 199},
+                {'name': 'ZESPRI 奇異果', 'qty': 1, 'price': 299},
+            ]})
+
+        categories = [item['category'] for item in result['items']]
+        self.assertEqual(categories, [Category.FOOD.value, Category.HOUSEHOLD_GOODS.value, Category.OTHER.value])
+
+    def test_train_command(self):
+        """測試管理指令從 items 資料表訓練模型"""
+        invoice = Invoice.objects.create(
+            number='AB12345678', buyer_id='', seller_id='', date='2022-07-08', total=0
+        )
+        for idx, (name, category, subcat) in enumerate(SAMPLES):
+            Item.objects.create(invoice=invoice, name=name, unit_price=1, category=category.value,
+                                subcategory=subcat.value, order=idx)
+
+        with tempfile.TemporaryDirectory() as path:
+            call_command('train_item_classifier', output=path, min_items=1, dimension=1 << 12, stdout=mock.MagicMock())
+            model = NgramClassifier.load(Path(path))
+            self.assertEqual(model.predict(['五月花衛生紙'])[0], (SubCategory.TISSUE, Category.HOUSEHOLD_GOODS))
+            del model
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_ngram_classifier
@@ -0,0 +1,71 @@
+# services/test_preprocess.py
+from django.test import TestCase
+from PIL import Image
+import numpy as np
+from services.ocr.preprocess import OCRPreprocessor
+
+
+def text_rows(width, height, line_height, gap, background):
+    """合成文字列：1/4 黑的紋路，背景可為亮度漸層"""
+    canvas = np.array(background, dtype=np.float64)
+    pattern = np.tile(np.array([1, 0, 0, 0]), width // 4 + 1)[:width].astype(bool)
+    y = gap
+    while y + line_height < height:
+        rows = canvas[y:y + line_height]
+        rows[:, pattern] = rows[:, pattern] * 0.3
+        y += line_height + gap
+    return canvas.astype(np.uint8)
+
+
+class OCRPreprocessorTestCase(TestCase):
+
+    def test_sauvola_matches_direct_computation(self):
+        """測試積分影像結果與逐點計算一致"""
+        rng = np.random.default_rng(0)
+        gray = rng.integers(0, 256, size=(20, 30), dtype=np.uint8)
+        window, k = 5, 0.2
+
+        result = OCRPreprocessor.sauvola(gray, window, k)
+
+        padded = np.pad(gray, window // 2, mode='edge').astype(np.float64)
+        for y in range(gray.shape[0]):
+            for x in range(gray.shape[1]):
+                block = padded[y:y + window, x:x + window]
+                threshold = block.mean() * (1 + k * (block.std() / 128.0 - 1))
+                expected = 255 if gray[y, x] > threshold else 0
+                self.assertEqual(result[y, x], expected)
+
+    def test_uneven_lighting(self):
+        """測試陰影漸層下文字仍為黑、背景為白"""
+        width, height = 400, 300
+        background = np.tile(np.linspace(90, 250, width), (height, 1))
+        gray = text_rows(width, height, 12, 12, background)
+
+        binary = OCRPreprocessor.sauvola(gray, 25, 0.2)
+
+        self.assertEqual(set(np.unique(binary)), {0, 255})
+        blank_rows = binary[0:12]
+        self.assertGreater((blank_rows == 255).mean(), 0.95)
+        ink = binary[12:24, ::4]
+        self.assertGreater((ink == 0).mean(), 0.9)
+
+    def test_process_scales_to_target_line_height(self):
+        """測試縮放到目標行高並輸出單通道二值圖"""
+        gray = text_rows(1200, 2400, 80, 40, np.full((2400, 1200), 230.0))
+        image = Image.fromarray(gray, 'L').convert('RGB')
+
+        result = OCRPreprocessor.process(image, target_line_height=32, k=0.2)
+
+        self.assertEqual(result.mode, 'L')
+        self.assertEqual(result.size, (480, 960))
+        self.assertTrue(set(np.unique(np.asarray(result))) <= {0, 255})
+
+    def test_process_keeps_size_near_target(self):
+        """測試行高接近目標時不縮放"""
+        gray = text_rows(600, 600, 30, 20, np.full((600, 600), 230.0))
+        result = OCRPreprocessor.process(Image.fromarray(gray, 'L'), target_line_height=32)
+        self.assertEqual(result.size, (600, 600))
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_preprocess
@@ -28,6 +28,170 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, BASE_DIR)
 
 from services.qr_service import decode
+import io
+from collections import namedtuple
+from unittest import mock
+from django.test import TestCase
+from PIL import Image
+import numpy as np
+from services.image_adapter import DecodedImage
+from services.qr_service import QRService
+
+FakeDecoded = namedtuple('FakeDecoded', ['data', 'type'])
+
+
+def make_qr_like(size=1600, box=(600, 900, 1000, 1300)):
+    """白底上放一塊隨機黑白方格（模擬 QR 模組）"""
+    rng = np.random.default_rng(0)
+    pixels = np.full((size, size), 255, dtype=np.uint8)
+    left, top, right, bottom = box
+    module = 3
+    grid = rng.integers(0, 2, ((bottom - top) // module, (right - left) // module)) * 255
+    block = np.kron(grid, np.ones((module, module))).astype(np.uint8)
+    pixels[top:top + block.shape[0], left:left + block.shape[1]] = block
+    return Image.fromarray(pixels, 'L')
+
+
+class QRServiceScanTestCase(TestCase):
+
+    def test_small_image_success_stops_early(self):
+        """測試縮圖即解出兩個 QR 時不再嘗試其他來源"""
+        image = Image.new('RGB', (4000, 3000), 'white')
+        calls = []
+
+        def fake_decode(candidate, symbols=None):
+            calls.append(candidate.size)
+            return [FakeDecoded(b'AB12345678left', 'QRCODE'), FakeDecoded(b'**right-code', 'QRCODE')]
+
+        with mock.patch('services.qr_service.decode', side_effect=fake_decode):
+            result = QRService.decode(image)
+
+        self.assertEqual(result['raw_qrs'], ['AB12345678left', '**right-code'])
+        self.assertEqual(result['variant'], 'small')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(max(calls[0]), QRService.SMALL_SIDE)
+
+    def test_located_crop_decoded_at_full_resolution(self):
+        """測試縮圖失敗時改在定位區塊以原始解析度解碼"""
+        image = make_qr_like()
+        calls = []
+
+        def fake_decode(candidate, symbols=None):
+            calls.append(candidate.size)
+            if candidate.size != (QRService.SMALL_SIDE, QRService.SMALL_SIDE):
+                return [FakeDecoded(b'AB12345678left', 'QRCODE')]
+            return []
+
+        with mock.patch('services.qr_service.decode', side_effect=fake_decode):
+            result = QRService.decode(image)
+
+        self.assertEqual(result['raw_qrs'], ['AB12345678left'])
+        self.assertEqual(result['variant'], 'located')
+        # 只解碼裁切區塊，不掃描整張原圖
+        self.assertNotIn(image.size, calls)
+
+    def test_decoded_image_full_resolution_only_when_needed(self):
+        """測試 DecodedImage 縮圖即解出時不解碼原始解析度"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (4000, 3000), 'white').save(buffer, format='JPEG')
+        decoded = DecodedImage(buffer.getvalue())
+        calls = []
+
+        def fake_decode(candidate, symbols=None):
+            calls.append(candidate.size)
+            return [FakeDecoded(b'AB12345678left', 'QRCODE'), FakeDecoded(b'**right-code', 'QRCODE')]
+
+        with mock.patch('services.qr_service.decode', side_effect=fake_decode), \
+                mock.patch.object(decoded, '_decode', wraps=decoded._decode) as decode_image:
+            result = QRService.decode(decoded)
+
+        self.assertEqual(result['variant'], 'small')
+        self.assertEqual(calls, [(800, 600)])
+        decode_image.assert_called_once_with('L', QRService.SMALL_SIDE)
+
+    def test_variants_reported_when_all_fail(self):
+        """測試全部失敗時回報 None，並會嘗試整張原圖"""
+        image = Image.new('L', (1600, 1200), 'white')
+        calls = []
+
+        def fake_decode(candidate, symbols=None):
+            calls.append(candidate.size)
+            return []
+
+        with mock.patch('services.qr_service.decode', side_effect=fake_decode):
+            result = QRService.decode(image)
+
+        self.assertEqual(result['raw_qrs'], [])
+        self.assertIsNone(result['variant'])
+        self.assertEqual(result['variants'], [])
+        self.assertEqual(calls[-1], image.size)
+
+    def test_locate_finds_dense_block(self):
+        """測試定位器找到方格區塊"""
+        image = make_qr_like()
+        small, scale = QRService._downscale(image)
+        boxes = QRService.locate(small, scale, image.size)
+
+        self.assertTrue(boxes)
+        left, top, right, bottom = boxes[0]
+        self.assertLessEqual(left, 600)
+        self.assertLessEqual(top, 900)
+        self.assertGreaterEqual(right, 1000)
+        self.assertGreaterEqual(bottom, 1300)
+
+    def test_locate_ignores_blank_image(self):
+        """測試空白影像沒有候選區塊"""
+        image = Image.new('L', (1600, 1600), 'white')
+        small, scale = QRService._downscale(image)
+        self.assertEqual(QRService.locate(small, scale, image.size), [])
+
+class QRServiceTextTestCase(TestCase):
+
+    HEADER = "DF622694131110708397000000003000000030000000008547587XKsayZY706hvyFpe6k3TQA=="
+
+    def setUp(self):
+        from services import qr_service
+        qr_service._seller_encodings.clear()
+
+    def test_encoding_flag(self):
+        """測試讀取 77 碼後的中文編碼參數"""
+        data = (self.HEADER + ":**********:2:2:0:").encode('ascii')
+        self.assertEqual(QRService.encoding_flag(data), b'0')
+        self.assertIsNone(QRService.encoding_flag(self.HEADER.encode('ascii')))
+
+    def test_big5_left_and_right_decoded_once(self):
+        """測試 Big5 發票依編碼參數解碼，右側 QR 沿用同一編碼"""
+        left = (self.HEADER + ":**********:2:2:0:野川蛋黃派10粒:1:65").encode('cp950')
+        right = "**:可口可樂1250CC:1:38".encode('cp950')
+
+        with mock.patch.object(QRService, 'decode_text', wraps=QRService.decode_text) as decode_text:
+            texts = QRService.decode_payloads([right, left])
+
+        self.assertEqual(texts[0], "**:可口可樂1250CC:1:38")
+        self.assertTrue(texts[1].endswith("野川蛋黃派10粒:1:65"))
+        self.assertEqual([c.args[1] for c in decode_text.call_args_list], ['cp950', 'cp950'])
+
+    def test_utf8_flag(self):
+        """測試 UTF-8 編碼參數"""
+        left = (self.HEADER + ":**********:1:1:1:野川蛋黃派10粒:1:65").encode('utf-8')
+        self.assertTrue(QRService.decode_payloads([left])[0].endswith("野川蛋黃派10粒:1:65"))
+
+    def test_wrong_flag_falls_back_and_is_cached(self):
+        """測試編碼參數錯誤時改用備援編碼，並記住該賣方的編碼"""
+        left = (self.HEADER + ":**********:1:1:1:野川蛋黃派10粒:1:65").encode('cp950')
+        text = QRService.decode_payloads([left])[0]
+
+        self.assertTrue(text.endswith("野川蛋黃派10粒:1:65"))
+        self.assertEqual(QRService._cached_encoding('08547587'), 'cp950')
+
+    def test_str_payload_restored_from_latin1(self):
+        """測試 pyzbar 回傳字串時以 latin1 還原 bytes"""
+        left = (self.HEADER + ":**********:1:1:0:野川蛋黃派10粒:1:65").encode('cp950')
+        text = QRService.decode_payloads([left.decode('latin1')])[0]
+        self.assertTrue(text.endswith("野川蛋黃派10粒:1:65"))
+
+        self.assertEqual(QRService.decode_payloads(["**:野川:1:65"]), ["**:野川:1:65"])
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+# services/test_reclassify_items.py
+import json
+import tempfile
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from domain.enums import Category, SubCategory
+from domain.models import Invoice, Item
+from services import classify_service
+from services.category_memo import CategoryMemo
+
+
+class ReclassifyItemsTestCase(TestCase):
+
+    def setUp(self):
+        CategoryMemo.clear_cache()
+        classify_service._snapshot = None
+        for patcher in (
+            mock.patch('services.classify_service.get_seller_index', return_value=None),
+            mock.patch('services.classify_service.get_classifier', return_value=None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.stale = self._invoice('AB00000001', [
+            ('可樂', Category.OTHER.value, None),
+            ('咖啡', Category.OTHER.value, None),
+            ('衛生紙', Category.HOUSEHOLD_GOODS.value, None),
+        ])
+        # 細分類存成 label 的舊資料：分類實際上沒變，不列為變更，但改存 value
+        self.current = self._invoice('AB00000002', [
+            ('停車費', Category.TRANSPORT.value, SubCategory.PARKING.label),
+        ], category=Category.TRANSPORT.value, subcategory=SubCategory.PARKING.value)
+
+    def tearDown(self):
+        CategoryMemo.clear_cache()
+        classify_service._snapshot = None
+
+    def _invoice(self, number, items, category=Category.OTHER.value, subcategory=None):
+        invoice = Invoice.objects.create(
+            number=number, buyer_id='00000000', seller_id='12345678', date=date(2025, 1, 1),
+            total=100, category=category, subcategory=subcategory
+        )
+        for order, (name, item_category, item_subcategory) in enumerate(items):
+            Item.objects.create(invoice=invoice, name=name, quantity=1, unit_price=10,
+                                category=item_category, subcategory=item_subcategory, order=order)
+        return invoice
+
+    def _call(self, *args):
+        out = StringIO()
+        call_command('reclassify_items', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_dry_run_lists_changes_without_writing(self):
+        """測試 dry-run 只列出差異"""
+        out = self._call('--dry-run')
+
+        drink = f'{Category.OTHER.value} → {Category.FOOD.value}/{SubCategory.DRINK.value}'
+        self.assertIn(f'可樂：{drink}', out)
+        self.assertIn(f'發票 {self.stale.pk} 主分類：{drink}', out)
+        self.assertNotIn('停車費', out)
+        self.assertIn('將更新 3 筆品項、1 張發票', out)
+        self.assertEqual(Item.objects.get(name='可樂').category, Category.OTHER.value)
+
+    def test_reclassify_updates_items_and_main_category(self):
+        """測試寫回品項分類並以 classify 的方式重新計算主分類"""
+        self._call('--batch-size', '1', '--chunk-size', '1')
+
+        cola = Item.objects.get(name='可樂')
+        self.assertEqual((cola.category, cola.subcategory), (Category.FOOD.value, SubCategory.DRINK.value))
+        self.stale.refresh_from_db()
+        self.assertEqual((self.stale.category, self.stale.subcategory), (Category.FOOD.value, SubCategory.DRINK.value))
+        self.assertEqual(Item.objects.get(name='停車費').subcategory, SubCategory.PARKING.value)
+
+    def test_checkpoint_resumes_after_last_invoice(self):
+        """測試進度檔記錄最後處理的發票，再次執行時略過"""
+        with tempfile.TemporaryDirectory() as path:
+            checkpoint = Path(path) / 'reclassify.json'
+            self._call('--checkpoint', str(checkpoint))
+            state = json.loads(checkpoint.read_text(encoding='utf-8'))
+            self.assertEqual(state['last_invoice_id'], self.current.pk)
+            self.assertEqual(state['updated_items'], 3)
+
+            Item.objects.filter(name='可樂').update(category=Category.OTHER.value, subcategory=None)
+            self._call('--checkpoint', str(checkpoint))
+            self.assertEqual(Item.objects.get(name='可樂').category, Category.OTHER.value)
+
+            self._call('--checkpoint', str(checkpoint), '--restart')
+            self.assertEqual(Item.objects.get(name='可樂').category, Category.FOOD.value)
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_reclassify_items
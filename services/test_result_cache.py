@@ -0,0 +1,122 @@
+# services/test_result_cache.py
+import io
+import os
+import tempfile
+import time
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from services import result_cache
+from services.invoice_pipeline import InvoicePipeline
+from services.result_cache import ResultCache
+from services.upload_ingest import SpooledUpload
+
+RECOGNIZED = {
+    'parsed': {'number': 'DF62269413', 'seller_id': '', 'items': [{'name': '可樂', 'qty': 1, 'price': 30}]},
+    'raw_qr_data': ['DF62269413...'],
+    'raw_ocr_data': None
+}
+
+
+class ResultCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_memory_lru(self):
+        """測試記憶體層 LRU 淘汰與命中統計"""
+        cache = ResultCache(None, size=2)
+        for name in ('a', 'b'):
+            cache.put(ResultCache.key(name.encode(), 1), {'name': name})
+        cache.get(ResultCache.key(b'a', 1))
+        cache.put(ResultCache.key(b'c', 1), {'name': 'c'})
+
+        self.assertIsNone(cache.get(ResultCache.key(b'b', 1)))
+        self.assertEqual(cache.get(ResultCache.key(b'a', 1)), {'name': 'a'})
+        stats = cache.stats()
+        self.assertEqual((stats['memory_hits'], stats['misses'], stats['entries']), (2, 1, 2))
+
+    def test_disk_tier_shared_and_versioned(self):
+        """測試磁碟層跨行程共用（新的快取物件也能命中），版本不同則不命中"""
+        ResultCache(self.tmp.name).put(ResultCache.key(b'image', 1), RECOGNIZED)
+
+        cache = ResultCache(self.tmp.name)
+        self.assertEqual(cache.get(ResultCache.key(b'image', 1)), RECOGNIZED)
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+        self.assertIsNone(cache.get(ResultCache.key(b'image', 2)))
+
+    def test_disk_entry_expires(self):
+        """測試磁碟層過期"""
+        key = ResultCache.key(b'image', 1)
+        ResultCache(self.tmp.name).put(key, RECOGNIZED)
+        path = ResultCache(self.tmp.name)._file(key)
+        past = time.time() - 120
+        os.utime(path, (past, past))
+
+        self.assertIsNone(ResultCache(self.tmp.name, ttl=60).get(key))
+        self.assertFalse(path.exists())
+
+    def test_sweep_removes_expired_stale_and_oldest(self):
+        """測試 sweep 刪除過期、舊版本的檔案，超過大小上限時由最舊的開始刪除"""
+        cache = ResultCache(self.tmp.name, ttl=60, max_bytes=10 ** 6, sweep_every=0)
+        keys = {name: ResultCache.key(name.encode(), 2) for name in ('expired', 'old', 'new')}
+        for key in keys.values():
+            cache.put(key, RECOGNIZED)
+        cache.put(ResultCache.key(b'image', 1), RECOGNIZED)
+        for name, age in (('expired', 120), ('old', 30)):
+            past = time.time() - age
+            os.utime(cache._file(keys[name]), (past, past))
+
+        self.assertEqual(cache.sweep(2), 2)
+        self.assertEqual(sorted(p.name for p in cache.path.iterdir()), ['2'])
+        self.assertTrue(cache._file(keys['old']).exists())
+
+        cache.max_bytes = cache._file(keys['new']).stat().st_size
+        self.assertEqual(cache.sweep(2), 1)
+        self.assertFalse(cache._file(keys['old']).exists())
+        self.assertTrue(cache._file(keys['new']).exists())
+
+    def test_sweep_every_n_puts(self):
+        """測試每 sweep_every 次寫入自動清理磁碟層"""
+        cache = ResultCache(self.tmp.name, sweep_every=2)
+        with mock.patch.object(cache, 'sweep') as sweep:
+            for name in ('a', 'b', 'c'):
+                cache.put(ResultCache.key(name.encode(), 3), RECOGNIZED)
+        sweep.assert_called_once_with('3')
+
+    def test_pipeline_reuses_recognition_and_reclassifies(self):
+        """測試同一影像第二次只重新分類，不重跑 QR / OCR"""
+        result_cache._cache = None
+        self.addCleanup(setattr, result_cache, '_cache', None)
+        with override_settings(RESULT_CACHE_PATH=self.tmp.name), \
+                mock.patch.object(InvoicePipeline, 'recognize', return_value=RECOGNIZED) as recognize:
+            first = InvoicePipeline.run(b'image')
+            second = InvoicePipeline.run(b'image')
+            InvoicePipeline.run(b'image', use_cache=False)
+
+        self.assertEqual(recognize.call_count, 2)
+        self.assertEqual((first['cached'], second['cached']), (False, True))
+        self.assertEqual(second['data'], first['data'])
+        self.assertEqual(second['data']['items'][0]['category'], first['data']['items'][0]['category'])
+
+    def test_spooled_upload_shares_key_with_bytes(self):
+        """測試暫存檔上傳以寫入時計算的雜湊查詢，與 bytes 命中同一筆"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (20, 20), 'white').save(buffer, format='PNG')
+        content = buffer.getvalue()
+        result_cache._cache = None
+        self.addCleanup(setattr, result_cache, '_cache', None)
+        with override_settings(RESULT_CACHE_PATH=self.tmp.name), \
+                mock.patch.object(InvoicePipeline, 'recognize', return_value=RECOGNIZED) as recognize:
+            InvoicePipeline.run(content)
+            with SpooledUpload.from_file(SimpleUploadedFile('a.png', content)) as upload:
+                outcome = InvoicePipeline.run(upload)
+
+        recognize.assert_called_once_with(content)
+        self.assertTrue(outcome['cached'])
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_result_cache
@@ -0,0 +1,100 @@
+# services/test_seller_index.py
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from domain.enums import Category, SubCategory
+from services.classify_service import InvoiceClassifier
+from services.seller_index import SellerIndex
+
+ROWS = [
+    ('22555003', '統一超商股份有限公司', Category.OTHER, SubCategory.DELIVERY_711, True),
+    ('03077208', '台灣中油股份有限公司', Category.TRANSPORT, SubCategory.GASOLINE, True),
+    ('47025240', '好市多股份有限公司', Category.HOUSEHOLD_GOODS, SubCategory.SUNDRIES, False),
+    ('12345678', '無分類商號', None, None, False),
+]
+
+
+class SellerIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.index = SellerIndex.build(ROWS)
+
+    def test_get(self):
+        """測試以統編查詢"""
+        info = self.index.get('03077208')
+
+        self.assertEqual(info.name, '台灣中油股份有限公司')
+        self.assertEqual(info.subcategory, SubCategory.GASOLINE)
+        self.assertTrue(info.confident)
+        self.assertIsNone(self.index.get('00000001'))
+        self.assertIsNone(self.index.get('abc'))
+        self.assertIsNone(self.index.get(None))
+        self.assertIsNone(self.index.get('12345678').category)
+
+    def test_save_and_load_mmap(self):
+        """測試存檔後以 mmap 載入"""
+        with tempfile.TemporaryDirectory() as path:
+            self.index.save(path)
+            loaded = SellerIndex.load(path)
+
+            self.assertEqual(len(loaded), 4)
+            self.assertEqual(loaded.ids.__class__.__name__, 'memmap')
+            self.assertEqual(loaded.get('22555003').name, '統一超商股份有限公司')
+            self.assertEqual(loaded.get('47025240').category, Category.HOUSEHOLD_GOODS)
+            del loaded
+
+    def test_industry_rule(self):
+        """測試依行業代號前綴取得分類"""
+        self.assertEqual(SellerIndex.industry_rule('473011'), (Category.TRANSPORT, SubCategory.GASOLINE, True))
+        self.assertIsNone(SellerIndex.industry_rule('999999'))
+        self.assertIsNone(SellerIndex.industry_rule(None))
+
+    def test_import_command(self):
+        """測試由 CSV 匯入（明確分類優先於行業代號）"""
+        with tempfile.TemporaryDirectory() as path:
+            csv_path = Path(path) / 'sellers.csv'
+            csv_path.write_text(
+                "統一編號,營業人名稱,行業代號,category,subcategory\n"
+                "03077208,台灣中油股份有限公司,473011,,\n"
+                "22555003,統一超商股份有限公司,471112,其它,delivery_711\n"
+                "12345678,無分類商號,999999,,\n",
+                encoding='utf-8-sig'
+            )
+            call_command('import_seller_index', str(csv_path), output=path, stdout=mock.MagicMock())
+            index = SellerIndex.load(path)
+
+            self.assertEqual(index.get('03077208').subcategory, SubCategory.GASOLINE)
+            self.assertEqual(index.get('22555003').subcategory, SubCategory.DELIVERY_711)
+            self.assertTrue(index.get('22555003').confident)
+            self.assertFalse(index.get('12345678').confident)
+            del index
+
+    def test_classify_short_circuits_confident_seller(self):
+        """測試高信心賣方整張發票直接採用賣方分類"""
+        data = {'seller_id': '03077208', 'items': [{'name': '可口可樂', 'qty': 1, 'price': 38}]}
+        with mock.patch('services.classify_service.get_seller_index', return_value=self.index), \
+                mock.patch.object(InvoiceClassifier, 'matcher') as matcher:
+            result = InvoiceClassifier.classify(data)
+
+        matcher.assert_not_called()
+        self.assertEqual(result['main_category'], Category.TRANSPORT.value)
+        self.assertEqual(result['main_subcategory'], SubCategory.GASOLINE.value)
+        self.assertEqual(result['items'][0]['subcategory'], SubCategory.GASOLINE.value)
+        self.assertEqual(result['seller_name'], '台灣中油股份有限公司')
+
+    def test_classify_uses_seller_default_without_items(self):
+        """測試低信心賣方只在沒有品項時提供主分類"""
+        with mock.patch('services.classify_service.get_seller_index', return_value=self.index):
+            paper = InvoiceClassifier.classify({'seller_id': '47025240', 'items': []})
+            itemized = InvoiceClassifier.classify({
+                'seller_id': '47025240', 'items': [{'name': '可口可樂', 'qty': 1, 'price': 38}]
+            })
+
+        self.assertEqual(paper['main_category'], Category.HOUSEHOLD_GOODS.value)
+        self.assertEqual(itemized['main_category'], Category.FOOD.value)
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_seller_index
@@ -0,0 +1,51 @@
+# services/test_single_pass.py
+from unittest import mock
+from django.test import TestCase
+from PIL import Image
+from services.ocr.single_pass import SinglePassOCRService
+from services.ocr.ocr_eng_digits import EngDigitsOCR
+
+
+def token(text, conf, left, line, top=0):
+    return {'text': text, 'conf': conf, 'left': left, 'top': top,
+            'width': 40, 'height': 20, 'line': line}
+
+
+class SinglePassOCRServiceTestCase(TestCase):
+
+    def setUp(self):
+        self.image = Image.new('L', (400, 100), 255)
+        self.backend = mock.Mock()
+        self.backend.image_to_data.return_value = [
+            token('總', 95, 0, 0), token('計', 93, 20, 0), token('8O0', 41, 60, 0),
+            token('發票', 40, 0, 1, top=40), token('BB87654321', 96, 60, 1, top=40),
+        ]
+        self.backend.image_to_string.return_value = '800\n'
+
+    def test_reocr_only_low_confidence_numbers(self):
+        """測試只有低信心且含數字的 token 會用數字白名單重新辨識"""
+        service = SinglePassOCRService(backend=self.backend, min_confidence=80)
+
+        result = service.extract_tokens(self.image)
+
+        self.assertEqual(result['reocr'], 1)
+        self.backend.image_to_string.assert_called_once()
+        crop = self.backend.image_to_string.call_args.args[0]
+        self.assertEqual(crop.size, (48, 24))
+        self.assertEqual(self.backend.image_to_string.call_args.kwargs['whitelist'], EngDigitsOCR.WHITELIST)
+
+        self.assertEqual(result['tokens'][2]['text'], '800')
+        self.assertTrue(result['tokens'][2]['reocr'])
+        self.assertEqual(result['tokens'][3]['text'], '發票')
+        self.assertEqual(result['text'], '總計800\n發票BB87654321')
+
+    def test_single_ocr_call(self):
+        """測試只呼叫一次整張圖辨識"""
+        service = SinglePassOCRService(backend=self.backend, min_confidence=0)
+        service.extract_tokens(self.image)
+        self.backend.image_to_data.assert_called_once_with(self.image, lang='chi_tra+eng', psm=6)
+        self.backend.image_to_string.assert_not_called()
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_single_pass
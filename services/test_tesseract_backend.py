@@ -0,0 +1,95 @@
+# services/test_tesseract_backend.py
+import sys
+import threading
+import types
+from unittest import mock
+from django.test import TestCase, override_settings
+from PIL import Image
+from services.ocr import tesseract_backend
+from services.ocr.tesseract_backend import PyTesseractBackend, TesserocrBackend
+from services.ocr.ocr_eng_digits import EngDigitsOCR
+
+
+class FakeTessAPI:
+    created = []
+
+    def __init__(self, lang='eng', path=None):
+        self.lang = lang
+        self.variables = {}
+        self.image = None
+        FakeTessAPI.created.append(self)
+
+    def SetPageSegMode(self, psm):
+        self.psm = psm
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+        return True
+
+    def SetImage(self, image):
+        self.image = image
+
+    def GetUTF8Text(self):
+        return f"{self.lang}:{self.image.size[0]}"
+
+
+class TesseractBackendTestCase(TestCase):
+
+    def setUp(self):
+        FakeTessAPI.created = []
+        self.fake_module = types.SimpleNamespace(PyTessBaseAPI=FakeTessAPI)
+        self.image = Image.new('L', (32, 16), 255)
+
+    def tearDown(self):
+        tesseract_backend._backend = None
+
+    def test_handles_reused_per_thread_and_lang(self):
+        """測試同執行緒同語言重用 API，不同執行緒各自初始化"""
+        with mock.patch.dict(sys.modules, {'tesserocr': self.fake_module}):
+            backend = TesserocrBackend()
+
+        self.assertEqual(backend.image_to_string(self.image, lang='chi_tra+eng'), 'chi_tra+eng:32')
+        backend.image_to_string(self.image, lang='chi_tra+eng')
+        backend.image_to_string(self.image, lang='eng+digits', whitelist='0123')
+        self.assertEqual(len(FakeTessAPI.created), 2)
+
+        worker = threading.Thread(
+            target=backend.image_to_string, args=(self.image,), kwargs={'lang': 'chi_tra+eng'}
+        )
+        worker.start()
+        worker.join()
+        self.assertEqual(len(FakeTessAPI.created), 3)
+
+        digits = FakeTessAPI.created[1]
+        self.assertEqual(digits.variables['tessedit_char_whitelist'], '0123')
+        self.assertIs(digits.image, self.image)
+
+    @override_settings(OCR_BACKEND='tesserocr')
+    def test_fallback_without_tesserocr(self):
+        """測試未安裝 tesserocr 時改用 pytesseract"""
+        with mock.patch.dict(sys.modules, {'tesserocr': None}):
+            backend = tesseract_backend.get_backend()
+        self.assertIsInstance(backend, PyTesseractBackend)
+
+    @override_settings(OCR_BACKEND='tesserocr')
+    def test_select_tesserocr(self):
+        """測試依設定選用 tesserocr"""
+        with mock.patch.dict(sys.modules, {'tesserocr': self.fake_module}):
+            backend = tesseract_backend.get_backend()
+        self.assertIsInstance(backend, TesserocrBackend)
+
+    def test_ocr_engine_uses_backend(self):
+        """測試 OCR 引擎透過 backend 辨識並帶入白名單"""
+        backend = mock.Mock()
+        backend.image_to_string.return_value = 'AB12345678'
+
+        result = EngDigitsOCR(backend=backend).extract(self.image)
+
+        self.assertEqual(result.text, 'AB12345678')
+        backend.image_to_string.assert_called_once_with(
+            self.image, lang='eng+digits', psm=6, whitelist=EngDigitsOCR.WHITELIST
+        )
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_tesseract_backend
@@ -0,0 +1,76 @@
+# services/test_upload_ingest.py
+import base64
+import hashlib
+import io
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from services.image_adapter import DecodedImage, ImageAdapterError
+from services.upload_ingest import SpooledUpload, UploadRejected
+
+
+def make_png(size=(300, 200)):
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 64).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class SpooledUploadTestCase(TestCase):
+
+    def setUp(self):
+        self.png = make_png()
+
+    def test_from_file_hashes_while_spooling(self):
+        """測試逐塊寫入暫存檔並同步計算雜湊，超過記憶體上限改存磁碟"""
+        with override_settings(UPLOAD_SPOOL_MEMORY_BYTES=1024):
+            upload = SpooledUpload.from_file(SimpleUploadedFile('a.png', self.png))
+
+        with upload:
+            self.assertEqual(upload.sha256, hashlib.sha256(self.png).hexdigest())
+            self.assertEqual((upload.size, upload.format, upload.dimensions), (len(self.png), 'PNG', (300, 200)))
+            self.assertTrue(upload.file._rolled)
+            self.assertEqual(upload.read(), self.png)
+            self.assertEqual(DecodedImage(upload.open()).get('L', 150).size, (150, 100))
+
+    def test_base64_decoded_in_chunks(self):
+        """測試 base64 分段解碼（data URI prefix、換行、跨段的 4 字元對齊）"""
+        encoded = base64.encodebytes(self.png).decode()        # 每 76 字元換行
+        with mock.patch.object(SpooledUpload, 'CHUNK_SIZE', 1001):
+            upload = SpooledUpload.from_base64('data:image/png;base64,' + encoded)
+
+        with upload:
+            self.assertEqual(upload.read(), self.png)
+            self.assertEqual(upload.sha256, hashlib.sha256(self.png).hexdigest())
+
+        with self.assertRaises(ImageAdapterError):
+            SpooledUpload.from_base64('not*base64')
+
+    @override_settings(UPLOAD_MAX_BYTES=1000)
+    def test_byte_budget(self):
+        """測試超過大小上限（base64 以長度判斷，不必解碼）"""
+        with self.assertRaises(UploadRejected):
+            SpooledUpload.from_file(SimpleUploadedFile('a.png', self.png))
+        with mock.patch.object(SpooledUpload, '_decode_base64_chunks') as decode:
+            with self.assertRaises(UploadRejected):
+                SpooledUpload.from_base64(base64.b64encode(self.png).decode())
+        decode.assert_not_called()
+
+    @override_settings(UPLOAD_MAX_PIXELS=10000)
+    def test_pixel_budget_checked_from_header(self):
+        """測試像素超過上限時只讀標頭就拒絕"""
+        with mock.patch('PIL.ImageFile.ImageFile.load') as load:
+            with self.assertRaises(UploadRejected):
+                SpooledUpload.from_file(SimpleUploadedFile('a.png', self.png))
+        load.assert_not_called()
+
+    def test_invalid_image(self):
+        """測試不是影像或內容為空"""
+        with self.assertRaises(ImageAdapterError):
+            SpooledUpload.from_file(SimpleUploadedFile('a.png', b'not an image'))
+        with self.assertRaises(ImageAdapterError):
+            SpooledUpload.from_base64('')
+
+
+# 單一測試檔案執行
+# python manage.py test services.test_upload_ingest
@@ -0,0 +1,161 @@
+# services/upload_ingest.py
+import base64
+import binascii
+import hashlib
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable, Optional, Tuple
+from django.conf import settings
+from PIL import Image
+from services.image_adapter import ImageAdapterError
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class UploadRejected(ImageAdapterError):
+    """上傳影像超過大小或像素上限"""
+    pass
+
+
+class SpooledUpload:
+    """
+    上傳影像的暫存檔（每個請求一份）
+
+    以區塊寫入 SpooledTemporaryFile（超過 UPLOAD_SPOOL_MEMORY_BYTES 改存磁碟），
+    寫入時同步計算 SHA-256 並檢查 UPLOAD_MAX_BYTES；寫完只讀取影像標頭檢查
+    UPLOAD_MAX_PIXELS，解壓縮炸彈在解碼像素之前就被拒絕。
+    之後的流程（DecodedImage、影像儲存）直接從暫存檔讀取，不再複製整份 bytes
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    SPOOL_MEMORY_BYTES = 1024 * 1024
+    MAX_BYTES = 20 * 1024 * 1024
+    MAX_PIXELS = 50_000_000
+
+    def __init__(self):
+        self.max_bytes = getattr(settings, 'UPLOAD_MAX_BYTES', SpooledUpload.MAX_BYTES)
+        self.file: BinaryIO = tempfile.SpooledTemporaryFile(
+            max_size=getattr(settings, 'UPLOAD_SPOOL_MEMORY_BYTES', SpooledUpload.SPOOL_MEMORY_BYTES),
+            dir=getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None)
+        )
+        self.size = 0
+        self.format = None
+        self.dimensions: Optional[Tuple[int, int]] = None
+        self._hash = hashlib.sha256()
+
+    @classmethod
+    def from_file(cls, uploaded_file) -> 'SpooledUpload':
+        """Django UploadedFile（以 chunks() 逐塊讀取）"""
+        upload = cls()
+        with upload._guard():
+            upload._write_all(uploaded_file.chunks(cls.CHUNK_SIZE))
+        return upload
+
+    @classmethod
+    def from_base64(cls, source: str) -> 'SpooledUpload':
+        """
+        base64 字串（可含 data URI prefix）逐段解碼
+
+        解碼前先以長度估計大小，超過上限不必解碼
+        """
+        prefix = source.find(',', 0, 256)
+        start = prefix + 1 if prefix >= 0 else 0
+        upload = cls()
+        if (len(source) - start) // 4 * 3 > upload.max_bytes + 3:
+            upload.close()
+            raise UploadRejected(f"影像超過 {upload.max_bytes} bytes")
+        with upload._guard():
+            upload._write_all(cls._decode_base64_chunks(source, start))
+        return upload
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def open(self) -> BinaryIO:
+        """回到檔案開頭，回傳可讀取的檔案物件（呼叫端不可關閉）"""
+        self.file.seek(0)
+        return self.file
+
+    def read(self) -> bytes:
+        """整份內容（只給需要 bytes 的地方使用，例如寫入工作佇列）"""
+        return self.open().read()
+
+    def copy_to(self, target: BinaryIO):
+        shutil.copyfileobj(self.open(), target, SpooledUpload.CHUNK_SIZE)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_all(self, chunks: Iterable[bytes]):
+        for chunk in chunks:
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise UploadRejected(f"影像超過 {self.max_bytes} bytes")
+            self._hash.update(chunk)
+            self.file.write(chunk)
+        if not self.size:
+            raise ImageAdapterError("影像來源為空")
+        self._inspect()
+
+    def _inspect(self):
+        self.format, self.dimensions = SpooledUpload.inspect(self.open())
+
+    @staticmethod
+    def inspect(source) -> Tuple[str, Tuple[int, int]]:
+        """
+        只讀取影像標頭（不解碼像素），檢查格式與 UPLOAD_MAX_PIXELS
+
+        Args:
+            source: 檔案路徑或可 seek 的檔案物件（批次上傳的暫存檔也以此檢查）
+
+        Returns:
+            (格式, (寬, 高))
+        """
+        max_pixels = getattr(settings, 'UPLOAD_MAX_PIXELS', SpooledUpload.MAX_PIXELS)
+        try:
+            with Image.open(source) as image:
+                image_format, dimensions = image.format, image.size
+        except Image.DecompressionBombError as e:
+            raise UploadRejected(f"影像像素超過上限: {e}")
+        except Exception as e:
+            raise ImageAdapterError(f"無效的影像 bytes: {e}")
+        width, height = dimensions
+        if width * height > max_pixels:
+            raise UploadRejected(f"影像像素 {width}x{height} 超過上限 {max_pixels}")
+        return image_format, dimensions
+
+    @contextmanager
+    def _guard(self):
+        """寫入或檢查失敗時關閉暫存檔，例外照常拋出"""
+        try:
+            yield self
+        except BaseException:
+            self.close()
+            raise
+
+    @staticmethod
+    def _decode_base64_chunks(source: str, start: int) -> Iterable[bytes]:
+        """每次解碼 CHUNK_SIZE 字元（去除空白後對齊 4 的倍數，餘數留到下一段）"""
+        pending = ''
+        step = SpooledUpload.CHUNK_SIZE
+        try:
+            for offset in range(start, len(source), step):
+                pending += _WHITESPACE.sub('', source[offset:offset + step])
+                usable = len(pending) // 4 * 4
+                if usable:
+                    yield base64.b64decode(pending[:usable], validate=True)
+                    pending = pending[usable:]
+            if pending:
+                yield base64.b64decode(pending, validate=True)
+        except (binascii.Error, ValueError) as e:
+            raise ImageAdapterError(f"無效的 base64 字串: {e}")
+
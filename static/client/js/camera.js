@@ -329,8 +329,8 @@ class CameraController {
             
             console.log('capture() blob:', blob);
             
-            // 處理影像（拍照會先存檔）
-            await this.processAndPreview(blob, { saveToStatic: true, overwriteOriginal: true });
+            // 處理影像（原圖在送出辨識時一併上傳）
+            await this.processAndPreview(blob);
             
         } catch (error) {
             console.error('❌ 拍照失敗:', error);
@@ -391,95 +391,26 @@ class CameraController {
         
         console.log('📁 已選擇檔案:', file.name, file.size, 'bytes');
         
-        // 處理影像（選檔會存檔，但不覆蓋原始相片；手機拍照例外）
-        const overwriteOriginal = this.shouldOverwriteOriginalForFile(file);
-        await this.processAndPreview(file, { saveToStatic: true, overwriteOriginal });
+        // 處理影像（原圖在送出辨識時一併上傳）
+        await this.processAndPreview(file);
         console.log('↑ processAndPreview() ↑');
         console.log('↑ handleFile() ↑');
     }
 
-    isMobileDevice() {
-        return /Mobi|Android|iPhone|iPad|iPod/i.test(navigator.userAgent);
-    }
-
-    shouldOverwriteOriginalForFile(file) {
-        if (!this.isMobileDevice()) return false;
-        const captureAttr = this.fileInput?.getAttribute('capture');
-        if (captureAttr) return true;
-
-        const name = (file?.name || '').toLowerCase();
-        const looksLikeCameraName =
-            name === 'image.jpg' ||
-            name === 'image.jpeg' ||
-            name === 'image.png' ||
-            name.startsWith('img_') ||
-            name.startsWith('image_') ||
-            name.startsWith('capture_');
-        if (!looksLikeCameraName) return false;
-
-        const now = Date.now();
-        const recent = Math.abs(now - (file?.lastModified || 0)) < 2 * 60 * 1000;
-        return recent;
-    }
-
-    /* 先儲存影像到 static/imgs，再回傳可存取的 URL */
-    async saveImageToStatic(imageSource, { overwriteOriginal = false, filename = null } = {}) {
-        const formData = new FormData();
-        const uploadFilename = imageSource?.name || `capture_${Date.now()}.jpg`;
-        formData.append('image', imageSource, uploadFilename);
-        if (overwriteOriginal) {
-            formData.append('overwrite', '1');
-            if (filename) {
-                formData.append('filename', filename);
-            }
-        }
-
-        const response = await fetch('/api/save-image/', {
-            method: 'POST',
-            body: formData,
-            headers: {
-                'X-CSRFToken': this.getCsrfToken()
-            }
-        });
-
-        if (!response.ok) {
-            throw new Error(`save-image HTTP ${response.status}: ${response.statusText}`);
-        }
-
-        const data = await response.json();
-        if (!data.success) {
-            throw new Error(data.error || '影像儲存失敗');
-        }
-
-        return data;
-    }
-    
     /* 處理並預覽影像 */
-    async processAndPreview(imageSource, { saveToStatic = true, overwriteOriginal = false } = {}) {
+    async processAndPreview(imageSource) {
         console.log('↓ processAndPreview() ↓');
         try {
             console.log('processAndPreview() input:', imageSource);
 
-            let processingSource = imageSource;
-            if (saveToStatic) {
-                // 先儲存到 static/imgs，再以儲存後的檔案進行處理
-                const saved = await this.saveImageToStatic(imageSource, {
-                    overwriteOriginal,
-                    filename: overwriteOriginal ? 'capture_original' : null
-                });
-                this.savedImageUrl = saved.url;
-                const savedResponse = await fetch(saved.url, { cache: 'no-store' });
-                if (!savedResponse.ok) {
-                    throw new Error(`讀取已儲存影像失敗：HTTP ${savedResponse.status}`);
-                }
-                processingSource = await savedResponse.blob();
-            }
+            // 原圖留在本機，送出辨識時與裁切圖一起上傳（/api/capture/），不再先存檔再下載回來
+            this.originalBlob = imageSource;
 
             /*
             image-processor.js
             ImageProcessor.processImage(imageSource) 處理
             */
-            const result = await window.imageProcessor.processImage(processingSource);
+            const result = await window.imageProcessor.processImage(imageSource);
             console.log('processImage() result:', result);
 
             // 儲存處理後的 Blob
@@ -562,23 +493,16 @@ class CameraController {
             this.currentBlob = await window.imageProcessor.canvasToBlob(this.canvasCropped);
         }
 
-        // 送出前先把 OCR friendly 圖檔存到 static/imgs
-        let saved = null;
-        try {
-            saved = await this.saveImageToStatic(this.currentBlob, { overwriteOriginal: false });
-            this.savedImageUrl = saved.url;
-        } catch (error) {
-            console.error('❌ 儲存 OCR 圖檔失敗:', error);
-            alert('儲存 OCR 圖檔失敗: ' + error.message);
-            return;
-        }
-
+        // OCR 裁切圖與原圖一次上傳：後端儲存兩者並立即辨識
         const formData = new FormData();
-        formData.append('image', this.currentBlob, saved?.filename || 'invoice.jpg');
+        formData.append('image', this.currentBlob, 'invoice.jpg');
+        if (this.originalBlob) {
+            formData.append('original', this.originalBlob, this.originalBlob.name || 'capture_original.jpg');
+        }
         console.log('FormData prepared:', formData);
         
         try {
-            const response = await fetch('/api/process/', {
+            const response = await fetch('/api/capture/', {
                 method: 'POST',
                 body: formData,
                 headers: {
@@ -587,12 +511,11 @@ class CameraController {
             });
             console.log('↑ getCsrfToken() ↑');
             
-            if (!response.ok) {
+            const result = await response.json().catch(() => null);
+            if (!result) {
                 throw new Error(`HTTP ${response.status}: ${response.statusText}`);
             }
             
-            const result = await response.json();
-            
             if (result.success) {
                 console.log('✅ 辨識成功:', result.data);
                 
@@ -39,6 +39,11 @@ class FormHandler {
     
     renderItems(items) {
         const container = document.getElementById('itemsList');
+        // 伺服器已輸出品項與分類選單（client/views.py ConfirmView）
+        if (container.querySelector('.item-row')) {
+            this.bindItemCategories(container);
+            return;
+        }
         container.innerHTML = '';
         
         if (items.length === 0) {
@@ -71,6 +76,29 @@ class FormHandler {
         
         container.appendChild(table);
     }
+    
+    bindItemCategories(container) {
+        // 細分類選單依主分類分組（optgroup label 為主分類），只顯示所選主分類的細分類
+        container.querySelectorAll('.item-row').forEach(row => {
+            const category = row.querySelector('.item-category');
+            const subcategory = row.querySelector('.item-subcategory');
+            if (!category || !subcategory) return;
+            
+            const filter = () => {
+                subcategory.querySelectorAll('optgroup').forEach(group => {
+                    const visible = group.label === category.value;
+                    group.hidden = !visible;
+                    group.disabled = !visible;
+                });
+                const selected = subcategory.selectedOptions[0];
+                if (selected && selected.parentElement.disabled) {
+                    subcategory.value = '';
+                }
+            };
+            category.addEventListener('change', filter);
+            filter();
+        });
+    }
 }
 
 // 初始化